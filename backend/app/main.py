@@ -1,10 +1,28 @@
 # app/main.py
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+import gzip
+import hashlib
+import json
 import os
 
+# Optional brotli support; gzip (stdlib) is always available
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 # Import routers we will create in the next steps
-from app.routers import github, analysis, docs, tests
+from app.routers import github, analysis, docs, tests, jobs, debug, search
+from app.services.parse_limits import parse_limits
+from app.services.async_github import async_github_client
+from app.services.webhook_service import webhook_service, verify_signature
+from app.services.job_service import job_service
+from app.services.cache import TTLCache
+from app.services.profiling import profiling_service
+from app.services.registry import ServiceUnavailable, registry
 
 # Initialize the FastAPI application
 app = FastAPI(
@@ -13,6 +31,212 @@ app = FastAPI(
     version="0.1.0"
 )
 
+# -------------------- HTTP CACHING & COMPRESSION --------------------
+# Only endpoints whose response is a function of the request alone. Not
+# /api/docs/generate-function-doc: its output depends on the semantic index
+# (few-shot examples) and on documentation remembered from earlier calls
+# (clone reuse), which every call itself updates
+CACHEABLE_PATHS = set(os.getenv("RESPONSE_CACHE_PATHS", ",".join([
+    "/api/analysis/analyze-python",
+    "/api/analysis/analyze-file",
+    "/api/tests/generate-test",
+])).split(","))
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+# Anything that changes what these endpoints return for the same body must be part of the version
+RESPONSE_CACHE_VERSION = os.getenv("RESPONSE_CACHE_VERSION") or "|".join([
+    app.version,
+    os.getenv("AI_MODEL_NAME", ""),
+    os.getenv("AI_LORA_ADAPTER", ""),
+    os.getenv("AI_LORA_MERGE", ""),
+    os.getenv("AI_ENABLE_MODEL", ""),
+])
+
+response_cache = TTLCache(
+    maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", 512)),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", 600))
+)
+http_cache_stats = {"not_modified": 0, "hits": 0, "misses": 0, "compressed": 0,
+                    "bytes_in": 0, "bytes_out": 0}
+
+
+def negotiate_encoding(accept_encoding: str):
+    """Best content coding the client accepts (q > 0): br when available, then gzip"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    for encoding in (("br",) if brotli else ()) + ("gzip",):
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)  # higher qualities cost too much CPU per response
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+class HTTPCacheMiddleware:
+    """
+    Pure ASGI middleware for the cacheable POST endpoints and compression.
+
+    The strong ETag is a hash of the service version, path, query, Accept
+    header and request body, so it is known before any work is done: a
+    matching If-None-Match gets a 304 without calling the endpoint, and
+    identical requests are answered from a TTL cache of earlier 200
+    responses. Any response with a known length above the threshold is
+    gzip/brotli-compressed when the client accepts it; streaming responses
+    (NDJSON, server-sent events) pass through untouched.
+    """
+    def __init__(self, app, min_compress_bytes: int = 1024, max_entry_bytes: int = 4 * 1024 * 1024):
+        self.app = app
+        self.min_compress_bytes = min_compress_bytes
+        self.max_entry_bytes = max_entry_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        encoding = negotiate_encoding(headers.get("accept-encoding", ""))
+        if scope["method"] != "POST" or scope["path"] not in CACHEABLE_PATHS:
+            await self.app(scope, receive, self._compressing_send(send, encoding))
+            return
+
+        # The whole body is hashed before the endpoint runs: bounded like the analysis payloads
+        chunks, size = [], 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > parse_limits.max_body_bytes:
+                response = JSONResponse(status_code=413, content={
+                    "detail": f"Request body exceeds {parse_limits.max_body_bytes} bytes"})
+                await response(scope, receive, send)
+                return
+            chunks.append(chunk)
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+
+        digest = hashlib.sha256()
+        for part in (RESPONSE_CACHE_VERSION, scope["path"], scope.get("query_string", b"").decode(),
+                     headers.get("accept", "")):
+            digest.update(part.encode() + b"\0")
+        digest.update(body)
+        etag = f'"{digest.hexdigest()[:32]}"'
+        cache_headers = [(b"etag", etag.encode()), (b"cache-control", b"private, no-cache"),
+                         (b"vary", b"Accept, Accept-Encoding")]
+
+        # 304 on POST: the ETag names the response for this exact body, so the client's copy is current
+        if etag in [tag.strip() for tag in headers.get("if-none-match", "").split(",")]:
+            http_cache_stats["not_modified"] += 1
+            await send({"type": "http.response.start", "status": 304, "headers": cache_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        entry = response_cache.get(etag)
+        if entry is not None:
+            http_cache_stats["hits"] += 1
+            await self._send_entry(send, entry, encoding, cache_headers + [(b"x-cache", b"HIT")])
+            return
+
+        # Miss: replay the buffered body to the endpoint and capture its response
+        http_cache_stats["misses"] += 1
+        replayed = False
+        
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+        
+        captured = {"status": 500, "headers": [], "body": []}
+        
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                captured["status"] = message["status"]
+                captured["headers"] = message.get("headers", [])
+            elif message["type"] == "http.response.body":
+                captured["body"].append(message.get("body", b""))
+        
+        await self.app(scope, replay, capture)
+        entry = {
+            "status": captured["status"],
+            "headers": [(k, v) for k, v in captured["headers"] if k.lower() not in (b"content-length", b"etag")],
+            "body": b"".join(captured["body"]),
+            "encoded": {}
+        }
+        if entry["status"] != 200:
+            await self._send_entry(send, entry, encoding, [])
+            return
+        if len(entry["body"]) <= self.max_entry_bytes:
+            response_cache.set(etag, entry)
+        await self._send_entry(send, entry, encoding, cache_headers + [(b"x-cache", b"MISS")])
+
+    def _compressible(self, headers, length: int, encoding) -> bool:
+        content_type = headers.get("content-type", "")
+        return (encoding is not None and length >= self.min_compress_bytes
+                and "content-encoding" not in headers and content_type.startswith(COMPRESSIBLE_TYPES))
+
+    async def _send_entry(self, send, entry, encoding, extra_headers):
+        headers = MutableHeaders(raw=list(entry["headers"]) + extra_headers)
+        body = entry["body"]
+        if self._compressible(headers, len(body), encoding):
+            if encoding not in entry["encoded"]:
+                entry["encoded"][encoding] = compress(body, encoding)  # compressed once per cached entry
+            body = entry["encoded"][encoding]
+            headers["content-encoding"] = encoding
+            http_cache_stats["compressed"] += 1
+        headers["content-length"] = str(len(body))
+        http_cache_stats["bytes_in"] += len(entry["body"])
+        http_cache_stats["bytes_out"] += len(body)
+        await send({"type": "http.response.start", "status": entry["status"], "headers": headers.raw})
+        await send({"type": "http.response.body", "body": body})
+
+    def _compressing_send(self, send, encoding):
+        """Compress complete responses of known length; stream everything else as is"""
+        state = {"start": None, "chunks": []}
+        
+        async def wrapped(message):
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                length = headers.get("content-length")
+                if length and length.isdigit() and self._compressible(headers, int(length), encoding):
+                    state["start"] = message
+                    return
+                await send(message)
+            elif message["type"] == "http.response.body" and state["start"] is not None:
+                state["chunks"].append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                start, state["start"] = state["start"], None
+                entry = {"status": start["status"], "body": b"".join(state["chunks"]), "encoded": {},
+                         "headers": [(k, v) for k, v in start.get("headers", []) if k.lower() != b"content-length"]}
+                await self._send_entry(send, entry, encoding, [(b"vary", b"Accept-Encoding")])
+            else:
+                await send(message)
+        
+        return wrapped
+
+
+# Added before CORS so it runs inside it: 304s and cache hits still get CORS headers
+app.add_middleware(
+    HTTPCacheMiddleware,
+    min_compress_bytes=int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", 1024)),
+    max_entry_bytes=int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", 4 * 1024 * 1024))
+)
+
 # Configure CORS (Important for frontend-backend communication)
 # This allows your React frontend (which runs on a different port) to talk to this backend.
 app.add_middleware(
@@ -21,8 +245,74 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all HTTP methods (GET, POST, etc.)
     allow_headers=["*"],  # Allow all headers
+    expose_headers=["ETag", "X-Cache"],  # Let the frontend read ETags to send If-None-Match
 )
 
+class BodyTooLarge(HTTPException):
+    """Raised from receive() once a request body passes the limit; FastAPI's body parsing re-raises it"""
+    def __init__(self, limit: int):
+        super().__init__(status_code=413, detail=f"Request body exceeds {limit} bytes")
+
+
+class BodySizeLimitMiddleware:
+    """
+    Reject oversized analysis payloads: on Content-Length before the body is
+    read, and by counting bytes as they are received, so a chunked upload
+    (no Content-Length) is cut off at the limit instead of buffered whole.
+    """
+    def __init__(self, app, prefix: str = "/api/analysis"):
+        self.app = app
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+        limit = parse_limits.max_body_bytes
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            await self._reject(scope, receive, send, BodyTooLarge(limit))
+            return
+
+        received = 0
+        started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise BodyTooLarge(limit)
+            return message
+
+        async def tracked_send(message):
+            nonlocal started
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except BodyTooLarge as e:
+            # Raised outside the router (e.g. while HTTPCacheMiddleware buffers the body)
+            if started:
+                raise
+            await self._reject(scope, receive, send, e)
+
+    @staticmethod
+    async def _reject(scope, receive, send, error: BodyTooLarge):
+        await JSONResponse(status_code=error.status_code, content={"detail": error.detail})(scope, receive, send)
+
+
+# Outermost middleware: oversized bodies are refused before any other layer buffers them
+app.add_middleware(BodySizeLimitMiddleware)
+
+# Services are built on first use; one that can't be (e.g. no GITHUB_ACCESS_TOKEN)
+# fails only the requests that need it
+@app.exception_handler(ServiceUnavailable)
+async def service_unavailable_handler(request: Request, exc: ServiceUnavailable):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
 # Basic health check endpoint
 @app.get("/")
 async def root():
@@ -30,13 +320,66 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {"status": "healthy", "services": registry.status()}
+
+@app.get("/http-cache")
+async def get_http_cache_stats():
+    """Response cache hit rates and bytes saved by compression"""
+    return {**http_cache_stats, "cache": response_cache.stats(), "version": RESPONSE_CACHE_VERSION}
+
+# GitHub push webhooks keep stored analysis fresh (only the changed files are re-analyzed)
+@app.post("/webhooks/github")
+async def github_webhook(request: Request):
+    if not webhook_service.secret:
+        raise HTTPException(status_code=503, detail="Webhook secret not configured (GITHUB_WEBHOOK_SECRET)")
+    
+    body = await request.body()
+    if not verify_signature(webhook_service.secret, body, request.headers.get("x-hub-signature-256")):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+    
+    event = request.headers.get("x-github-event", "")
+    if event == "ping":
+        return {"status": "pong"}
+    if event != "push":
+        return JSONResponse(status_code=202, content={"status": "ignored", "event": event})
+    
+    try:
+        return webhook_service.handle_push(json.loads(body))
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Malformed push payload: {str(e)}")
+
+@app.get("/webhooks/github/analysis")
+async def get_webhook_analysis(repository: str = "", branch: str = ""):
+    """Stored analysis of one branch, or an overview of every tracked branch"""
+    if not repository:
+        return webhook_service.metrics()
+    result = webhook_service.store.get(repository, branch or "main")
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No analysis stored for {repository}@{branch or 'main'}")
+    return result
 
 # We will add these lines later when we create the routers
 app.include_router(github.router, prefix="/api/github", tags=["GitHub"])
 app.include_router(analysis.router, prefix="/api/analysis", tags=["Analysis"])
 app.include_router(docs.router, prefix="/api/docs", tags=["Documentation"])
 app.include_router(tests.router, prefix="/api/tests", tags=["Tests"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["Jobs"])
+app.include_router(search.router, prefix="/api/search", tags=["Search"])
+# Admin-only profiling routes; hidden (and 404) unless DEBUG_ADMIN_TOKEN is set
+app.include_router(debug.router, prefix="/api/debug", tags=["Debug"],
+                   include_in_schema=bool(profiling_service.admin_token))
+
+# Background workers for queued jobs (jobs whose worker lease expired, e.g. in a crashed process, are requeued)
+@app.on_event("startup")
+async def start_job_workers():
+    job_service.start()
+
+# Close pooled GitHub connections cleanly
+@app.on_event("shutdown")
+async def close_github_client():
+    job_service.stop()
+    await webhook_service.flush()
+    await async_github_client.aclose()
 
 # This block allows us to run the app with `python -m uvicorn app.main:app --reload`
 if __name__ == "__main__":
@@ -1,33 +1,61 @@
 # app/routers/analysis.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from app.services.code_analysis import code_analysis_service
+from app.services.parse_limits import ParseLimitError, parse_limits
+from app.services.serialization import fast_response
+from app.services.dependency_graph import DependencyGraph
+from app.services.code_metrics import MetricsStore
+from app.services.clone_detection import clone_detection_service
 
 router = APIRouter()
 
+
+def analyze_files(files: dict):
+    """
+    Bounded parse of each file; one that exceeds a limit is reported in the
+    failed list instead of failing the whole request
+    """
+    analyses, failed = {}, []
+    for path, content in files.items():
+        try:
+            analyses[path] = code_analysis_service.parse_python_file_bounded(content)
+        except ParseLimitError as e:
+            failed.append({'file': path, 'error': e.message, 'status': e.status_code})
+    return analyses, failed
+
+
 @router.post("/analyze-python")
-async def analyze_python_code(code: dict):
+async def analyze_python_code(code: dict, request: Request):
     """
     Analyze Python code and return its structure
     Expects: {'code': 'python code content'}
+    Send 'Accept: application/msgpack' for a MessagePack response
     """
     try:
         if 'code' not in code:
             raise HTTPException(status_code=400, detail="No code provided")
         
-        analysis_result = code_analysis_service.parse_python_file(code['code'])
+        analysis_result = await run_in_threadpool(
+            code_analysis_service.parse_python_file_bounded, code['code']
+        )
         summary = code_analysis_service.get_code_summary(analysis_result)
         
-        return {
+        return fast_response({
             'analysis': analysis_result,
             'summary': summary,
             'language': 'python'
-        }
+        }, request.headers.get('accept'))
         
+    except HTTPException:
+        raise
+    except ParseLimitError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 @router.post("/analyze-file")
-async def analyze_code_file(analysis_request: dict):
+async def analyze_code_file(analysis_request: dict, request: Request):
     """
     Analyze a code file with specified language
     Expects: {'code': 'code content', 'language': 'python'}
@@ -46,18 +74,153 @@ async def analyze_code_file(analysis_request: dict):
         
         file_extension = language_extensions.get(analysis_request['language'], '.txt')
         
-        analysis_result = code_analysis_service.analyze_repository_file(
-            analysis_request['code'], 
-            file_extension
-        )
+        if file_extension == '.py':
+            analysis_result = await run_in_threadpool(
+                code_analysis_service.parse_python_file_bounded, analysis_request['code']
+            )
+        else:
+            analysis_result = code_analysis_service.analyze_repository_file(
+                analysis_request['code'], 
+                file_extension
+            )
         
         summary = code_analysis_service.get_code_summary(analysis_result)
         
-        return {
+        return fast_response({
             'analysis': analysis_result,
             'summary': summary,
             'language': analysis_request['language']
+        }, request.headers.get('accept'))
+        
+    except HTTPException:
+        raise
+    except ParseLimitError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+@router.post("/analyze-python/upload")
+async def analyze_python_upload(request: Request):
+    """
+    Analyze a raw Python file streamed as the request body (no JSON wrapping),
+    so large files are held once as bytes and once as str
+    Example: curl --data-binary @module.py -H 'Content-Type: text/x-python' ...
+    """
+    try:
+        body = bytearray()
+        line_count = 1
+        async for chunk in request.stream():
+            body.extend(chunk)
+            line_count += chunk.count(b'\n')
+            if len(body) > parse_limits.max_body_bytes:
+                raise HTTPException(status_code=413, detail=f"Upload exceeds {parse_limits.max_body_bytes} bytes")
+            if line_count > parse_limits.max_lines:
+                raise HTTPException(status_code=413, detail=f"Upload exceeds {parse_limits.max_lines} lines")
+        
+        try:
+            code_content = body.decode('utf-8')
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=422, detail="Upload is not valid UTF-8")
+        del body
+        
+        analysis_result = await run_in_threadpool(
+            code_analysis_service.parse_python_file_bounded, code_content
+        )
+        summary = code_analysis_service.get_code_summary(analysis_result)
+        
+        return fast_response({
+            'analysis': analysis_result,
+            'summary': summary,
+            'language': 'python'
+        }, request.headers.get('accept'))
+        
+    except HTTPException:
+        raise
+    except ParseLimitError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+@router.post("/dependency-graph")
+async def build_dependency_graph(graph_request: dict):
+    """
+    Build the cross-file import/call graph for a set of Python files
+    Expects: {'files': {'path/to/module.py': 'python code content', ...}}
+    """
+    try:
+        files = graph_request.get('files')
+        if not isinstance(files, dict) or not files:
+            raise HTTPException(status_code=400, detail="No files provided")
+        
+        analyses, failed = await run_in_threadpool(
+            analyze_files, {path: content for path, content in files.items() if path.endswith('.py')}
+        )
+        graph = DependencyGraph()
+        graph.add_files(analyses)
+        
+        return {**graph.to_dict(), 'failed_files': failed}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Dependency graph failed: {str(e)}")
+
+
+@router.post("/metrics")
+async def repository_metrics(metrics_request: dict):
+    """
+    Per-function metrics aggregated across a set of Python files
+    Expects: {'files': {'path/to/module.py': 'python code content', ...}, 'top_n': 10}
+    """
+    try:
+        files = metrics_request.get('files')
+        if not isinstance(files, dict) or not files:
+            raise HTTPException(status_code=400, detail="No files provided")
+        try:
+            top_n = int(metrics_request.get('top_n', 10))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="top_n must be an integer")
+        if not 1 <= top_n <= 100:
+            raise HTTPException(status_code=400, detail="top_n must be between 1 and 100")
+        
+        analyses, failed = await run_in_threadpool(analyze_files, files)
+        store = MetricsStore()
+        for path, analysis in analyses.items():
+            store.add_analysis(path, analysis)
+        
+        return {**store.report(top_n=top_n), 'failed_files': failed}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Metrics failed: {str(e)}")
+
+
+@router.post("/clones")
+async def detect_clones(clone_request: dict):
+    """
+    Find groups of near-duplicate functions across a set of Python files
+    Expects: {'files': {'path/to/module.py': 'python code content', ...}, 'threshold': 0.8}
+    """
+    try:
+        files = clone_request.get('files')
+        if not isinstance(files, dict) or not files:
+            raise HTTPException(status_code=400, detail="No files provided")
+        
+        groups = await run_in_threadpool(
+            clone_detection_service.find_clone_groups,
+            files,
+            float(clone_request.get('threshold', 0.8))
+        )
+        
+        return {
+            'clone_groups': groups,
+            'group_count': len(groups)
         }
         
+    except HTTPException:
+        raise
+    except ParseLimitError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Clone detection failed: {str(e)}")
@@ -0,0 +1,116 @@
+# app/routers/debug.py
+import asyncio
+import hmac
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse, Response
+from app.services.profiling import profiling_service, StackSampler, CProfileSession, AllocationTracer
+
+SORT_KEYS = ('cumulative', 'tottime', 'calls', 'ncalls', 'time')
+TRACE_KEYS = ('lineno', 'filename', 'traceback')
+
+
+def require_admin(x_admin_token: str = Header(default="")):
+    """Debug routes exist only when DEBUG_ADMIN_TOKEN is set, and only for callers presenting it"""
+    if not profiling_service.admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    # Bytes: compare_digest rejects non-ASCII str, and headers can carry any Latin-1 character
+    if not hmac.compare_digest(x_admin_token.encode(), profiling_service.admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+def _check_window(seconds: float):
+    if not 0 < seconds <= profiling_service.max_seconds:
+        raise HTTPException(status_code=400,
+                            detail=f"seconds must be in (0, {profiling_service.max_seconds:g}]")
+
+
+def _busy():
+    return HTTPException(status_code=409, detail="Another profiling session is running")
+
+
+@router.get("/status")
+async def get_profiling_status():
+    """Whether a session is running, and the last one's timing"""
+    return profiling_service.status()
+
+@router.post("/profile/sample")
+async def sample_stacks(seconds: float = 10, interval_ms: float = 5, include_idle: bool = False):
+    """
+    Sample every thread's stack for `seconds` and return folded stacks
+    ("thread;outer;...;inner count"), ready for flamegraph.pl or speedscope
+    Example: curl -X POST -H 'X-Admin-Token: ...' '/api/debug/profile/sample?seconds=30' > out.folded
+    """
+    _check_window(seconds)
+    if not 0.5 <= interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail="interval_ms must be between 0.5 and 1000")
+    if not profiling_service.acquire('sample', seconds):
+        raise _busy()
+    try:
+        sampler = StackSampler(interval_ms / 1000, include_idle)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+    finally:
+        profiling_service.release()
+
+    return PlainTextResponse(sampler.folded(), headers={
+        'X-Samples': str(sampler.samples),
+        'X-Duration-Seconds': f"{sampler.duration:.3f}"
+    })
+
+@router.post("/profile/cprofile")
+async def cprofile_event_loop(seconds: float = 10, sort: str = 'cumulative', limit: int = 50, format: str = 'text'):
+    """
+    cProfile the event loop thread for `seconds`; format is 'text' (pstats
+    listing), 'json' (top rows) or 'prof' (raw stats for snakeviz)
+    """
+    _check_window(seconds)
+    if sort not in SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(SORT_KEYS)}")
+    if format not in ('text', 'json', 'prof'):
+        raise HTTPException(status_code=400, detail="format must be text, json or prof")
+    if not profiling_service.acquire('cprofile', seconds):
+        raise _busy()
+    try:
+        session = CProfileSession()
+        session.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            session.stop()
+    finally:
+        profiling_service.release()
+
+    if format == 'prof':
+        return Response(session.dump(), media_type='application/octet-stream',
+                        headers={'Content-Disposition': 'attachment; filename="event_loop.prof"'})
+    if format == 'json':
+        return {'duration_seconds': session.duration, 'functions': session.rows(sort, limit)}
+    return PlainTextResponse(session.report(sort, limit))
+
+@router.post("/tracemalloc")
+async def trace_allocations(seconds: float = 10, frames: int = 10, key_type: str = 'lineno', limit: int = 25):
+    """
+    Allocation sites whose live memory grew over `seconds` (tracemalloc
+    snapshot diff); tracing costs memory and CPU only during the window
+    """
+    _check_window(seconds)
+    if key_type not in TRACE_KEYS:
+        raise HTTPException(status_code=400, detail=f"key_type must be one of {', '.join(TRACE_KEYS)}")
+    if not profiling_service.acquire('tracemalloc', seconds):
+        raise _busy()
+    try:
+        tracer = AllocationTracer(max(1, min(frames, 50)))
+        await asyncio.to_thread(tracer.start)  # the first snapshot walks every traced block
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            result = await asyncio.to_thread(tracer.stop, key_type, limit)
+    finally:
+        profiling_service.release()
+    return dict(result, seconds=seconds, key_type=key_type)
@@ -1,11 +1,12 @@
 # app/routers/docs.py
-from fastapi import APIRouter, HTTPException
-from app.services.ai_service import ai_service
+from fastapi import APIRouter, Depends, HTTPException
+from app.services.registry import get_ai_service
+from app.services.clone_detection import clone_detection_service
 
 router = APIRouter()
 
 @router.post("/generate-function-doc")
-async def generate_function_documentation(request: dict):
+async def generate_function_documentation(request: dict, ai_service=Depends(get_ai_service)):
     """
     Generate documentation for a function
     Expects: {'function_code': 'def func(...): ...', 'function_name': 'func'}
@@ -14,6 +15,20 @@ async def generate_function_documentation(request: dict):
         if 'function_code' not in request or 'function_name' not in request:
             raise HTTPException(status_code=400, detail="Missing function_code or function_name")
         
+        # Cloned helpers reuse the docstring already generated for their twin
+        reused = clone_detection_service.find_documented_clone(
+            request['function_code'],
+            request['function_name']
+        )
+        if reused:
+            return {
+                "documentation": reused['documentation'],
+                "function_name": request['function_name'],
+                "reused_from": reused['reused_from'],
+                "similarity": reused['similarity'],
+                "success": True
+            }
+        
         documentation = ai_service.generate_documentation(
             request['function_code'], 
             request['function_name']
@@ -22,11 +37,19 @@ async def generate_function_documentation(request: dict):
         if documentation is None:
             raise HTTPException(status_code=500, detail="Documentation generation failed")
         
+        clone_detection_service.remember_documentation(
+            request['function_code'],
+            request['function_name'],
+            documentation
+        )
+        
         return {
             "documentation": documentation,
             "function_name": request['function_name'],
             "success": True
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Documentation generation failed: {str(e)}")
\ No newline at end of file
@@ -1,6 +1,13 @@
 # app/routers/github.py
-from fastapi import APIRouter, HTTPException
-from app.services.github_service import github_service
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from app.services.async_github import async_github_client
+from app.services.code_analysis import code_analysis_service
+from app.services.parse_limits import ParseLimitError
+from app.services.registry import find_github_service, get_github_service
+from app.services.serialization import fast_response
 
 router = APIRouter()
 
@@ -8,44 +15,193 @@ router = APIRouter()
 async def test_github_connection():
     """Test GitHub API connection"""
     try:
-        result = github_service.test_connection()
+        result = await async_github_client.test_connection()
         return {"status": "success", "message": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/repo/{repo_url:path}")
-async def get_repository_info(repo_url: str):
-    """Get basic information about a repository"""
+@router.get("/cache-stats")
+async def get_cache_stats(github_service=Depends(get_github_service)):
+    """Cache hit rates and GitHub rate-limit consumption"""
+    stats = github_service.cache_stats()
+    stats['async_client'] = async_github_client.cache_stats()
+    return stats
+
+@router.get("/rate-limit")
+async def get_rate_limit(github_service=Depends(get_github_service)):
+    """Remaining GitHub budget, pacing rate and request coalescing counters"""
+    return {
+        'async_client': async_github_client.scheduler.metrics(),
+        'sync_client': github_service.rate_limit
+    }
+
+@router.get("/analyze-repository")
+async def analyze_repository(repo_url: str, request: Request, ref: str = "",
+                             github_service=Depends(get_github_service)):
+    """
+    Analyze all Python files of a repository from one archive download
+    Example: /api/github/analyze-repository?repo_url=owner/name&ref=main
+    """
     try:
-        repo = github_service.get_repo(repo_url)
-        return {
-            "name": repo.full_name,
-            "description": repo.description,
-            "stars": repo.stargazers_count,
-            "forks": repo.forks_count,
-            "url": repo.html_url,
-            "language": repo.language
-        }
+        result = await run_in_threadpool(github_service.analyze_repository_archive, repo_url, ref)
+        return fast_response(result, request.headers.get('accept'))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/analyze-files")
+async def analyze_repository_files(analysis_request: dict, request: Request):
+    """
+    Fetch several files concurrently and analyze each one
+    Expects: {'repo_url': 'owner/name', 'paths': ['a.py', 'pkg/b.py'], 'ref': 'main'}
+    """
+    try:
+        if 'repo_url' not in analysis_request or not analysis_request.get('paths'):
+            raise HTTPException(status_code=400, detail="Missing repo_url or paths")
+        
+        fetched = await async_github_client.fetch_files(
+            analysis_request['repo_url'],
+            analysis_request['paths'],
+            analysis_request.get('ref', '')
+        )
+        
+        files = {}
+        for path, result in fetched.items():
+            if 'error' in result:
+                files[path] = {'success': False, 'error': result['error']}
+                continue
+            extension = '.' + path.rsplit('.', 1)[-1] if '.' in path else ''
+            try:
+                if extension == '.py':
+                    files[path] = await run_in_threadpool(
+                        code_analysis_service.parse_python_file_bounded, result['content']
+                    )
+                else:
+                    files[path] = code_analysis_service.analyze_repository_file(result['content'], extension)
+            except ParseLimitError as e:
+                files[path] = {'success': False, 'error': e.message}
+        
+        return fast_response({'files': files}, request.headers.get('accept'))
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/tree")
+async def get_repository_tree(repo_url: str, ref: str = "", extensions: str = "",
+                              min_size: int = 0, max_size: int = 0, entry_type: str = "blob",
+                              page: int = 1, per_page: int = 1000, stream: bool = False,
+                              github_service=Depends(find_github_service)):
+    """
+    Recursive listing of a whole repository, filtered and paginated
+    Example: /api/github/tree?repo_url=owner/name&extensions=.py,.pyi&max_size=100000&page=2
+    Pass stream=true to receive every matching entry as NDJSON instead of pages.
+    """
+    try:
+        entries = None
+        if github_service is not None:
+            entries = await run_in_threadpool(github_service.get_mirror_tree, repo_url, ref)
+        if entries is None:
+            entries = await async_github_client.get_tree(repo_url, ref)
+        
+        suffixes = tuple(ext.strip() for ext in extensions.split(',') if ext.strip())
+        selected = [
+            entry for entry in entries
+            if (not entry_type or entry['type'] == entry_type)
+            and (not suffixes or entry['path'].endswith(suffixes))
+            and (entry['size'] or 0) >= min_size
+            and (not max_size or (entry['size'] or 0) <= max_size)
+        ]
+        
+        if stream:
+            def ndjson():
+                for entry in selected:
+                    yield json.dumps(entry) + '\n'
+            return StreamingResponse(ndjson(), media_type='application/x-ndjson')
+        
+        per_page = max(1, min(per_page, 10000))
+        start = (max(page, 1) - 1) * per_page
+        return fast_response({
+            'total': len(selected),
+            'page': page,
+            'per_page': per_page,
+            'has_more': start + per_page < len(selected),
+            'entries': selected[start:start + per_page]
+        })
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/mirrors")
+async def track_repository(mirror_request: dict, github_service=Depends(get_github_service)):
+    """
+    Mirror a repository locally (or fetch it if already mirrored)
+    Expects: {'repo_url': 'owner/name'}
+    """
+    try:
+        if 'repo_url' not in mirror_request:
+            raise HTTPException(status_code=400, detail="Missing repo_url")
+        return await run_in_threadpool(github_service.track_repository, mirror_request['repo_url'])
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Mirroring failed: {str(e)}")
+
+@router.get("/mirrors")
+async def list_mirrors(github_service=Depends(get_github_service)):
+    """Locally mirrored repositories and read counters"""
+    if github_service.mirrors is None:
+        return {'enabled': False, 'tracked': []}
+    return {'enabled': True, **github_service.mirrors.metrics()}
+
+@router.get("/diff")
+async def diff_refs(repo_url: str, base: str, head: str = "", github_service=Depends(get_github_service)):
+    """
+    Files changed between two refs of a mirrored repository
+    Example: /api/github/diff?repo_url=owner/name&base=v1.0&head=main
+    """
+    try:
+        changes = await run_in_threadpool(github_service.diff_refs, repo_url, base, head)
+        return {'base': base, 'head': head or 'HEAD', 'changes': changes}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+# Declared before /repo/{repo_url:path}, whose path parameter would otherwise swallow "/contents"
 @router.get("/repo/{repo_url:path}/contents")
-async def get_repository_contents(repo_url: str, path: str = ""):
+async def get_repository_contents(repo_url: str, path: str = "", ref: str = ""):
     """Get contents of a repository path"""
     try:
-        contents = github_service.get_repo_contents(repo_url, path)
+        contents = await async_github_client.get_contents(repo_url, path, ref)
+        
+        if isinstance(contents, dict):
+            contents = [contents]
         
         # Format the response
         result = []
         for content in contents:
             result.append({
-                "name": content.name,
-                "path": content.path,
-                "type": content.type,  # 'file' or 'dir'
-                "size": content.size,
-                "download_url": content.download_url
+                "name": content['name'],
+                "path": content['path'],
+                "type": content['type'],  # 'file' or 'dir'
+                "size": content['size'],
+                "download_url": content.get('download_url')
             })
         
         return result
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/repo/{repo_url:path}")
+async def get_repository_info(repo_url: str):
+    """Get basic information about a repository"""
+    try:
+        repo = await async_github_client.get_repo(repo_url)
+        return {
+            "name": repo['full_name'],
+            "description": repo.get('description'),
+            "stars": repo.get('stargazers_count'),
+            "forks": repo.get('forks_count'),
+            "url": repo.get('html_url'),
+            "language": repo.get('language')
+        }
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
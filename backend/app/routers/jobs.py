@@ -0,0 +1,113 @@
+# app/routers/jobs.py
+import asyncio
+import json
+import os
+import time
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.services.job_service import job_service, TERMINAL_STATES
+
+router = APIRouter()
+
+STREAM_INTERVAL_SECONDS = float(os.getenv('JOB_STREAM_INTERVAL', 0.5))
+STREAM_HEARTBEAT_SECONDS = 15.0
+
+@router.post("")
+async def submit_job(job_request: dict):
+    """
+    Queue a docs, tests or analysis job and return its ID right away
+    Expects: {'kind': 'docs', 'payload': {'function_code': ..., 'function_name': ...}, 'priority': 'interactive'}
+    Payloads: docs/tests take one function or {'functions': [...]}; analysis takes {'repo_url', 'ref'} or {'code'}
+    """
+    try:
+        if 'kind' not in job_request or not isinstance(job_request.get('payload'), dict):
+            raise HTTPException(status_code=400, detail="Missing kind or payload")
+        
+        job = await run_in_threadpool(
+            job_service.submit,
+            job_request['kind'],
+            job_request['payload'],
+            job_request.get('priority', 'interactive')
+        )
+        return JSONResponse(status_code=200 if job['deduplicated'] else 202, content=job)
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Job submission failed: {str(e)}")
+
+@router.get("")
+async def list_jobs(status: str = "", kind: str = "", limit: int = 50):
+    """Most recent jobs, optionally filtered by status or kind"""
+    return {'jobs': await run_in_threadpool(job_service.list, status, kind, limit)}
+
+@router.get("/stats")
+async def get_job_stats():
+    """Job counts by status and worker pool state"""
+    return await run_in_threadpool(job_service.metrics)
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """Status and progress of a job"""
+    job = await run_in_threadpool(job_service.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Result of a finished job; 202 while it is still queued or running"""
+    job = await run_in_threadpool(job_service.get, job_id, True)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    if job['status'] == 'succeeded':
+        return {'id': job_id, 'kind': job['kind'], 'result': job['result']}
+    if job['status'] == 'failed':
+        raise HTTPException(status_code=500, detail=f"Job failed: {job['error']}")
+    if job['status'] == 'cancelled':
+        raise HTTPException(status_code=409, detail="Job was cancelled")
+    return JSONResponse(status_code=202, content={'id': job_id, 'status': job['status'], 'progress': job['progress']})
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    """
+    Server-sent events: a 'progress' event whenever status, progress or message
+    changes, then a final 'done' event (fetch the payload from /result)
+    """
+    if await run_in_threadpool(job_service.get, job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+
+    async def events():
+        last_state = None
+        last_sent = time.monotonic()
+        while not await request.is_disconnected():
+            job = await run_in_threadpool(job_service.get, job_id)
+            if job is None:
+                return
+            state = (job['status'], job['progress'], job['message'])
+            if state != last_state:
+                last_state = state
+                last_sent = time.monotonic()
+                event = 'done' if job['status'] in TERMINAL_STATES else 'progress'
+                yield f"event: {event}\ndata: {json.dumps(job)}\n\n"
+                if event == 'done':
+                    return
+            elif time.monotonic() - last_sent > STREAM_HEARTBEAT_SECONDS:
+                # Comment line keeps proxies from closing an idle stream
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(STREAM_INTERVAL_SECONDS)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.delete("/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued job, or ask a running one to stop at its next progress report"""
+    job = await run_in_threadpool(job_service.cancel, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
@@ -0,0 +1,74 @@
+# app/routers/search.py
+import time
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from app.services.semantic_index import semantic_search_service
+
+router = APIRouter()
+
+@router.post("/index")
+async def index_files(index_request: dict):
+    """
+    Add the functions of a set of Python files to the semantic index
+    (repositories analyzed through /api/github are indexed automatically)
+    Expects: {'repository': 'owner/name', 'files': {'path/to/module.py': 'python code content', ...}}
+    """
+    try:
+        files = index_request.get('files')
+        if not isinstance(files, dict) or not files:
+            raise HTTPException(status_code=400, detail="No files provided")
+
+        return await run_in_threadpool(
+            semantic_search_service.index_files,
+            index_request.get('repository') or 'local',
+            files
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Indexing failed: {str(e)}")
+
+@router.post("/query")
+async def search_functions(search_request: dict):
+    """
+    Indexed functions closest in meaning to a description or a code snippet
+    Expects: {'query': 'parse a config file', 'k': 10, 'repository': 'owner/name'}
+    """
+    try:
+        if not search_request.get('query'):
+            raise HTTPException(status_code=400, detail="No query provided")
+        k = int(search_request.get('k', 10))
+        if not 1 <= k <= 100:
+            raise HTTPException(status_code=400, detail="k must be between 1 and 100")
+
+        start = time.perf_counter()
+        results = await run_in_threadpool(
+            semantic_search_service.search,
+            search_request['query'],
+            k,
+            search_request.get('repository', ''),
+            bool(search_request.get('exact', False))
+        )
+
+        return {
+            'results': results,
+            'count': len(results),
+            'took_ms': round((time.perf_counter() - start) * 1000, 2)
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+@router.delete("/index")
+async def remove_repository(repository: str):
+    """Drop a repository's functions from the index"""
+    removed = await run_in_threadpool(semantic_search_service.remove_repository, repository)
+    return {'repository': repository, 'removed_functions': removed}
+
+@router.get("/stats")
+async def get_index_stats():
+    """Index size, encoder and partitioning"""
+    return semantic_search_service.stats()
@@ -1,11 +1,11 @@
 # app/routers/tests.py
-from fastapi import APIRouter, HTTPException
-from app.services.ai_service import ai_service
+from fastapi import APIRouter, Depends, HTTPException
+from app.services.registry import get_ai_service
 
 router = APIRouter()
 
 @router.post("/generate-test")
-async def generate_test_case(request: dict):
+async def generate_test_case(request: dict, ai_service=Depends(get_ai_service)):
     """
     Generate a test case for a function
     Expects: {'function_code': 'def func(...): ...', 'function_name': 'func'}
@@ -1,36 +1,65 @@
 # app/services/ai_service.py
-from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
-import torch
+import json
+import os
 import re
-from typing import Any
+import time
+from typing import Any, Dict, List
+from app.services.semantic_index import semantic_search_service
+
+# Sampling settings for docstring generation (overridable per call, e.g. greedy for evaluation)
+GENERATION_KWARGS = {
+    "max_new_tokens": 200,
+    "temperature": 0.4,
+    "do_sample": True,
+    "top_p": 0.92,
+    "repetition_penalty": 1.1,
+}
 
 class AIService:
     def __init__(self):
+        self.model_name = os.getenv("AI_MODEL_NAME", "bigcode/starcoderbase-1b")
+        # LoRA adapter saved by fine_tuning/train_lora.py (<output>/adapter)
+        self.lora_adapter = os.getenv("AI_LORA_ADAPTER")
+        self.merge_adapter = os.getenv("AI_LORA_MERGE", "false").lower() in ("1", "true", "yes")
+        self.prompt_format = None
+        if os.getenv("AI_ENABLE_MODEL", "true").lower() in ("0", "false", "no"):
+            print("📋 AI model disabled (AI_ENABLE_MODEL), using rule-based system")
+            self.generation_pipeline = None
+            self.tokenizer = None
+            self.model = None
+            return
         self.setup_models()
     
     def setup_models(self):
         """Initialize with authenticated StarCoder access"""
         try:
             print("🚀 Initializing dual-layer AI system with StarCoder...")
+            # Imported here: torch and transformers take seconds to import and
+            # processes that never generate text shouldn't need them installed
+            from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
+            import torch
             
             # First, try to load StarCoder with authentication
             try:
-                print("📦 Loading StarCoderbase-1b (gated model)...")
+                print(f"📦 Loading {self.model_name}...")
                 
                 # Load tokenizer and model with proper authentication
                 self.tokenizer = AutoTokenizer.from_pretrained(
-                    "bigcode/starcoderbase-1b",
+                    self.model_name,
                     token=True
                 )
                 
                 self.model = AutoModelForCausalLM.from_pretrained(
-                    "bigcode/starcoderbase-1b", 
+                    self.model_name, 
                     token=True,
                     device_map="auto",
                     torch_dtype=torch.float16,
                     trust_remote_code=True
                 )
                 
+                if self.lora_adapter:
+                    self._load_adapter()
+                
                 # Create generation pipeline without device parameter
                 self.generation_pipeline = pipeline(
                     "text-generation",
@@ -52,6 +81,24 @@ class AIService:
             self.generation_pipeline = None
             self.tokenizer = None
             self.model = None
+            self.prompt_format = None
+
+    def _load_adapter(self):
+        """Apply the fine-tuned LoRA adapter, merged into the base weights if requested"""
+        from peft import PeftModel
+        
+        print(f"🧩 Loading LoRA adapter from {self.lora_adapter}...")
+        self.model = PeftModel.from_pretrained(self.model, self.lora_adapter)
+        if self.merge_adapter:
+            # Merged weights generate at base-model speed, without the extra LoRA matmuls
+            self.model = self.model.merge_and_unload()
+            print("🧩 LoRA adapter merged into the base model")
+        
+        # The adapter was trained on a specific prompt format; reuse it
+        format_path = os.path.join(self.lora_adapter, "prompt_format.json")
+        if os.path.exists(format_path):
+            with open(format_path) as f:
+                self.prompt_format = json.load(f)
 
     # -------------------- LAYER 1: STARCODER AI GENERATION --------------------
     def _generate_with_local_ai(self, function_code: str, function_name: str) -> str:
@@ -61,57 +108,22 @@ class AIService:
             return None
             
         try:
-            # More specific prompt with examples
-            prompt = f"""# Write a Python docstring for this function:
-
-{function_code}
-
-# Example of good docstring format:
-\"\"\"
-Brief description of what the function does.
-
-Args:
-    param1: Description of first parameter
-    param2: Description of second parameter
-
-Returns:
-    Description of return value
-\"\"\"
-
-# Now write the docstring for the above function:
-\"\"\"
-"""
+            prompt = self._build_doc_prompt(function_code)
             
             print(f"🤖 Sending prompt to StarCoder for function: {function_name}")
             
             result = self.generation_pipeline(
                 prompt,
-                max_new_tokens=200,
                 num_return_sequences=1,
-                temperature=0.4,
-                do_sample=True,
-                top_p=0.92,
-                repetition_penalty=1.1,
                 pad_token_id=self.tokenizer.eos_token_id,
-                return_full_text=False
+                return_full_text=False,
+                **GENERATION_KWARGS
             )
             
             generated_text = result[0]['generated_text']
             print(f"🤖 StarCoder raw output ({len(generated_text)} chars): {generated_text[:200]}...")
             
-            # Extract content between triple quotes
-            doc_match = re.search(r'\"\"\"(.*?)\"\"\"', generated_text, re.DOTALL)
-            if doc_match:
-                docstring = doc_match.group(1).strip()
-                print(f"🤖 Extracted docstring ({len(docstring)} chars): {docstring[:100]}...")
-            else:
-                # If no triple quotes, use the generated text directly
-                docstring = generated_text.strip()
-                print(f"🤖 Using direct output as docstring ({len(docstring)} chars): {docstring[:100]}...")
-            
-            # Clean up comments and extra spaces
-            docstring = re.sub(r'^#.*$', '', docstring, flags=re.MULTILINE).strip()
-            docstring = re.sub(r'\n\s*\n', '\n\n', docstring)  # Remove extra blank lines
+            docstring = self._extract_docstring(generated_text)
             
             if self._is_ai_output_valid(docstring):
                 print("🎯 Using StarCoder-generated documentation!")
@@ -124,6 +136,68 @@ Returns:
             print(f"🤖 StarCoder generation failed: {e}")
             return None
 
+    def _build_doc_prompt(self, function_code: str) -> str:
+        """
+        Docstring prompt: the adapter's training format when fine-tuned, otherwise
+        few-shot with similar documented functions from the semantic index, or a template
+        """
+        if self.prompt_format:
+            # Fine-tuned adapter: reuse its training prompt (the answer opens with triple quotes)
+            return self.prompt_format["docstring"].format(input=function_code)
+        
+        # Documented functions similar to this one make better examples than a template
+        examples = semantic_search_service.few_shot_examples(function_code)
+        if examples:
+            shown = "\n\n".join(examples)
+            return f"""# Write a Python docstring for this function:
+
+{function_code}
+
+# Docstrings of similar functions from analyzed repositories:
+{shown}
+
+# Now write the docstring for the above function:
+\"\"\"
+"""
+        
+        # More specific prompt with examples
+        return f"""# Write a Python docstring for this function:
+
+{function_code}
+
+# Example of good docstring format:
+\"\"\"
+Brief description of what the function does.
+
+Args:
+    param1: Description of first parameter
+    param2: Description of second parameter
+
+Returns:
+    Description of return value
+\"\"\"
+
+# Now write the docstring for the above function:
+\"\"\"
+"""
+
+    def _extract_docstring(self, generated_text: str) -> str:
+        """Pull the docstring body out of raw model output"""
+        # Extract content between triple quotes
+        doc_match = re.search(r'\"\"\"(.*?)\"\"\"', generated_text, re.DOTALL)
+        if doc_match:
+            docstring = doc_match.group(1).strip()
+            print(f"🤖 Extracted docstring ({len(docstring)} chars): {docstring[:100]}...")
+        else:
+            # If no triple quotes, use the generated text directly
+            docstring = generated_text.strip()
+            print(f"🤖 Using direct output as docstring ({len(docstring)} chars): {docstring[:100]}...")
+        
+        # Clean up comments and extra spaces
+        docstring = re.sub(r'^#.*$', '', docstring, flags=re.MULTILINE).strip()
+        docstring = re.sub(r'\n\s*\n', '\n\n', docstring)  # Remove extra blank lines
+        return docstring
+
     def _is_ai_output_valid(self, docstring: str) -> bool:
         """
         ✅ LENIENT VALIDATION RULES:
@@ -302,6 +376,72 @@ Returns:
         print(f"📋 FALLBACK RESULT: {fallback_result[:100]}...")
         return fallback_result
 
+    def generate_documentation_batch(self, functions: List[Dict[str, str]], batch_size: int = 8,
+                                     **generation_overrides) -> List[Dict[str, Any]]:
+        """
+        generate_documentation over many {"code", "name"} items, sending
+        batch_size prompts per pipeline call. Each result records the source
+        ('ai' or 'rule_based'), whether the AI output passed validation, the
+        generated token count, the wall time of the pipeline call that produced
+        it (batch_ms, shared by its batch) and its share of that call
+        (latency_ms = batch_ms / batch size, plus any rule-based fallback).
+        """
+        kwargs = {**GENERATION_KWARGS, **generation_overrides}
+        if not kwargs.get("do_sample", False):
+            # Greedy decoding ignores them, and transformers warns for every call
+            kwargs.pop("temperature", None)
+            kwargs.pop("top_p", None)
+        if self.generation_pipeline and self.tokenizer.pad_token_id is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        if self.tokenizer is not None:
+            self.tokenizer.padding_side = "left"  # decoder-only models continue from the right edge
+
+        results = []
+        for start in range(0, len(functions), batch_size):
+            chunk = functions[start:start + batch_size]
+            outputs = [None] * len(chunk)
+            batch_seconds = 0.0
+            if self.generation_pipeline:
+                batch_start = time.perf_counter()
+                try:
+                    generated = self.generation_pipeline(
+                        [self._build_doc_prompt(item["code"]) for item in chunk],
+                        batch_size=len(chunk),
+                        num_return_sequences=1,
+                        pad_token_id=self.tokenizer.pad_token_id,
+                        return_full_text=False,
+                        **kwargs
+                    )
+                    outputs = [output[0]["generated_text"] for output in generated]
+                except Exception as e:
+                    print(f"🤖 StarCoder batch generation failed: {e}")
+                batch_seconds = time.perf_counter() - batch_start
+
+            for item, generated_text in zip(chunk, outputs):
+                record = {
+                    "name": item["name"],
+                    "source": "rule_based",
+                    "ai_attempted": generated_text is not None,
+                    "valid": False,
+                    "tokens_generated": 0,
+                    "batch_size": len(chunk),
+                    "batch_ms": batch_seconds * 1000,
+                    "latency_ms": batch_seconds * 1000 / len(chunk)
+                }
+                if generated_text is not None:
+                    record["tokens_generated"] = len(self.tokenizer(generated_text, add_special_tokens=False)["input_ids"])
+                    docstring = self._extract_docstring(generated_text)
+                    record["valid"] = self._is_ai_output_valid(docstring)
+                    if record["valid"]:
+                        record["source"] = "ai"
+                        record["documentation"] = f"\"\"\"\n{docstring}\n\"\"\""
+                if record["source"] == "rule_based":
+                    fallback_start = time.perf_counter()
+                    record["documentation"] = self._generate_rule_based_doc(item["code"], item["name"])
+                    record["latency_ms"] += (time.perf_counter() - fallback_start) * 1000
+                results.append(record)
+        return results
+
     # -------------------- SMART TEST GENERATION --------------------
     def generate_test(self, function_code: str, function_name: str) -> str:
         """Generate intelligent tests with better assertions"""
@@ -372,5 +512,10 @@ def test_{function_name}():
         else:
             return "This code performs operations."
 
-# Create global instance
-ai_service = AIService()
\ No newline at end of file
+
+def __getattr__(name):
+    # `from app.services.ai_service import ai_service` keeps working, built on first access
+    if name == 'ai_service':
+        from app.services.registry import get_ai_service
+        return get_ai_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
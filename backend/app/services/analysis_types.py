@@ -0,0 +1,91 @@
+# app/services/analysis_types.py
+from dataclasses import dataclass, fields
+from typing import Dict, List, Any
+
+
+class _RecordAccess:
+    """
+    Read-only mapping access for slotted records, so code written against
+    the original dict results (record['name'], 'metrics' in record) keeps working
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__dataclass_fields__
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def keys(self):
+        return self.__dataclass_fields__.keys()
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {}
+        for field in fields(self):
+            value = getattr(self, field.name)
+            result[field.name] = value.to_dict() if isinstance(value, _RecordAccess) else value
+        return result
+
+
+@dataclass(slots=True)
+class FunctionMetrics(_RecordAccess):
+    complexity: int
+    max_nesting: int
+    statements: int
+    params: int
+    loc: int
+
+
+@dataclass(slots=True)
+class FunctionInfo(_RecordAccess):
+    name: str
+    lineno: int
+    end_lineno: int
+    args: List[str]
+    docstring: str
+    calls: List[str]
+    metrics: FunctionMetrics
+
+
+@dataclass(slots=True)
+class FunctionSource(FunctionInfo):
+    """FunctionInfo plus its dedented source, from parse_python_file(include_source=True)"""
+    source: str
+    docstring_lineno: int  # 0 when the function has no docstring
+    docstring_end_lineno: int
+
+
+@dataclass(slots=True)
+class ClassInfo(_RecordAccess):
+    name: str
+    lineno: int
+    docstring: str
+
+
+@dataclass(slots=True)
+class ImportInfo(_RecordAccess):
+    type: str
+    module: str
+    alias: str
+
+
+@dataclass(slots=True)
+class FromImportInfo(_RecordAccess):
+    type: str
+    module: str
+    name: str
+    alias: str
+    level: int
+
+
+def to_plain(value: Any) -> Any:
+    """`default` hook for encoders that don't understand dataclasses"""
+    if isinstance(value, _RecordAccess):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
@@ -0,0 +1,223 @@
+# app/services/async_github.py
+import asyncio
+import base64
+import os
+from typing import Dict, List, Any, Optional
+import httpx
+from dotenv import load_dotenv
+from app.services.cache import TTLCache
+from app.services.github_service import github_response_cache, parse_repo_name
+from app.services.request_scheduler import RequestScheduler
+from app.services.text_decoding import FileTooLargeError, StreamDecoder, decode_bytes
+
+load_dotenv()
+
+
+class AsyncGitHubClient:
+    """
+    Non-blocking GitHub REST client for the async routes.
+
+    One pooled httpx.AsyncClient (keep-alive, optional HTTP/2) is shared by
+    every request, and a semaphore caps how many requests are in flight so
+    multi-file fan-out can't exhaust the pool or trip abuse limits.
+    """
+    def __init__(self):
+        self.access_token = os.getenv('GITHUB_ACCESS_TOKEN')
+        self.api_url = os.getenv('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+        self.max_connections = int(os.getenv('GITHUB_MAX_CONNECTIONS', 20))
+        self.max_keepalive = int(os.getenv('GITHUB_MAX_KEEPALIVE', self.max_connections))
+        self.concurrency = int(os.getenv('GITHUB_CONCURRENCY', 10))
+        self.http2 = os.getenv('GITHUB_HTTP2', '').lower() in ('1', 'true', 'yes')
+        self.inline_max_bytes = int(os.getenv('GITHUB_INLINE_MAX_BYTES', 1024 * 1024))
+        self.max_file_bytes = int(os.getenv('GITHUB_MAX_FILE_BYTES', 100 * 1024 * 1024))
+
+        self.repo_cache = TTLCache(
+            maxsize=int(os.getenv('GITHUB_REPO_CACHE_SIZE', 256)),
+            ttl=float(os.getenv('GITHUB_REPO_CACHE_TTL', 300))
+        )
+        # Same cache and ETags as GitHubService
+        self.responses = github_response_cache()
+        self.content_cache = self.responses.fresh
+
+        self.scheduler = RequestScheduler()
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _build_client(self) -> httpx.AsyncClient:
+        headers = {'Accept': 'application/vnd.github+json'}
+        if self.access_token:
+            headers['Authorization'] = f'token {self.access_token}'
+
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401  (httpx needs it for HTTP/2)
+            except ImportError:
+                print("GitHub HTTP/2 requested but the 'h2' package is missing; using HTTP/1.1")
+                http2 = False
+
+        return httpx.AsyncClient(
+            base_url=self.api_url,
+            headers=headers,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive
+            ),
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            follow_redirects=True
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the running event loop
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _send(self, path: str, params: Optional[Dict[str, str]] = None,
+                    headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        client = self.client
+
+        async def call() -> httpx.Response:
+            async with self._semaphore:
+                return await client.get(path, params=params, headers=headers)
+
+        # Identical concurrent requests (same path, params and validators) share one call
+        key = (path, tuple(sorted((params or {}).items())), tuple(sorted((headers or {}).items())))
+        return await self.scheduler.run(key, call)
+
+    async def get_json(self, path: str, params: Optional[Dict[str, str]] = None) -> Any:
+        """GET an API path as JSON through the response cache shared with GitHubService"""
+        key = self.responses.key(path, params)
+        cached = self.responses.get(key)
+        if cached is not None:
+            return cached
+
+        response = await self._send(path, params, self.responses.request_headers(key))
+        return self.responses.resolve(key, path, response)
+
+    # -------------------- REPOSITORY API --------------------
+    async def get_repo(self, repo_url: str) -> Dict[str, Any]:
+        """Repository metadata JSON (cached like GitHubService.get_repo)"""
+        repo_name = parse_repo_name(repo_url)
+        repo = self.repo_cache.get(repo_name)
+        if repo is None:
+            try:
+                repo = await self.get_json(f"/repos/{repo_name}")
+            except ValueError:
+                raise ValueError(f"Repository not found: {repo_url}")
+            self.repo_cache.set(repo_name, repo)
+        return repo
+
+    async def get_contents(self, repo_url: str, path: str = "", ref: str = "") -> Any:
+        repo_name = parse_repo_name(repo_url)
+        return await self.get_json(
+            f"/repos/{repo_name}/contents/{path.strip('/')}",
+            {'ref': ref} if ref else None
+        )
+
+    async def get_file_content(self, repo_url: str, file_path: str, ref: str = "") -> str:
+        """Same size-based routing as GitHubService.get_file_content"""
+        content = await self.get_contents(repo_url, file_path, ref)
+        if not isinstance(content, dict) or content.get('type') != 'file':
+            raise ValueError(f"Path {file_path} is a directory, not a file")
+        
+        size = content.get('size', 0)
+        if size > self.max_file_bytes:
+            raise FileTooLargeError(f"{file_path} is {size} bytes, above the {self.max_file_bytes} byte limit")
+        if size <= self.inline_max_bytes and content.get('encoding') == 'base64':
+            return decode_bytes(base64.b64decode(content['content']))
+        return await self._stream_blob(parse_repo_name(repo_url), content['sha'])
+    
+    async def _stream_blob(self, repo_name: str, sha: str) -> str:
+        decoder = StreamDecoder(self.max_file_bytes)
+        client = self.client
+        await self.scheduler.bucket.acquire()
+        async with self._semaphore:
+            async with client.stream('GET', f"/repos/{repo_name}/git/blobs/{sha}",
+                                     headers={'Accept': 'application/vnd.github.raw'}) as response:
+                self.scheduler.observe(response)
+                if response.status_code == 404:
+                    raise ValueError(f"Blob not found: {sha}")
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes(256 * 1024):
+                    decoder.feed(chunk)
+        return decoder.finish()
+
+    async def fetch_files(self, repo_url: str, paths: List[str], ref: str = "") -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch many files concurrently (bounded by the semaphore).
+        Returns {path: {'content': str}} or {path: {'error': str}} per file.
+        """
+        async def fetch(path: str):
+            try:
+                return path, {'content': await self.get_file_content(repo_url, path, ref)}
+            except Exception as e:
+                return path, {'error': str(e)}
+
+        results = await asyncio.gather(*(fetch(path) for path in paths))
+        return dict(results)
+
+    async def get_tree(self, repo_url: str, ref: str = "") -> List[Dict[str, Any]]:
+        """
+        Every entry of a repository tree in a handful of calls using the Git
+        Trees API with recursive=1. When GitHub truncates the response (very
+        large trees), the affected level is listed on its own and each
+        subtree is fetched recursively in parallel instead.
+        """
+        repo_name = parse_repo_name(repo_url)
+        if not ref:
+            ref = (await self.get_repo(repo_url))['default_branch']
+        return await self._walk_tree(repo_name, ref, "")
+
+    async def _walk_tree(self, repo_name: str, tree_sha: str, prefix: str) -> List[Dict[str, Any]]:
+        data = await self.get_json(f"/repos/{repo_name}/git/trees/{tree_sha}", {'recursive': '1'})
+        if not data.get('truncated'):
+            return [self._tree_entry(entry, prefix) for entry in data['tree']]
+
+        # Truncated: take this level only (always complete), then split by subtree
+        level = await self.get_json(f"/repos/{repo_name}/git/trees/{tree_sha}")
+        entries = [self._tree_entry(entry, prefix) for entry in level['tree']]
+        subtrees = [entry for entry in level['tree'] if entry['type'] == 'tree']
+        nested = await asyncio.gather(*(
+            self._walk_tree(repo_name, entry['sha'], f"{prefix}{entry['path']}/")
+            for entry in subtrees
+        ))
+        for subtree_entries in nested:
+            entries.extend(subtree_entries)
+        return entries
+
+    def _tree_entry(self, entry: Dict[str, Any], prefix: str) -> Dict[str, Any]:
+        return {
+            'path': prefix + entry['path'],
+            'type': entry['type'],  # 'blob', 'tree' or 'commit' (submodule)
+            'size': entry.get('size'),
+            'sha': entry['sha']
+        }
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return {
+            'repo_cache': self.repo_cache.stats(),
+            'content_cache': self.content_cache.stats(),
+            'scheduler': self.scheduler.metrics()
+        }
+
+    async def test_connection(self) -> str:
+        try:
+            response = await self._send("/user")
+            response.raise_for_status()
+            return f"Connected as: {response.json()['login']}"
+        except Exception as e:
+            return f"Connection failed: {e}"
+
+
+# Create a global instance
+async_github_client = AsyncGitHubClient()
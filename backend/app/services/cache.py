@@ -0,0 +1,122 @@
+# app/services/cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after `ttl` seconds.
+    Keeps hit/miss counters so callers can report cache effectiveness.
+    """
+    def __init__(self, maxsize: int = 256, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[0] < time.monotonic():
+                if entry is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Read an entry even if it has expired, without touching LRU order or counters"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            return default if entry is _MISSING else entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+            return default if entry is _MISSING else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class ConditionalCache:
+    """
+    JSON bodies of HTTP GETs keyed by (path, sorted params): returned without a
+    request while fresh, then revalidated with the stored ETag / Last-Modified
+    and reused on 304. Transport-agnostic, so blocking and async clients can
+    share one cache: send the request with request_headers(key), then hand the
+    response (requests or httpx, same interface) to resolve().
+    """
+    def __init__(self, maxsize: int = 2048, ttl: float = 60, validator_ttl: float = 7 * 24 * 3600):
+        # Served without any request while fresh...
+        self.fresh = TTLCache(maxsize=maxsize, ttl=ttl)
+        # ...and revalidated afterwards (304s don't count against the rate limit)
+        self.validators = TTLCache(maxsize=maxsize * 4, ttl=validator_ttl)
+
+    @staticmethod
+    def key(path: str, params: Optional[Dict[str, str]] = None) -> Hashable:
+        return (path, tuple(sorted((params or {}).items())))
+
+    def get(self, key: Hashable) -> Any:
+        """The cached body if still fresh, else None"""
+        return self.fresh.get(key)
+
+    def request_headers(self, key: Hashable) -> Dict[str, str]:
+        headers = {}
+        validator = self.validators.peek(key)
+        if validator is not None:
+            if validator['etag']:
+                headers['If-None-Match'] = validator['etag']
+            if validator['last_modified']:
+                headers['If-Modified-Since'] = validator['last_modified']
+        return headers
+
+    def resolve(self, key: Hashable, path: str, response) -> Any:
+        """Body for a response to a request sent with request_headers(key); ValueError on 404"""
+        validator = self.validators.peek(key)
+        if response.status_code == 304 and validator is not None:
+            self.fresh.set(key, validator['body'])
+            return validator['body']
+        if response.status_code == 404:
+            raise ValueError(f"Not found: {path}")
+        response.raise_for_status()
+
+        body = response.json()
+        self.fresh.set(key, body)
+        if response.headers.get('ETag') or response.headers.get('Last-Modified'):
+            self.validators.set(key, {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'body': body
+            })
+        return body
@@ -0,0 +1,285 @@
+# app/services/clone_detection.py
+import ast
+import re
+import zlib
+import numpy as np
+from typing import Dict, List, Any, Optional, Tuple
+from app.services.code_analysis import code_analysis_service
+
+# Mersenne prime used by the MinHash permutations; products stay below 2**64
+_PRIME = (1 << 61) - 1
+# Context nodes (Load/Store/Del) carry no structure, only noise
+_SKIPPED_NODES = (ast.expr_context,)
+
+
+def normalize_function(func_node: ast.AST) -> List[str]:
+    """
+    Flatten a function body into node-type tokens with identifiers and
+    literals abstracted, so renamed copies produce the same sequence
+    """
+    body = func_node.body
+    if (body and isinstance(body[0], ast.Expr)
+            and isinstance(body[0].value, ast.Constant)
+            and isinstance(body[0].value.value, str)):
+        body = body[1:]  # docstrings shouldn't affect similarity
+
+    tokens = [f"args:{len(func_node.args.args)}"]
+    stack = list(reversed(body))
+    while stack:
+        node = stack.pop()
+        if isinstance(node, _SKIPPED_NODES):
+            continue
+        if isinstance(node, ast.Constant):
+            tokens.append(f"Const:{type(node.value).__name__}")
+        elif isinstance(node, ast.Attribute):
+            tokens.append("Attr")
+        else:
+            tokens.append(type(node).__name__)
+        stack.extend(reversed(list(ast.iter_child_nodes(node))))
+    return tokens
+
+
+def identifier_profile(func_node: ast.AST) -> Tuple[str, ...]:
+    """
+    Attribute names and free names (globals, builtins, called functions) a
+    function uses, which normalize_function abstracts away. Two functions
+    with the same token stream but different profiles (session.get vs
+    session.delete) do different things. Locals and parameters are left out
+    so renamed copies still match; recursion is left out so a renamed
+    recursive copy does too.
+    """
+    args = func_node.args
+    local = {arg.arg for arg in args.posonlyargs + args.args + args.kwonlyargs}
+    local.update(arg.arg for arg in (args.vararg, args.kwarg) if arg is not None)
+    loaded = []
+    attributes = []
+    for node in ast.walk(func_node):
+        if isinstance(node, ast.Name):
+            if isinstance(node.ctx, ast.Load):
+                loaded.append(node.id)
+            else:
+                local.add(node.id)
+        elif isinstance(node, ast.Attribute):
+            attributes.append('.' + node.attr)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and node is not func_node:
+            local.add(node.name)
+        elif isinstance(node, ast.arg):
+            local.add(node.arg)
+    local.add(func_node.name)
+    return tuple(sorted(set(attributes) | {name for name in loaded if name not in local}))
+
+
+def shingle(tokens: List[str], k: int = 4) -> np.ndarray:
+    """Hash every k-gram of tokens to a 32-bit value"""
+    if len(tokens) < k:
+        grams = ['|'.join(tokens)]
+    else:
+        grams = ['|'.join(tokens[i:i + k]) for i in range(len(tokens) - k + 1)]
+    return np.unique(np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams)))
+
+
+class CloneIndex:
+    """
+    MinHash signatures with banded LSH buckets.
+
+    Each band of `rows` signature values is hashed into a bucket; functions
+    sharing any bucket are candidates, then verified by signature agreement.
+    With 16 bands x 8 rows the collision probability crosses 50% near a
+    Jaccard similarity of 0.7.
+    """
+    def __init__(self, num_perm: int = 128, bands: int = 16, threshold: float = 0.8,
+                 min_tokens: int = 20, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.min_tokens = min_tokens
+
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(bands)]
+        self._signatures: Dict[str, np.ndarray] = {}
+        self.metadata: Dict[str, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, func_node: ast.AST) -> Optional[np.ndarray]:
+        """MinHash signature of a function, or None if it is too small to compare"""
+        tokens = normalize_function(func_node)
+        if len(tokens) < self.min_tokens:
+            return None
+        hashes = shingle(tokens)
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME
+        return permuted.min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key: str, func_node: ast.AST, metadata: Optional[Dict[str, Any]] = None) -> bool:
+        """Index a function under `key`; returns False if it was too small to index"""
+        signature = self.signature(func_node)
+        if signature is None:
+            return False
+        if key in self._signatures:
+            self.remove(key)
+        self._signatures[key] = signature
+        self.metadata[key] = metadata or {}
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band].setdefault(band_key, []).append(key)
+        return True
+
+    def remove(self, key: str):
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        self.metadata.pop(key, None)
+        for band, band_key in self._band_keys(signature):
+            bucket = self._buckets[band].get(band_key)
+            if bucket is not None:
+                bucket.remove(key)
+                if not bucket:
+                    del self._buckets[band][band_key]
+
+    def similarity(self, first: np.ndarray, second: np.ndarray) -> float:
+        """Estimated Jaccard similarity: fraction of matching signature slots"""
+        return float(np.count_nonzero(first == second)) / first.size
+
+    def _candidates(self, signature: np.ndarray) -> set:
+        candidates = set()
+        for band, band_key in self._band_keys(signature):
+            candidates.update(self._buckets[band].get(band_key, ()))
+        return candidates
+
+    def query(self, func_node: ast.AST, threshold: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Indexed functions similar to `func_node`, best match first"""
+        signature = self.signature(func_node)
+        if signature is None:
+            return []
+        threshold = self.threshold if threshold is None else threshold
+        matches = []
+        for key in self._candidates(signature):
+            score = self.similarity(signature, self._signatures[key])
+            if score >= threshold:
+                matches.append((key, score))
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches
+
+    def clone_groups(self) -> List[Dict[str, Any]]:
+        """Connected groups of verified near-duplicates (union-find over bucket pairs)"""
+        parent = {key: key for key in self._signatures}
+
+        def find(key):
+            while parent[key] != key:
+                parent[key] = parent[parent[key]]
+                key = parent[key]
+            return key
+
+        best_score: Dict[str, float] = {}
+        for buckets in self._buckets:
+            for members in buckets.values():
+                if len(members) < 2:
+                    continue
+                first = members[0]
+                for other in members[1:]:
+                    if find(first) == find(other):
+                        continue
+                    score = self.similarity(self._signatures[first], self._signatures[other])
+                    if score >= self.threshold:
+                        root_first, root_other = find(first), find(other)
+                        parent[root_other] = root_first
+                        best_score[root_first] = max(score, best_score.get(root_first, 0.0),
+                                                     best_score.get(root_other, 0.0))
+
+        groups: Dict[str, List[str]] = {}
+        for key in self._signatures:
+            groups.setdefault(find(key), []).append(key)
+
+        result = []
+        for root, members in groups.items():
+            if len(members) < 2:
+                continue
+            result.append({
+                'similarity': round(best_score.get(root, 1.0), 3),
+                'members': [dict(self.metadata[key], key=key) for key in sorted(members)]
+            })
+        result.sort(key=lambda group: len(group['members']), reverse=True)
+        return result
+
+
+class CloneDetectionService:
+    """Repository clone detection and docstring reuse for cloned helpers"""
+    def __init__(self):
+        # Functions we already generated documentation for, keyed by a running id
+        self.documented = CloneIndex(threshold=0.9)
+        self._documentation: Dict[str, Dict[str, Any]] = {}
+        self.max_documented = 50_000
+
+    def find_clone_groups(self, files: Dict[str, str], threshold: float = 0.8) -> List[Dict[str, Any]]:
+        """
+        Clone groups across a set of files
+        Expects: {'path/to/module.py': 'python code content', ...}
+        """
+        index = CloneIndex(threshold=threshold)
+        for path, content in files.items():
+            for node in code_analysis_service.iter_function_nodes(content):
+                index.add(f"{path}:{node.lineno}", node, {
+                    'file': path,
+                    'name': node.name,
+                    'lineno': node.lineno
+                })
+        return index.clone_groups()
+
+    def _first_function(self, function_code: str) -> Optional[ast.AST]:
+        try:
+            return next(code_analysis_service.iter_function_nodes(function_code), None)
+        except Exception:
+            return None
+
+    def find_documented_clone(self, function_code: str, function_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Reuse documentation generated for a near-identical function.
+        Only clones with the same parameter names qualify, since the
+        docstring describes them by name, and with the same attributes and
+        free names, since the token stream alone can't tell session.get
+        from session.delete.
+        """
+        node = self._first_function(function_code)
+        if node is None:
+            return None
+        args = [arg.arg for arg in node.args.args]
+        profile = identifier_profile(node)
+        for key, score in self.documented.query(node):
+            entry = self._documentation[key]
+            if entry['args'] != args or entry['profile'] != profile:
+                continue
+            documentation = re.sub(rf"\b{re.escape(entry['function_name'])}\b", function_name,
+                                   entry['documentation'])
+            return {
+                'documentation': documentation,
+                'reused_from': entry['function_name'],
+                'similarity': round(score, 3)
+            }
+        return None
+
+    def remember_documentation(self, function_code: str, function_name: str, documentation: str):
+        if len(self._documentation) >= self.max_documented:
+            return
+        node = self._first_function(function_code)
+        if node is None:
+            return
+        key = str(len(self._documentation))
+        if self.documented.add(key, node):
+            self._documentation[key] = {
+                'function_name': function_name,
+                'args': [arg.arg for arg in node.args.args],
+                'profile': identifier_profile(node),
+                'documentation': documentation
+            }
+
+
+# Create a global instance
+clone_detection_service = CloneDetectionService()
@@ -1,10 +1,16 @@
 # app/services/code_analysis.py
 import ast
-import tree_sitter
-from tree_sitter import Language, Parser
+import textwrap
+from operator import attrgetter
 from pathlib import Path
 from typing import Dict, List, Any
 import os
+from app.services.analysis_types import (
+    FunctionInfo, FunctionSource, FunctionMetrics, ClassInfo, ImportInfo, FromImportInfo
+)
+from app.services.parse_limits import (
+    ParseLimitError, parse_limits, check_source, check_tree_depth, child_nodes, nested_children, parse_isolated
+)
 
 class CodeAnalysisService:
     def __init__(self):
@@ -15,7 +21,7 @@ class CodeAnalysisService:
         """Setup Tree-sitter parsers (we'll start with Python)"""
         try:
             # Create a languages directory if it doesn't exist
-            languages_dir = Path("app/services/languages")
+            languages_dir = Path(__file__).parent / "languages"
             languages_dir.mkdir(exist_ok=True)
             
             # For now, we'll use AST for Python. Tree-sitter setup can be added later for other languages.
@@ -25,51 +31,75 @@ class CodeAnalysisService:
         except Exception as e:
             print(f"Tree-sitter setup warning: {e}. Using standard AST parsing.")
     
-    def parse_python_file(self, code_content: str) -> Dict[str, Any]:
+    def parse_python_file(self, code_content: str, include_source: bool = False) -> Dict[str, Any]:
         """
-        Parse a Python file and extract its structure using AST
+        Parse a Python file and extract its structure using AST.
+        With include_source, functions are FunctionSource records carrying
+        their source text and docstring line span.
         """
         try:
-            tree = ast.parse(code_content)
+            try:
+                tree = ast.parse(code_content)
+            except (RecursionError, MemoryError):
+                raise ParseLimitError(422, "Code is too deeply nested to parse")
             
             functions = []
             classes = []
             imports = []
             
-            for node in ast.walk(tree):
+            # ast line numbers only count \n (and \r\n), unlike str.splitlines
+            lines = code_content.split('\n') if include_source else None
+            
+            # One depth-tracking pre-order walk doubles as the nesting-limit check
+            stack = [(tree, 1, 0)]
+            while stack:
+                node, depth, blocks = stack.pop()
+                children = nested_children(node, depth, blocks)
+                children.reverse()
+                stack.extend(children)
+                
                 # Extract function definitions
                 if isinstance(node, ast.FunctionDef):
-                    functions.append({
-                        'name': node.name,
-                        'lineno': node.lineno,
-                        'args': [arg.arg for arg in node.args.args],
-                        'docstring': ast.get_docstring(node) or ''
-                    })
+                    calls, metrics = self._scan_function(node)
+                    fields = dict(
+                        name=node.name,
+                        lineno=node.lineno,
+                        end_lineno=node.end_lineno,
+                        args=[arg.arg for arg in node.args.args],
+                        docstring=ast.get_docstring(node) or '',
+                        calls=calls,
+                        metrics=metrics
+                    )
+                    if include_source:
+                        functions.append(FunctionSource(**fields, **self._source_span(node, lines)))
+                    else:
+                        functions.append(FunctionInfo(**fields))
                 
                 # Extract class definitions
                 elif isinstance(node, ast.ClassDef):
-                    classes.append({
-                        'name': node.name,
-                        'lineno': node.lineno,
-                        'docstring': ast.get_docstring(node) or ''
-                    })
+                    classes.append(ClassInfo(
+                        name=node.name,
+                        lineno=node.lineno,
+                        docstring=ast.get_docstring(node) or ''
+                    ))
                 
                 # Extract imports
                 elif isinstance(node, ast.Import):
                     for alias in node.names:
-                        imports.append({
-                            'type': 'import',
-                            'module': alias.name,
-                            'alias': alias.asname or ''
-                        })
+                        imports.append(ImportInfo(
+                            type='import',
+                            module=alias.name,
+                            alias=alias.asname or ''
+                        ))
                 elif isinstance(node, ast.ImportFrom):
                     for alias in node.names:
-                        imports.append({
-                            'type': 'from_import',
-                            'module': node.module or '',
-                            'name': alias.name,
-                            'alias': alias.asname or ''
-                        })
+                        imports.append(FromImportInfo(
+                            type='from_import',
+                            module=node.module or '',
+                            name=alias.name,
+                            alias=alias.asname or '',
+                            level=node.level
+                        ))
             
             return {
                 'functions': functions,
@@ -78,6 +108,8 @@ class CodeAnalysisService:
                 'success': True
             }
             
+        except ParseLimitError:
+            raise
         except SyntaxError as e:
             return {
                 'success': False,
@@ -95,6 +127,110 @@ class CodeAnalysisService:
                 'imports': []
             }
     
+    def parse_python_file_bounded(self, code_content: str) -> Dict[str, Any]:
+        """
+        Parse untrusted input within the configured limits.
+        Large inputs are parsed in an isolated worker process.
+        Raises ParseLimitError (with an HTTP status) when a limit is exceeded.
+        """
+        check_source(code_content)
+        if len(code_content) >= parse_limits.isolate_chars:
+            return parse_isolated(code_content)
+        return self.parse_python_file(code_content)
+    
+    def iter_function_nodes(self, code_content: str):
+        """
+        Yield the function definition nodes of a Python file, applying the same
+        input limits as parse_python_file_bounded. Invalid code yields nothing.
+        """
+        check_source(code_content)
+        try:
+            tree = ast.parse(code_content)
+        except (RecursionError, MemoryError):
+            raise ParseLimitError(422, "Code is too deeply nested to parse")
+        except SyntaxError:
+            return
+        check_tree_depth(tree)
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                yield node
+    
+    def _source_span(self, func_node: ast.FunctionDef, lines: List[str]) -> Dict[str, Any]:
+        """Dedented source of a function (from the def line) and its docstring line span"""
+        first = func_node.body[0]
+        has_docstring = (isinstance(first, ast.Expr) and isinstance(first.value, ast.Constant)
+                         and isinstance(first.value.value, str))
+        return {
+            'source': textwrap.dedent('\n'.join(lines[func_node.lineno - 1:func_node.end_lineno])),
+            'docstring_lineno': first.lineno if has_docstring else 0,
+            'docstring_end_lineno': first.end_lineno if has_docstring else 0
+        }
+    
+    # Statements that open a new nesting level inside a function body
+    _BLOCK_NODES = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.With,
+                    ast.AsyncWith, ast.Try, ast.Match)
+    # Nodes that add one decision point to cyclomatic complexity
+    _BRANCH_NODES = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.IfExp,
+                     ast.ExceptHandler, ast.Assert, ast.comprehension, ast.match_case)
+    
+    def _scan_function(self, func_node: ast.AST):
+        """
+        Single pass over a function body collecting called names and metrics.
+        Nested functions, lambdas and classes are skipped; they get their own entry.
+        Returns (calls, metrics)
+        """
+        calls = []
+        seen = set()
+        complexity = 1
+        max_nesting = 0
+        statements = 0
+        
+        stack = [(child, 0) for child in func_node.body]
+        while stack:
+            node, depth = stack.pop()
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+                continue
+            
+            if isinstance(node, ast.stmt):
+                statements += 1
+            if isinstance(node, self._BRANCH_NODES):
+                complexity += 1 + (len(node.ifs) if isinstance(node, ast.comprehension) else 0)
+            elif isinstance(node, ast.BoolOp):
+                complexity += len(node.values) - 1
+            elif isinstance(node, ast.Call):
+                parts = []
+                target = node.func
+                while isinstance(target, ast.Attribute):
+                    parts.append(target.attr)
+                    target = target.value
+                if isinstance(target, ast.Name):
+                    parts.append(target.id)
+                    name = '.'.join(reversed(parts))
+                    if name not in seen:
+                        seen.add(name)
+                        calls.append(name)
+            
+            child_depth = depth
+            if isinstance(node, self._BLOCK_NODES):
+                child_depth = depth + 1
+                max_nesting = max(max_nesting, child_depth)
+            # An elif is an If alone in its parent's orelse; it stays at the parent's level
+            elif_node = (node.orelse[0] if isinstance(node, ast.If) and len(node.orelse) == 1
+                         and isinstance(node.orelse[0], ast.If) else None)
+            for child in child_nodes(node):
+                stack.append((child, depth if child is elif_node else child_depth))
+        
+        args = func_node.args
+        metrics = FunctionMetrics(
+            complexity=complexity,
+            max_nesting=max_nesting,
+            statements=statements,
+            params=(len(args.posonlyargs) + len(args.args) + len(args.kwonlyargs)
+                    + (args.vararg is not None) + (args.kwarg is not None)),
+            loc=(func_node.end_lineno or func_node.lineno) - func_node.lineno + 1
+        )
+        return calls, metrics
+    
     def analyze_repository_file(self, file_content: str, file_extension: str) -> Dict[str, Any]:
         """
         Analyze a code file based on its extension
@@ -121,19 +257,25 @@ class CodeAnalysisService:
         class_count = len(analysis_result['classes'])
         import_count = len(analysis_result['imports'])
         
-        summary = f"This code contains {func_count} function(s), {class_count} class(es), and {import_count} import(s)."
+        # Collect the pieces and join once so the cost stays linear in the symbol count
+        parts = [f"This code contains {func_count} function(s), {class_count} class(es), and {import_count} import(s)."]
         
         if func_count > 0:
-            summary += "\n\nFunctions:"
-            for func in analysis_result['functions']:
-                summary += f"\n- {func['name']}({', '.join(func['args'])})"
+            # Attribute access on the records; the mapping shim costs a getattr per key
+            functions = analysis_result['functions']
+            parts.append("\n\nFunctions:")
+            parts.extend([f"\n- {func.name}({', '.join(func.args)})" for func in functions])
+            
+            worst = max(functions, key=attrgetter('metrics.complexity'))
+            parts.append(f"\n\nMost complex function: {worst.name} "
+                         f"(cyclomatic complexity {worst.metrics.complexity}, "
+                         f"nesting depth {worst.metrics.max_nesting})")
         
         if class_count > 0:
-            summary += "\n\nClasses:"
-            for cls in analysis_result['classes']:
-                summary += f"\n- {cls['name']}"
+            parts.append("\n\nClasses:")
+            parts.extend(f"\n- {cls.name}" for cls in analysis_result['classes'])
         
-        return summary
+        return ''.join(parts)
 
 # Create a global instance
 code_analysis_service = CodeAnalysisService()
\ No newline at end of file
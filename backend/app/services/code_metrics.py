@@ -0,0 +1,141 @@
+# app/services/code_metrics.py
+import numpy as np
+from typing import Dict, List, Any, Sequence
+
+# Column order of the metric matrix; matches the keys of a function's 'metrics'
+METRIC_NAMES = ('complexity', 'max_nesting', 'statements', 'params', 'loc')
+
+
+class MetricsStore:
+    """
+    Repository-wide per-function metrics kept column-wise in NumPy.
+
+    Each metric is one contiguous int32 row of `self._data` (metrics x capacity),
+    so reports run as a handful of vectorized calls regardless of how many
+    functions have been added.
+    """
+    def __init__(self, initial_capacity: int = 1024):
+        self._data = np.zeros((len(METRIC_NAMES), initial_capacity), dtype=np.int32)
+        self._file_ids = np.zeros(initial_capacity, dtype=np.int32)
+        self._linenos = np.zeros(initial_capacity, dtype=np.int32)
+        self._names: List[str] = []
+        self._files: List[str] = []
+        self._file_index: Dict[str, int] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _reserve(self, extra: int):
+        needed = self._size + extra
+        capacity = self._data.shape[1]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        data = np.zeros((len(METRIC_NAMES), capacity), dtype=np.int32)
+        data[:, :self._size] = self._data[:, :self._size]
+        self._data = data
+        self._file_ids = np.resize(self._file_ids, capacity)
+        self._linenos = np.resize(self._linenos, capacity)
+
+    def add_analysis(self, file_path: str, analysis_result: Dict[str, Any]):
+        """
+        Append the functions of one `parse_python_file` result.
+        Re-adding a file replaces its previous rows.
+        """
+        if file_path in self._file_index:
+            self.remove_file(file_path)
+
+        functions = [f for f in analysis_result.get('functions', []) if 'metrics' in f]
+        if not functions:
+            return
+
+        file_id = len(self._files)
+        self._files.append(file_path)
+        self._file_index[file_path] = file_id
+
+        count = len(functions)
+        self._reserve(count)
+        start, end = self._size, self._size + count
+        self._data[:, start:end] = np.array(
+            [[f['metrics'][name] for name in METRIC_NAMES] for f in functions],
+            dtype=np.int32
+        ).T
+        self._file_ids[start:end] = file_id
+        self._linenos[start:end] = [f['lineno'] for f in functions]
+        self._names.extend(f['name'] for f in functions)
+        self._size = end
+
+    def remove_file(self, file_path: str):
+        """Drop a file's rows with one boolean-mask compaction"""
+        file_id = self._file_index.pop(file_path, None)
+        if file_id is None:
+            return
+        keep = self._file_ids[:self._size] != file_id
+        kept = int(keep.sum())
+        self._data[:, :kept] = self._data[:, :self._size][:, keep]
+        self._file_ids[:kept] = self._file_ids[:self._size][keep]
+        self._linenos[:kept] = self._linenos[:self._size][keep]
+        self._names = [name for name, k in zip(self._names, keep) if k]
+        self._size = kept
+
+    def column(self, metric: str) -> np.ndarray:
+        """Read-only view of one metric across all stored functions"""
+        if metric not in METRIC_NAMES:
+            raise ValueError(f"Unknown metric: {metric}")
+        view = self._data[METRIC_NAMES.index(metric), :self._size]
+        view.flags.writeable = False
+        return view
+
+    def percentiles(self, q: Sequence[float] = (50, 75, 90, 95, 99)) -> Dict[str, Dict[str, float]]:
+        """Percentiles of every metric in a single np.percentile call"""
+        if self._size == 0:
+            return {}
+        values = np.percentile(self._data[:, :self._size], q, axis=1)
+        return {
+            metric: {f"p{p:g}": float(values[i, m]) for i, p in enumerate(q)}
+            for m, metric in enumerate(METRIC_NAMES)
+        }
+
+    def histogram(self, metric: str, bins: int = 10) -> Dict[str, List[float]]:
+        column = self.column(metric)
+        if column.size == 0:
+            return {'counts': [], 'edges': []}
+        counts, edges = np.histogram(column, bins=bins)
+        return {'counts': counts.tolist(), 'edges': edges.tolist()}
+
+    def top(self, metric: str, n: int = 10) -> List[Dict[str, Any]]:
+        """Top-N hot spots for a metric using argpartition (no full sort)"""
+        column = self.column(metric)
+        n = max(0, min(n, column.size))  # a negative n would select from the wrong end
+        if n == 0:
+            return []
+        candidates = np.argpartition(column, -n)[-n:]
+        ordered = candidates[np.argsort(column[candidates])[::-1]]
+        return [
+            {
+                'name': self._names[i],
+                'file': self._files[self._file_ids[i]],
+                'lineno': int(self._linenos[i]),
+                metric: int(column[i])
+            }
+            for i in ordered
+        ]
+
+    def report(self, top_n: int = 10, bins: int = 10) -> Dict[str, Any]:
+        """Summary used by the API: totals, percentiles, histograms and hot spots"""
+        data = self._data[:, :self._size]
+        return {
+            'function_count': self._size,
+            'file_count': len(self._file_index),
+            'totals': {metric: int(total) for metric, total in zip(METRIC_NAMES, data.sum(axis=1))},
+            'means': {metric: float(mean) for metric, mean in zip(METRIC_NAMES, data.mean(axis=1))} if self._size else {},
+            'percentiles': self.percentiles(),
+            'histograms': {metric: self.histogram(metric, bins) for metric in METRIC_NAMES},
+            'hot_spots': {
+                'complexity': self.top('complexity', top_n),
+                'max_nesting': self.top('max_nesting', top_n),
+                'loc': self.top('loc', top_n)
+            }
+        }
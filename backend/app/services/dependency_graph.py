@@ -0,0 +1,398 @@
+# app/services/dependency_graph.py
+from array import array
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+
+def module_name_from_path(file_path: str) -> str:
+    """
+    Turn a repository-relative file path into a dotted module name
+    Example: app/services/code_analysis.py -> app.services.code_analysis
+    """
+    name = file_path.replace('\\', '/').strip('/')
+    if name.endswith('.py'):
+        name = name[:-3]
+    name = name.replace('/', '.')
+    if name.endswith('.__init__'):
+        name = name[:-len('.__init__')]
+    return name
+
+
+class _Adjacency:
+    """
+    Directed edges stored as one array('I') of target ids per node,
+    mirrored by a reverse array per node for dependent lookups
+    """
+    def __init__(self):
+        self.out: List[array] = []
+        self.rev: List[array] = []
+        self.edge_count = 0
+
+    def grow(self, node_count: int):
+        while len(self.out) < node_count:
+            self.out.append(array('I'))
+            self.rev.append(array('I'))
+
+    def set_edges(self, source: int, targets):
+        """Replace all out-edges of `source`, keeping reverse arrays in sync"""
+        for old in self.out[source]:
+            self.rev[old].remove(source)
+        self.edge_count -= len(self.out[source])
+
+        new_targets = array('I', sorted(set(targets)))
+        self.out[source] = new_targets
+        for target in new_targets:
+            self.rev[target].append(source)
+        self.edge_count += len(new_targets)
+
+
+class DependencyGraph:
+    """
+    Cross-file import and call graph built from `parse_python_file` results.
+
+    Modules and definitions share one integer id space. Import edges link
+    modules, call edges link definitions ('pkg.module:function'). Call
+    resolution is approximate: methods are keyed by name within their module.
+    """
+    def __init__(self):
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._active = bytearray()
+        self._owner = array('i')  # module id owning each definition, -1 for modules
+
+        self.imports = _Adjacency()
+        self.calls = _Adjacency()
+
+        # Per-file raw data needed to re-resolve edges incrementally
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._module_files: Dict[int, str] = {}
+        # Module name -> files holding unresolved references to it
+        self._pending: Dict[str, Set[str]] = {}
+
+    # -------------------- ID TABLE --------------------
+    def _intern(self, name: str, owner: int = -1) -> int:
+        node_id = self._ids.get(name)
+        if node_id is None:
+            node_id = len(self._names)
+            self._names.append(name)
+            self._ids[name] = node_id
+            self._active.append(0)
+            self._owner.append(owner)
+            self.imports.grow(node_id + 1)
+            self.calls.grow(node_id + 1)
+        else:
+            self._owner[node_id] = owner
+        return node_id
+
+    def _lookup(self, name: str) -> Optional[int]:
+        node_id = self._ids.get(name)
+        if node_id is not None and self._active[node_id]:
+            return node_id
+        return None
+
+    # -------------------- BUILDING --------------------
+    def add_files(self, analyses: Dict[str, Dict[str, Any]]):
+        """
+        Add many analyzed files at once
+        Expects: {file_path: parse_python_file(...) result}
+        """
+        for file_path, analysis in analyses.items():
+            self._register_file(file_path, analysis)
+        for file_path in analyses:
+            self._resolve_file(file_path)
+
+    def update_file(self, file_path: str, analysis: Dict[str, Any]):
+        """
+        Re-index a single changed file and re-resolve only the files whose
+        edges can be affected by it
+        """
+        affected = self._register_file(file_path, analysis)
+        affected.add(file_path)
+        for path in affected:
+            if path in self._files:
+                self._resolve_file(path)
+
+    def remove_file(self, file_path: str):
+        """Drop a file and re-resolve the files that referenced it"""
+        entry = self._files.pop(file_path, None)
+        if entry is None:
+            return
+        affected = self._deactivate(entry)
+        self._module_files.pop(entry['module_id'], None)
+        for path in affected:
+            if path in self._files:
+                self._resolve_file(path)
+
+    def _register_file(self, file_path: str, analysis: Dict[str, Any]) -> Set[str]:
+        """Create nodes for a file; returns the files that must be re-resolved"""
+        affected: Set[str] = set()
+        previous = self._files.get(file_path)
+        if previous is not None:
+            affected |= self._deactivate(previous)
+
+        module = module_name_from_path(file_path)
+        module_id = self._intern(module)
+        self._active[module_id] = 1
+        self._module_files[module_id] = file_path
+
+        definitions = {}
+        for func in analysis.get('functions', []):
+            def_id = self._intern(f"{module}:{func['name']}", owner=module_id)
+            self._active[def_id] = 1
+            # Same-named methods collapse into one node; merge their calls
+            definitions.setdefault(def_id, []).extend(func.get('calls', []))
+
+        self._files[file_path] = {
+            'module': module,
+            'module_id': module_id,
+            'is_package': file_path.replace('\\', '/').endswith('__init__.py'),
+            'imports': analysis.get('imports', []),
+            'definitions': definitions
+        }
+
+        for name in [n for n in self._pending if n == module or n.startswith(module + '.')]:
+            affected |= self._pending.pop(name)
+        for source in self.imports.rev[module_id]:
+            affected.add(self._file_of(source))
+        return affected
+
+    def _deactivate(self, entry: Dict[str, Any]) -> Set[str]:
+        """Remove a file's edges and nodes; returns files that pointed at them"""
+        affected = set()
+        module_id = entry['module_id']
+        for def_id in entry['definitions']:
+            for caller in self.calls.rev[def_id]:
+                affected.add(self._file_of(caller))
+            self.calls.set_edges(def_id, ())
+            self._active[def_id] = 0
+        for importer in self.imports.rev[module_id]:
+            affected.add(self._file_of(importer))
+        self.imports.set_edges(module_id, ())
+        self._active[module_id] = 0
+        affected.discard(None)
+        return affected
+
+    def _file_of(self, node_id: int) -> Optional[str]:
+        owner = self._owner[node_id]
+        return self._module_files.get(node_id if owner < 0 else owner)
+
+    # -------------------- RESOLUTION --------------------
+    def _resolve_file(self, file_path: str):
+        entry = self._files[file_path]
+        module = entry['module']
+        bindings: Dict[str, Tuple[str, Optional[str]]] = {}
+        import_targets = set()
+
+        for imp in entry['imports']:
+            if imp['type'] == 'import':
+                target = self._resolve_module(imp['module'], file_path)
+                if imp['alias']:
+                    bindings[imp['alias']] = (imp['module'], None)
+                else:
+                    head = imp['module'].split('.')[0]
+                    bindings[head] = (head, None)
+            else:
+                base = self._absolute_module(entry, imp['module'], imp.get('level', 0))
+                submodule = f"{base}.{imp['name']}" if base else imp['name']
+                if self._lookup(submodule) is not None:
+                    target = self._lookup(submodule)
+                    bindings[imp['alias'] or imp['name']] = (submodule, None)
+                else:
+                    target = self._resolve_module(base, file_path)
+                    bindings[imp['alias'] or imp['name']] = (base, imp['name'])
+            if target is not None and target != entry['module_id']:
+                import_targets.add(target)
+
+        self.imports.set_edges(entry['module_id'], import_targets)
+
+        for def_id, calls in entry['definitions'].items():
+            targets = set()
+            for call in calls:
+                target = self._resolve_call(call, module, bindings, file_path)
+                if target is not None:
+                    targets.add(target)
+            self.calls.set_edges(def_id, targets)
+
+    def _absolute_module(self, entry: Dict[str, Any], module: str, level: int) -> str:
+        """Resolve `from ..x import y` style relative imports"""
+        if not level:
+            return module
+        parts = entry['module'].split('.')
+        if not entry['is_package']:
+            parts = parts[:-1]
+        if level > 1:
+            parts = parts[:-(level - 1)] if level - 1 < len(parts) else []
+        if module:
+            parts.append(module)
+        return '.'.join(parts)
+
+    def _resolve_module(self, dotted: str, file_path: str) -> Optional[int]:
+        """Map an imported name to the longest known module prefix"""
+        parts = dotted.split('.') if dotted else []
+        if dotted and self._lookup(dotted) is None:
+            # Watch the full name so a later, more specific module re-links us
+            self._pending.setdefault(dotted, set()).add(file_path)
+        for end in range(len(parts), 0, -1):
+            node_id = self._lookup('.'.join(parts[:end]))
+            if node_id is not None:
+                return node_id
+        return None
+
+    def _resolve_def(self, module: str, name: str, file_path: str) -> Optional[int]:
+        node_id = self._lookup(f"{module}:{name}")
+        if node_id is None:
+            self._pending.setdefault(module, set()).add(file_path)
+        return node_id
+
+    def _resolve_call(self, call: str, module: str, bindings, file_path: str) -> Optional[int]:
+        parts = call.split('.')
+        head = parts[0]
+
+        if head in ('self', 'cls') and len(parts) == 2:
+            return self._lookup(f"{module}:{parts[1]}")
+
+        if head not in bindings:
+            if len(parts) == 1:
+                return self._lookup(f"{module}:{head}")
+            return None
+
+        bound_module, bound_name = bindings[head]
+        if bound_name is not None:
+            # `from m import f` then `f()`; attribute calls on it are not followed
+            if len(parts) == 1:
+                return self._resolve_def(bound_module, bound_name, file_path)
+            return None
+
+        if len(parts) == 1:
+            return None
+        # `import a.b` then `a.b.f()`: longest module prefix, then the function
+        path = [bound_module] + parts[1:-1]
+        for end in range(len(path), 0, -1):
+            candidate = '.'.join(path[:end])
+            if self._lookup(candidate) is not None:
+                if end == len(path):
+                    return self._resolve_def(candidate, parts[-1], file_path)
+                return None
+        self._pending.setdefault('.'.join(path), set()).add(file_path)
+        return None
+
+    # -------------------- QUERIES --------------------
+    def _adjacency(self, kind: str) -> _Adjacency:
+        if kind == 'imports':
+            return self.imports
+        if kind == 'calls':
+            return self.calls
+        raise ValueError(f"Unknown edge kind: {kind}")
+
+    def _require(self, name: str) -> int:
+        node_id = self._lookup(name)
+        if node_id is None:
+            raise KeyError(f"Unknown module or definition: {name}")
+        return node_id
+
+    def dependencies(self, name: str, kind: str = 'imports') -> List[str]:
+        """Direct targets of `name` (modules it imports or functions it calls)"""
+        adjacency = self._adjacency(kind)
+        return [self._names[i] for i in adjacency.out[self._require(name)]]
+
+    def dependents(self, name: str, kind: str = 'imports') -> List[str]:
+        """Direct sources pointing at `name`"""
+        adjacency = self._adjacency(kind)
+        return [self._names[i] for i in adjacency.rev[self._require(name)]]
+
+    def transitive_dependencies(self, name: str, kind: str = 'imports') -> List[str]:
+        return self._closure(self._require(name), self._adjacency(kind).out)
+
+    def transitive_dependents(self, name: str, kind: str = 'imports') -> List[str]:
+        return self._closure(self._require(name), self._adjacency(kind).rev)
+
+    def _closure(self, start: int, edges: List[array]) -> List[str]:
+        visited = bytearray(len(self._names))
+        visited[start] = 1
+        stack = [start]
+        result = []
+        while stack:
+            node = stack.pop()
+            for target in edges[node]:
+                if not visited[target]:
+                    visited[target] = 1
+                    result.append(self._names[target])
+                    stack.append(target)
+        return result
+
+    def cycles(self, kind: str = 'imports') -> List[List[str]]:
+        """
+        Strongly connected components with more than one node (or a self-loop),
+        found with an iterative Tarjan pass so deep graphs don't hit the
+        recursion limit
+        """
+        edges = self._adjacency(kind).out
+        count = len(self._names)
+        index = array('i', [-1]) * count
+        low = array('i', [0]) * count
+        on_stack = bytearray(count)
+        stack: List[int] = []
+        components = []
+        counter = 0
+
+        for root in range(count):
+            if index[root] != -1 or not self._active[root]:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, position = work.pop()
+                if position == 0:
+                    index[node] = low[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack[node] = 1
+                recurse = False
+                targets = edges[node]
+                while position < len(targets):
+                    target = targets[position]
+                    position += 1
+                    if index[target] == -1:
+                        work.append((node, position))
+                        work.append((target, 0))
+                        recurse = True
+                        break
+                    if on_stack[target]:
+                        low[node] = min(low[node], index[target])
+                if recurse:
+                    continue
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in edges[node]:
+                        components.append(sorted(self._names[i] for i in component))
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+        return components
+
+    def modules(self) -> List[str]:
+        return sorted(self._names[i] for i in self._module_files)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'files': len(self._files),
+            'nodes': sum(self._active),
+            'import_edges': self.imports.edge_count,
+            'call_edges': self.calls.edge_count
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable view used by the API"""
+        return {
+            'modules': self.modules(),
+            'imports': {
+                self._names[i]: self.dependencies(self._names[i])
+                for i in sorted(self._module_files)
+            },
+            'import_cycles': self.cycles('imports'),
+            'stats': self.stats()
+        }
@@ -1,14 +1,54 @@
 # app/services/github_service.py
 import os
-from github import Github, GithubException
-from github.Repository import Repository
-from github.ContentFile import ContentFile
-import requests
+import base64
+import tarfile
+import threading
+from urllib.parse import quote
+from typing import TYPE_CHECKING, Callable, Dict, List, Any, Iterator, Optional, Tuple
 from dotenv import load_dotenv
+from app.services.cache import ConditionalCache, TTLCache
+from app.services.code_analysis import code_analysis_service
+from app.services.mirror_store import MirrorStore
+from app.services.parse_limits import ParseLimitError
+from app.services.semantic_index import semantic_search_service
+from app.services.text_decoding import FileTooLargeError, StreamDecoder, decode_bytes
+
+if TYPE_CHECKING:
+    import requests
+    from github.Repository import Repository
 
 # Load environment variables from .env file
 load_dotenv()
 
+def parse_repo_name(repo_url: str) -> str:
+    """
+    Extract owner/repo from a repository URL
+    Example: https://github.com/username/repo-name -> username/repo-name
+    """
+    if "github.com/" in repo_url:
+        path_parts = repo_url.split("github.com/")[1].split("/")
+        return f"{path_parts[0]}/{path_parts[1]}"
+    return repo_url  # Assume it's already in owner/repo format
+
+
+_response_cache: Optional[ConditionalCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def github_response_cache() -> ConditionalCache:
+    """
+    API responses with their ETags, shared by GitHubService and
+    AsyncGitHubClient so a body fetched by one is revalidated, not re-downloaded, by the other
+    """
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ConditionalCache(
+                maxsize=int(os.getenv('GITHUB_CONTENT_CACHE_SIZE', 2048)),
+                ttl=float(os.getenv('GITHUB_CONTENT_CACHE_TTL', 60))
+            )
+        return _response_cache
+
 class GitHubService:
     def __init__(self):
         # Get the token from environment variables
@@ -17,24 +57,72 @@ class GitHubService:
         if not self.access_token:
             raise ValueError("GitHub access token not found. Please set GITHUB_ACCESS_TOKEN in your .env file")
         
+        # API root; override to point at GitHub Enterprise or a local stand-in
+        self.api_url = os.getenv('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+        
+        # Imported here: PyGithub and requests are only needed once a service exists
+        import requests
+        from github import Github
+        
         # Initialize PyGithub client
-        self.g = Github(self.access_token)
+        self.g = Github(self.access_token, base_url=self.api_url)
+        
+        # Plain HTTP session for endpoints PyGithub doesn't stream (archives)
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Authorization': f'token {self.access_token}',
+            'Accept': 'application/vnd.github+json'
+        })
+        
+        # Repository objects are reused for a few minutes instead of re-fetched per call
+        self.repo_cache = TTLCache(
+            maxsize=int(os.getenv('GITHUB_REPO_CACHE_SIZE', 256)),
+            ttl=float(os.getenv('GITHUB_REPO_CACHE_TTL', 300))
+        )
+        # Content responses: fresh bodies without a request, then ETag / Last-Modified revalidation
+        self.responses = github_response_cache()
+        self.content_cache = self.responses.fresh
+        
+        self._stats_lock = threading.Lock()
+        self.request_stats = {'requests': 0, 'not_modified': 0, 'rate_limit_used': 0}
+        self.rate_limit: Dict[str, Optional[int]] = {'limit': None, 'remaining': None, 'reset': None}
+        
+        # Files up to this size are decoded from the Contents API response; larger
+        # ones are streamed raw from the blobs API. Nothing above the max is fetched.
+        self.inline_max_bytes = int(os.getenv('GITHUB_INLINE_MAX_BYTES', 1024 * 1024))
+        self.max_file_bytes = int(os.getenv('GITHUB_MAX_FILE_BYTES', 100 * 1024 * 1024))
+        
+        # Optional local bare mirrors; tracked repositories are served without API calls
+        mirror_dir = os.getenv('GITHUB_MIRROR_DIR')
+        self.mirrors = MirrorStore(
+            mirror_dir,
+            url_template=os.getenv('GITHUB_MIRROR_URL', 'https://github.com/{repo}.git'),
+            access_token=self.access_token,
+            fetch_interval=float(os.getenv('GITHUB_MIRROR_FETCH_INTERVAL', 60))
+        ) if mirror_dir else None
     
-    def get_repo(self, repo_url: str) -> Repository:
+    def parse_repo_name(self, repo_url: str) -> str:
+        """
+        Extract owner/repo from a repository URL
+        Example: https://github.com/username/repo-name -> username/repo-name
+        """
+        return parse_repo_name(repo_url)
+    
+    def get_repo(self, repo_url: str) -> "Repository":
         """
         Get a GitHub repository by URL
         Example: https://github.com/username/repo-name -> username/repo-name
         """
+        from github import GithubException
+        
         try:
-            # Extract owner/repo from URL
-            if "github.com/" in repo_url:
-                path_parts = repo_url.split("github.com/")[1].split("/")
-                repo_name = f"{path_parts[0]}/{path_parts[1]}"
-            else:
-                repo_name = repo_url  # Assume it's already in owner/repo format
+            repo_name = self.parse_repo_name(repo_url)
             
-            # Get the repository
-            repo = self.g.get_repo(repo_name)
+            repo = self.repo_cache.get(repo_name)
+            if repo is None:
+                # Get the repository
+                repo = self.g.get_repo(repo_name)
+                self.repo_cache.set(repo_name, repo)
             return repo
             
         except GithubException as e:
@@ -43,35 +131,223 @@ class GitHubService:
             else:
                 raise Exception(f"GitHub API error: {e}")
     
-    def get_repo_contents(self, repo_url: str, path: str = ""):
+    def _record_response(self, response: "requests.Response"):
+        """Track request counts and the rate-limit budget reported by GitHub"""
+        with self._stats_lock:
+            self.request_stats['requests'] += 1
+            if response.status_code == 304:
+                self.request_stats['not_modified'] += 1
+            remaining = response.headers.get('X-RateLimit-Remaining')
+            if remaining is not None:
+                previous = self.rate_limit['remaining']
+                self.rate_limit = {
+                    'limit': int(response.headers.get('X-RateLimit-Limit', 0)),
+                    'remaining': int(remaining),
+                    'reset': int(response.headers.get('X-RateLimit-Reset', 0))
+                }
+                if previous is not None and int(remaining) < previous:
+                    self.request_stats['rate_limit_used'] += previous - int(remaining)
+    
+    def _conditional_get(self, path: str, params: Optional[Dict[str, str]] = None) -> Any:
+        """
+        GET an API path as JSON. Fresh cached bodies are returned without a request;
+        stale ones are revalidated with If-None-Match / If-Modified-Since and reused on 304.
+        """
+        key = self.responses.key(path, params)
+        cached = self.responses.get(key)
+        if cached is not None:
+            return cached
+        
+        response = self.session.get(f"{self.api_url}{path}", params=params,
+                                    headers=self.responses.request_headers(key), timeout=30)
+        self._record_response(response)
+        return self.responses.resolve(key, path, response)
+    
+    def get_repo_contents(self, repo_url: str, path: str = "", ref: str = "") -> Any:
         """
-        Get contents of a repository (files and directories)
+        Get contents of a repository (files and directories) as Contents API JSON
         """
         try:
-            repo = self.get_repo(repo_url)
-            contents = repo.get_contents(path)
-            return contents
+            repo_name = self.parse_repo_name(repo_url)
+            return self._conditional_get(
+                f"/repos/{repo_name}/contents/{path.strip('/')}",
+                {'ref': ref} if ref else None
+            )
             
         except Exception as e:
             raise Exception(f"Failed to get repository contents: {e}")
     
-    def get_file_content(self, repo_url: str, file_path: str) -> str:
+    def get_file_content(self, repo_url: str, file_path: str, ref: str = "") -> str:
         """
-        Get the content of a specific file from a repository
+        Get the content of a specific file from a repository.
+        Small files come inline from the Contents API; large ones are streamed
+        from the blobs API. The encoding is detected rather than assumed.
         """
         try:
-            repo = self.get_repo(repo_url)
-            file_content = repo.get_contents(file_path)
+            mirrored = self._mirrored(repo_url)
+            if mirrored:
+                return decode_bytes(self.mirrors.read_blob(mirrored, file_path, ref), self.max_file_bytes)
             
-            if isinstance(file_content, ContentFile):
-                # Decode the content from bytes to string
-                return file_content.decoded_content.decode('utf-8')
-            else:
+            file_content = self.get_repo_contents(repo_url, file_path, ref)
+            
+            if not isinstance(file_content, dict) or file_content.get('type') != 'file':
                 raise ValueError(f"Path {file_path} is a directory, not a file")
+            
+            size = file_content.get('size', 0)
+            if size > self.max_file_bytes:
+                raise FileTooLargeError(f"{file_path} is {size} bytes, above the {self.max_file_bytes} byte limit")
+            
+            if size <= self.inline_max_bytes and file_content.get('encoding') == 'base64':
+                return decode_bytes(base64.b64decode(file_content['content']))
+            return self._stream_blob(self.parse_repo_name(repo_url), file_content['sha'])
                 
         except Exception as e:
             raise Exception(f"Failed to get file content: {e}")
     
+    def _stream_blob(self, repo_name: str, sha: str) -> str:
+        """Stream a blob's raw bytes through an incremental decoder (no base64, no full bytes copy)"""
+        decoder = StreamDecoder(self.max_file_bytes)
+        with self.session.get(
+            f"{self.api_url}/repos/{repo_name}/git/blobs/{sha}",
+            headers={'Accept': 'application/vnd.github.raw'},
+            stream=True,
+            timeout=(10, 300)
+        ) as response:
+            self._record_response(response)
+            if response.status_code == 404:
+                raise ValueError(f"Blob not found: {sha}")
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=256 * 1024):
+                decoder.feed(chunk)
+        return decoder.finish()
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Cache hit rates and rate-limit consumption since startup"""
+        with self._stats_lock:
+            return {
+                'repo_cache': self.repo_cache.stats(),
+                'content_cache': self.content_cache.stats(),
+                'requests': dict(self.request_stats),
+                'rate_limit': dict(self.rate_limit),
+                'mirrors': self.mirrors.metrics() if self.mirrors else None
+            }
+    
+    # -------------------- LOCAL MIRRORS --------------------
+    def _mirrored(self, repo_url: str) -> Optional[str]:
+        """Repository name if it is served from a local mirror (refreshed when due)"""
+        if self.mirrors is None:
+            return None
+        repo_name = self.parse_repo_name(repo_url)
+        if not self.mirrors.is_tracked(repo_name):
+            return None
+        self.mirrors.refresh(repo_name)
+        return repo_name
+    
+    def _require_mirrors(self) -> MirrorStore:
+        if self.mirrors is None:
+            raise ValueError("Local mirrors are disabled. Set GITHUB_MIRROR_DIR to enable them")
+        return self.mirrors
+    
+    def track_repository(self, repo_url: str) -> Dict[str, Any]:
+        """Start mirroring a repository, or fetch it if already mirrored"""
+        return self._require_mirrors().track(self.parse_repo_name(repo_url))
+    
+    def get_mirror_tree(self, repo_url: str, ref: str = "") -> Optional[List[Dict[str, Any]]]:
+        """Recursive tree from the local mirror, or None if the repository isn't mirrored"""
+        mirrored = self._mirrored(repo_url)
+        return self.mirrors.list_tree(mirrored, ref) if mirrored else None
+    
+    def diff_refs(self, repo_url: str, base: str, head: str = "") -> List[Dict[str, Any]]:
+        """Changed files between two refs of a mirrored repository"""
+        mirrored = self._mirrored(repo_url)
+        if not mirrored:
+            raise ValueError(f"Repository is not mirrored: {repo_url}")
+        return self.mirrors.diff(mirrored, base, head)
+    
+    def iter_archive_files(self, repo_url: str, ref: str = "", extensions: Tuple[str, ...] = ('.py',),
+                           max_file_bytes: int = 2 * 1024 * 1024) -> Iterator[Tuple[str, str]]:
+        """
+        Download the repository tarball once and yield (path, text) for matching files.
+        The archive is read as a stream straight off the socket; nothing is written to disk.
+        Files are decoded with their detected encoding, like single-file fetches.
+        """
+        repo_name = self.parse_repo_name(repo_url)
+        archive_url = f"{self.api_url}/repos/{repo_name}/tarball"
+        if ref:
+            # One path segment whatever the ref contains ("feature/x", "#", "?", spaces)
+            archive_url += f"/{quote(ref, safe='')}"
+        
+        with self.session.get(archive_url, stream=True, timeout=(10, 300)) as response:
+            if response.status_code == 404:
+                raise ValueError(f"Repository or ref not found: {repo_url}")
+            response.raise_for_status()
+            response.raw.decode_content = True
+            
+            with tarfile.open(fileobj=response.raw, mode='r|*') as archive:
+                for member in archive:
+                    if not member.isfile() or not member.name.endswith(extensions):
+                        continue
+                    if member.size > max_file_bytes:
+                        continue
+                    # Drop the "owner-repo-sha/" directory GitHub wraps archives in
+                    path = member.name.split('/', 1)[1] if '/' in member.name else member.name
+                    yield path, decode_bytes(archive.extractfile(member).read())
+    
+    def analyze_repository_archive(self, repo_url: str, ref: str = "",
+                                   on_file: Optional[Callable[[str, int], None]] = None) -> Dict[str, Any]:
+        """
+        Analyze every Python file of a repository from a single archive download
+        instead of one Contents API round trip per file.
+        on_file(path, files_done) is called after each file, e.g. to report job progress.
+        Functions are also (re-)indexed for semantic search unless SEMANTIC_INDEX_REPOSITORIES is off.
+        """
+        try:
+            repo_name = self.parse_repo_name(repo_url)
+            index = semantic_search_service.index_repositories
+            mirrored = self._mirrored(repo_url)
+            if mirrored:
+                source = ((path, decode_bytes(data)) for path, data in self.mirrors.iter_files(mirrored, ref))
+            else:
+                source = self.iter_archive_files(repo_url, ref)
+            
+            files = {}
+            function_count = 0
+            failed = 0
+            for path, content in source:
+                try:
+                    analysis = code_analysis_service.parse_python_file_bounded(content)
+                except ParseLimitError as e:
+                    analysis = {
+                        'success': False,
+                        'error': e.message,
+                        'functions': [],
+                        'classes': [],
+                        'imports': []
+                    }
+                files[path] = analysis
+                if index and analysis['success']:
+                    semantic_search_service.index_functions(repo_name, path, analysis['functions'], content)
+                function_count += len(analysis['functions'])
+                failed += not analysis['success']
+                if on_file:
+                    on_file(path, len(files))
+            if index:
+                # Only now that the whole archive was read: a failed download keeps the previous index
+                semantic_search_service.retain_files(
+                    repo_name, [path for path, analysis in files.items() if analysis['success']])
+            
+            return {
+                'repository': repo_name,
+                'ref': ref,
+                'file_count': len(files),
+                'failed_count': failed,
+                'function_count': function_count,
+                'files': files
+            }
+            
+        except Exception as e:
+            raise Exception(f"Failed to analyze repository archive: {e}")
+    
     def test_connection(self) -> bool:
         """
         Test if the GitHub connection is working
@@ -83,5 +359,10 @@ class GitHubService:
         except Exception as e:
             return f"Connection failed: {e}"
 
-# Create a global instance for easy access
-github_service = GitHubService()
\ No newline at end of file
+
+def __getattr__(name):
+    # `from app.services.github_service import github_service` keeps working, built on first access
+    if name == 'github_service':
+        from app.services.registry import get_github_service
+        return get_github_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,399 @@
+# app/services/job_service.py
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+from app.services.analysis_types import to_plain
+
+PRIORITIES = {'interactive': 0, 'batch': 10}
+TERMINAL_STATES = ('succeeded', 'failed', 'cancelled')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    progress REAL,
+    message TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority, created_at);
+CREATE INDEX IF NOT EXISTS jobs_input ON jobs (input_hash, status);
+"""
+
+SUMMARY_COLUMNS = ("id, kind, priority, status, input_hash, error, progress, message, attempts, "
+                   "owner, lease_until, created_at, started_at, finished_at")
+
+# Columns added after the first release, created on existing databases
+MIGRATIONS = (('owner', 'TEXT'), ('lease_until', 'REAL'))
+
+# A running job whose lease has run out lost its worker (crash, kill, shutdown)
+EXPIRED = "status = 'running' AND (lease_until IS NULL OR lease_until < ?)"
+
+
+class JobCancelled(BaseException):
+    """
+    Raised from progress() when a job is cancelled. A BaseException, like
+    asyncio.CancelledError, so handlers' `except Exception` blocks can't swallow it
+    """
+
+
+def input_hash(kind: str, payload: Dict[str, Any]) -> str:
+    """Identity of a job's work: same kind and same payload (key order ignored)"""
+    canonical = json.dumps({'kind': kind, 'payload': payload}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+# -------------------- HANDLERS --------------------
+# Each handler gets the payload and a progress(fraction, message) callback;
+# services are imported on first use so the job store has no heavy imports.
+# The payload checks also run in submit, so a malformed job is refused up front
+def _functions_from(payload: Dict[str, Any]) -> List[Dict[str, str]]:
+    functions = payload.get('functions') or [payload]
+    if not isinstance(functions, list) or not all(isinstance(f, dict) and 'function_code' in f for f in functions):
+        raise ValueError("Each function needs function_code")
+    return functions
+
+
+def _check_analysis(payload: Dict[str, Any]):
+    if 'repo_url' not in payload and 'code' not in payload:
+        raise ValueError("Analysis jobs need repo_url or code")
+
+
+def run_docs_job(payload: Dict[str, Any], progress: Callable) -> Dict[str, Any]:
+    from app.services.ai_service import ai_service
+    functions = _functions_from(payload)
+    results = []
+    for index, function in enumerate(functions):
+        name = function.get('function_name', 'unknown_function')
+        results.append({'function_name': name,
+                        'documentation': ai_service.generate_documentation(function['function_code'], name)})
+        progress((index + 1) / len(functions), f"Documented {name}")
+    return {'results': results}
+
+
+def run_tests_job(payload: Dict[str, Any], progress: Callable) -> Dict[str, Any]:
+    from app.services.ai_service import ai_service
+    functions = _functions_from(payload)
+    results = []
+    for index, function in enumerate(functions):
+        name = function.get('function_name', 'unknown_function')
+        results.append({'function_name': name,
+                        'test_code': ai_service.generate_test(function['function_code'], name)})
+        progress((index + 1) / len(functions), f"Generated tests for {name}")
+    return {'results': results}
+
+
+def run_analysis_job(payload: Dict[str, Any], progress: Callable) -> Dict[str, Any]:
+    """Whole-repository analysis ({'repo_url', 'ref'}) or a single Python source ({'code'})"""
+    _check_analysis(payload)
+    if 'repo_url' in payload:
+        from app.services.github_service import github_service
+        return github_service.analyze_repository_archive(
+            payload['repo_url'], payload.get('ref', ''),
+            on_file=lambda path, count: progress(None, f"Analyzed {count} files ({path})")
+        )
+    from app.services.code_analysis import code_analysis_service
+    analysis = code_analysis_service.parse_python_file_bounded(payload['code'])
+    return {'analysis': analysis, 'summary': code_analysis_service.get_code_summary(analysis)}
+
+
+class JobService:
+    """
+    Durable queue for long-running generation and analysis work.
+
+    Jobs live in a local SQLite database and are executed by a fixed pool of
+    worker threads, interactive before batch, oldest first. Submitting the
+    same kind and payload as a queued, running or recently finished job
+    returns that job instead of queueing the work twice.
+
+    Several API processes can share the database. A worker holds a lease on
+    the job it runs (owner + lease_until), renewed by a heartbeat thread and
+    by progress reports; any process requeues running jobs whose lease has
+    expired, so work interrupted by a crash or restart is picked up again
+    without touching jobs another live process is still running.
+    """
+    def __init__(self):
+        self.db_path = os.getenv('JOB_DB_PATH', 'jobs.sqlite3')
+        self.workers = int(os.getenv('JOB_WORKERS', 2))
+        self.poll_seconds = float(os.getenv('JOB_POLL_SECONDS', 1.0))
+        self.dedup_seconds = float(os.getenv('JOB_DEDUP_SECONDS', 3600))
+        self.retention_seconds = float(os.getenv('JOB_RETENTION_SECONDS', 7 * 24 * 3600))
+        self.max_attempts = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+        self.lease_seconds = float(os.getenv('JOB_LEASE_SECONDS', 60))
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+        self.handlers: Dict[str, Callable[[Dict[str, Any], Callable], Any]] = {
+            'docs': run_docs_job,
+            'tests': run_tests_job,
+            'analysis': run_analysis_job,
+        }
+        self.payload_checks: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            'docs': _functions_from,
+            'tests': _functions_from,
+            'analysis': _check_analysis,
+        }
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self.stats = {'submitted': 0, 'deduplicated': 0, 'completed': 0, 'failed': 0, 'requeued': 0}
+        self._stats_lock = threading.Lock()
+
+    # -------------------- STORAGE --------------------
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(os.path.abspath(self.db_path))
+            os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=30)
+            db.row_factory = sqlite3.Row
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.executescript(SCHEMA)
+            columns = {row['name'] for row in db.execute('PRAGMA table_info(jobs)')}
+            for name, sql_type in MIGRATIONS:
+                if name not in columns:
+                    db.execute(f'ALTER TABLE jobs ADD COLUMN {name} {sql_type}')
+            self._db = db
+        return self._db
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._db_lock:
+            return self._connection().execute(sql, params).fetchall()
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job['priority'] = next((name for name, value in PRIORITIES.items() if value == job['priority']), job['priority'])
+        if 'payload' in job:
+            job['payload'] = json.loads(job['payload'])
+        if job.get('result') is not None:
+            job['result'] = json.loads(job['result'])
+        return job
+
+    # -------------------- PUBLIC API --------------------
+    def submit(self, kind: str, payload: Dict[str, Any], priority: str = 'interactive') -> Dict[str, Any]:
+        """Queue a job, or return the existing job doing the same work"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind} (expected one of {', '.join(self.handlers)})")
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority} (expected one of {', '.join(PRIORITIES)})")
+        check_payload = self.payload_checks.get(kind)
+        if check_payload is not None:
+            check_payload(payload)
+        digest = input_hash(kind, payload)
+        now = time.time()
+
+        with self._db_lock:
+            db = self._connection()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                existing = db.execute(
+                    "SELECT id, status, priority FROM jobs WHERE input_hash = ? AND "
+                    "(status IN ('queued', 'running') OR (status = 'succeeded' AND finished_at > ?)) "
+                    "ORDER BY created_at DESC LIMIT 1",
+                    (digest, now - self.dedup_seconds)
+                ).fetchone()
+                if existing is not None:
+                    job_id = existing['id']
+                    # An interactive request waiting on queued batch work pulls it forward
+                    if existing['status'] == 'queued' and PRIORITIES[priority] < existing['priority']:
+                        db.execute('UPDATE jobs SET priority = ? WHERE id = ?', (PRIORITIES[priority], job_id))
+                else:
+                    job_id = uuid.uuid4().hex
+                    db.execute(
+                        'INSERT INTO jobs (id, kind, priority, status, input_hash, payload, progress, created_at) '
+                        "VALUES (?, ?, ?, 'queued', ?, ?, 0, ?)",
+                        (job_id, kind, PRIORITIES[priority], digest, json.dumps(payload), now)
+                    )
+                db.execute('COMMIT')
+            except Exception:
+                db.execute('ROLLBACK')
+                raise
+
+        if existing is not None:
+            self._count('deduplicated')
+            return dict(self.get(job_id), deduplicated=True)
+        self._count('submitted')
+        with self._wakeup:
+            self._wakeup.notify()
+        return dict(self.get(job_id), deduplicated=False)
+
+    def get(self, job_id: str, include_result: bool = False) -> Optional[Dict[str, Any]]:
+        columns = SUMMARY_COLUMNS + (', result' if include_result else '')
+        rows = self._execute(f'SELECT {columns} FROM jobs WHERE id = ?', (job_id,))
+        return self._to_dict(rows[0]) if rows else None
+
+    def list(self, status: str = '', kind: str = '', limit: int = 50) -> List[Dict[str, Any]]:
+        clauses, params = [], []
+        if status:
+            clauses.append('status = ?')
+            params.append(status)
+        if kind:
+            clauses.append('kind = ?')
+            params.append(kind)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self._execute(f'SELECT {SUMMARY_COLUMNS} FROM jobs {where} ORDER BY created_at DESC LIMIT ?',
+                             (*params, max(1, min(limit, 1000))))
+        return [self._to_dict(row) for row in rows]
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Queued jobs are cancelled at once; running ones stop at their next progress report"""
+        now = time.time()
+        self._execute("UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                      (now, job_id))
+        self._execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+        return self.get(job_id)
+
+    def metrics(self) -> Dict[str, Any]:
+        counts = {row['status']: row['count'] for row in
+                  self._execute('SELECT status, COUNT(*) AS count FROM jobs GROUP BY status')}
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {'workers': self.workers, 'alive_workers': sum(t.is_alive() for t in self._threads),
+                'owner': self.owner, 'jobs': counts, **stats}
+
+    # -------------------- WORKERS --------------------
+    def start(self):
+        """Recover jobs with expired leases, drop expired results and start the worker threads"""
+        if self._threads:
+            return
+        self._recover_expired()
+        self._execute(f"DELETE FROM jobs WHERE status IN {TERMINAL_STATES} AND finished_at < ?",
+                      (time.time() - self.retention_seconds,))
+
+        self._stopping.clear()
+        self._threads = [threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+                         for index in range(self.workers)]
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        for thread in (*self._threads, self._heartbeat_thread):
+            thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Stop taking work; jobs still running keep their lease until it expires,
+        then any process (this one after a restart) queues them again
+        """
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in (*self._threads, self._heartbeat_thread):
+            if thread is not None:
+                thread.join(timeout)
+        self._threads = []
+        self._heartbeat_thread = None
+
+    def _recover_expired(self):
+        """Requeue running jobs whose worker stopped renewing its lease, or fail them past max_attempts"""
+        now = time.time()
+        with self._db_lock:
+            db = self._connection()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                requeued = db.execute(
+                    "UPDATE jobs SET status = 'queued', owner = NULL, lease_until = NULL, cancel_requested = 0, "
+                    f"message = 'Requeued after its worker stopped' WHERE {EXPIRED} AND attempts < ? RETURNING id",
+                    (now, self.max_attempts)).fetchall()
+                db.execute(
+                    "UPDATE jobs SET status = 'failed', owner = NULL, lease_until = NULL, finished_at = ?, "
+                    f"error = 'Interrupted too many times' WHERE {EXPIRED}", (now, now))
+                db.execute('COMMIT')
+            except Exception:
+                db.execute('ROLLBACK')
+                raise
+        if requeued:
+            self._count('requeued', len(requeued))
+            print(f"🔁 Requeued {len(requeued)} job(s) whose worker stopped")
+            with self._wakeup:
+                self._wakeup.notify_all()
+
+    def _heartbeat(self):
+        """Renew this process's leases and pick up jobs abandoned by other processes"""
+        while not self._stopping.wait(self.lease_seconds / 3):
+            try:
+                self._execute("UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = 'running'",
+                              (time.time() + self.lease_seconds, self.owner))
+                self._recover_expired()
+            except sqlite3.Error as e:
+                print(f"⚠️ Job heartbeat failed: {e}")
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        # One statement, so two workers (or two API processes) never claim the same job
+        now = time.time()
+        rows = self._execute(
+            "UPDATE jobs SET status = 'running', owner = ?, lease_until = ?, started_at = ?, attempts = attempts + 1 "
+            "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY priority, created_at LIMIT 1) "
+            "AND status = 'queued' RETURNING id, kind, payload",
+            (self.owner, now + self.lease_seconds, now))
+        return dict(rows[0]) if rows else None
+
+    def _work(self):
+        while not self._stopping.is_set():
+            job = self._claim()
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_seconds)
+                continue
+            self._run(job)
+
+    def _run(self, job: Dict[str, Any]):
+        job_id = job['id']
+
+        def progress(fraction: Optional[float], message: str = ''):
+            # Also renews the lease; no row back means it expired and the job went to another worker
+            rows = self._execute(
+                'UPDATE jobs SET progress = COALESCE(?, progress), message = ?, lease_until = ? '
+                "WHERE id = ? AND owner = ? AND status = 'running' RETURNING cancel_requested",
+                (fraction, message, time.time() + self.lease_seconds, job_id, self.owner))
+            if not rows or rows[0]['cancel_requested']:
+                raise JobCancelled()
+            if self._stopping.is_set():
+                raise JobCancelled()
+
+        try:
+            result = self.handlers[job['kind']](json.loads(job['payload']), progress)
+            self._finish(job_id, 'succeeded', result=json.dumps(result, default=to_plain))
+            self._count('completed')
+        except JobCancelled:
+            if self._stopping.is_set():
+                # Shutting down: left as running, requeued once its lease expires
+                return
+            self._finish(job_id, 'cancelled')
+        except Exception as e:
+            print(f"❌ Job {job_id} ({job['kind']}) failed: {e}")
+            self._finish(job_id, 'failed', error=str(e))
+            self._count('failed')
+
+    def _finish(self, job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None):
+        """Terminal update, only while this process still holds the job's lease"""
+        self._execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, progress = CASE WHEN ? = 'succeeded' THEN 1 "
+            "ELSE progress END, owner = NULL, lease_until = NULL, finished_at = ? "
+            "WHERE id = ? AND owner = ? AND status = 'running'",
+            (status, result, error, status, time.time(), job_id, self.owner))
+
+
+# Create global instance
+job_service = JobService()
@@ -0,0 +1,223 @@
+# app/services/mirror_store.py
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from base64 import b64encode
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+REPO_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_.-]+/[A-Za-z0-9_.-]+$')
+
+
+class MirrorError(Exception):
+    pass
+
+
+class MirrorStore:
+    """
+    Local bare mirrors (`git clone --mirror`) of tracked repositories.
+
+    Mirrors are brought up to date with `git fetch --prune`, which only
+    transfers new objects, and every read goes straight to the object
+    store: blobs at any commit via `cat-file`, trees via `ls-tree`, changes
+    via `diff`. There is never a working-tree checkout.
+    """
+    def __init__(self, root: str, url_template: str = "https://github.com/{repo}.git",
+                 access_token: Optional[str] = None, fetch_interval: float = 60):
+        self.root = os.path.abspath(root)
+        self.url_template = url_template
+        self.fetch_interval = fetch_interval
+        os.makedirs(self.root, exist_ok=True)
+
+        # Credentials go through git's environment config, never the command line
+        self._env = dict(os.environ, GIT_TERMINAL_PROMPT='0')
+        if access_token:
+            basic = b64encode(f"x-access-token:{access_token}".encode()).decode()
+            self._env.update({
+                'GIT_CONFIG_COUNT': '1',
+                'GIT_CONFIG_KEY_0': 'http.extraHeader',
+                'GIT_CONFIG_VALUE_0': f'Authorization: Basic {basic}'
+            })
+
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._last_fetch: Dict[str, float] = {}
+        self.stats = {'clones': 0, 'fetches': 0, 'blob_reads': 0}
+
+    # -------------------- PLUMBING --------------------
+    def _git(self, git_dir: Optional[str], *args: str) -> bytes:
+        command = ['git']
+        if git_dir:
+            command += ['--git-dir', git_dir]
+        result = subprocess.run(command + list(args), env=self._env,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise MirrorError(result.stderr.decode('utf-8', errors='replace').strip()
+                              or f"git {args[0]} failed")
+        return result.stdout
+
+    def _lock(self, repo_name: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(repo_name, threading.Lock())
+
+    def path_for(self, repo_name: str) -> str:
+        if not REPO_NAME_PATTERN.match(repo_name) or '..' in repo_name:
+            raise ValueError(f"Invalid repository name: {repo_name}")
+        return os.path.join(self.root, f"{repo_name}.git")
+
+    def is_tracked(self, repo_name: str) -> bool:
+        try:
+            return os.path.isdir(self.path_for(repo_name))
+        except ValueError:
+            return False
+
+    def tracked(self) -> List[str]:
+        names = []
+        for owner in sorted(os.listdir(self.root)):
+            owner_dir = os.path.join(self.root, owner)
+            if os.path.isdir(owner_dir):
+                names += [f"{owner}/{name[:-4]}" for name in sorted(os.listdir(owner_dir))
+                          if name.endswith('.git')]
+        return names
+
+    # -------------------- SYNC --------------------
+    def _refs(self, git_dir: str) -> Dict[str, str]:
+        refs = {}
+        for line in self._git(git_dir, 'for-each-ref', '--format=%(objectname) %(refname)').decode().splitlines():
+            sha, name = line.split(' ', 1)
+            refs[name] = sha
+        return refs
+
+    def track(self, repo_name: str) -> Dict[str, Any]:
+        """Create the mirror if needed, otherwise fetch; returns the refs that moved"""
+        git_dir = self.path_for(repo_name)
+        with self._lock(repo_name):
+            if os.path.isdir(git_dir):
+                return self._fetch(repo_name, git_dir)
+            os.makedirs(os.path.dirname(git_dir), exist_ok=True)
+            partial = git_dir + '.partial'
+            if os.path.isdir(partial):
+                shutil.rmtree(partial)
+            self._git(None, 'clone', '--mirror', '--quiet',
+                      self.url_template.format(repo=repo_name), partial)
+            os.rename(partial, git_dir)  # a half-finished clone is never visible as a mirror
+            self.stats['clones'] += 1
+            self._last_fetch[repo_name] = time.monotonic()
+            refs = self._refs(git_dir)
+            return {'repository': repo_name, 'cloned': True, 'updated': refs, 'deleted': []}
+
+    def _fetch(self, repo_name: str, git_dir: str) -> Dict[str, Any]:
+        before = self._refs(git_dir)
+        self._git(git_dir, 'fetch', '--prune', '--quiet', 'origin')
+        after = self._refs(git_dir)
+        self.stats['fetches'] += 1
+        self._last_fetch[repo_name] = time.monotonic()
+        return {
+            'repository': repo_name,
+            'cloned': False,
+            'updated': {ref: sha for ref, sha in after.items() if before.get(ref) != sha},
+            'deleted': [ref for ref in before if ref not in after]
+        }
+
+    def fetch(self, repo_name: str) -> Dict[str, Any]:
+        git_dir = self.path_for(repo_name)
+        if not os.path.isdir(git_dir):
+            raise ValueError(f"Repository is not mirrored: {repo_name}")
+        with self._lock(repo_name):
+            return self._fetch(repo_name, git_dir)
+
+    def refresh(self, repo_name: str) -> None:
+        """Fetch if the mirror is older than fetch_interval (cheap when nothing changed)"""
+        last = self._last_fetch.get(repo_name)
+        if last is None or time.monotonic() - last >= self.fetch_interval:
+            self.fetch(repo_name)
+
+    # -------------------- READS --------------------
+    def resolve(self, repo_name: str, ref: str = "") -> str:
+        """Commit sha for a branch, tag or sha (default branch when empty)"""
+        if ref.startswith('-'):
+            raise ValueError(f"Invalid ref: {ref}")
+        try:
+            return self._git(self.path_for(repo_name), 'rev-parse', '--verify', '--quiet',
+                             f"{ref or 'HEAD'}^{{commit}}").decode().strip()
+        except MirrorError:
+            raise ValueError(f"Ref not found: {ref or 'HEAD'}")
+
+    def read_blob(self, repo_name: str, path: str, ref: str = "") -> bytes:
+        commit = self.resolve(repo_name, ref)
+        try:
+            data = self._git(self.path_for(repo_name), 'cat-file', 'blob', f"{commit}:{path.strip('/')}")
+        except MirrorError:
+            raise ValueError(f"File not found: {path} at {ref or 'HEAD'}")
+        self.stats['blob_reads'] += 1
+        return data
+
+    def list_tree(self, repo_name: str, ref: str = "", path: str = "") -> List[Dict[str, Any]]:
+        """Recursive tree listing in the same shape as AsyncGitHubClient.get_tree"""
+        commit = self.resolve(repo_name, ref)
+        args = ['ls-tree', '-r', '-t', '-l', '-z', commit]
+        if path.strip('/'):
+            args += ['--', path.strip('/')]
+        entries = []
+        for record in self._git(self.path_for(repo_name), *args).split(b'\0'):
+            if not record:
+                continue
+            meta, name = record.split(b'\t', 1)
+            _, kind, sha, size = meta.split()
+            entries.append({
+                'path': name.decode('utf-8', errors='replace'),
+                'type': kind.decode(),
+                'size': int(size) if size != b'-' else None,
+                'sha': sha.decode()
+            })
+        return entries
+
+    def iter_files(self, repo_name: str, ref: str = "", extensions: Tuple[str, ...] = ('.py',),
+                   max_file_bytes: int = 2 * 1024 * 1024) -> Iterator[Tuple[str, bytes]]:
+        """(path, bytes) for matching blobs, read through one `cat-file --batch` process"""
+        wanted = [entry for entry in self.list_tree(repo_name, ref)
+                  if entry['type'] == 'blob' and entry['path'].endswith(extensions)
+                  and (entry['size'] or 0) <= max_file_bytes]
+        if not wanted:
+            return
+        process = subprocess.Popen(['git', '--git-dir', self.path_for(repo_name), 'cat-file', '--batch'],
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=self._env)
+        try:
+            for entry in wanted:
+                process.stdin.write(entry['sha'].encode() + b'\n')
+                process.stdin.flush()
+                header = process.stdout.readline().split()
+                size = int(header[2])
+                data = process.stdout.read(size)
+                process.stdout.read(1)  # trailing newline
+                self.stats['blob_reads'] += 1
+                yield entry['path'], data
+        finally:
+            process.stdin.close()
+            process.stdout.close()
+            process.wait()
+
+    def diff(self, repo_name: str, base: str, head: str = "") -> List[Dict[str, Any]]:
+        """Files changed between two commits, with renames detected"""
+        git_dir = self.path_for(repo_name)
+        base_commit = self.resolve(repo_name, base)
+        head_commit = self.resolve(repo_name, head)
+        fields = self._git(git_dir, 'diff', '--name-status', '-z', '-M',
+                           base_commit, head_commit).split(b'\0')
+        changes = []
+        index = 0
+        while index < len(fields) and fields[index]:
+            status = fields[index].decode()
+            if status[0] in 'RC':
+                changes.append({'status': status[0], 'old_path': fields[index + 1].decode(),
+                                'path': fields[index + 2].decode()})
+                index += 3
+            else:
+                changes.append({'status': status, 'path': fields[index + 1].decode()})
+                index += 2
+        return changes
+
+    def metrics(self) -> Dict[str, Any]:
+        return {'root': self.root, 'tracked': self.tracked(), **self.stats}
@@ -0,0 +1,179 @@
+# app/services/parse_limits.py
+import ast
+import os
+import multiprocessing
+import threading
+from typing import Dict, List, Any, Tuple
+
+try:
+    import resource  # POSIX only
+except ImportError:
+    resource = None
+
+
+class ParseLimitError(Exception):
+    """Raised when an input exceeds a parsing limit; carries the HTTP status to return"""
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+class ParseLimits:
+    """
+    Configurable limits for analyzing untrusted source code.
+    Every value can be overridden with an environment variable.
+    """
+    def __init__(self):
+        self.max_body_bytes = int(os.getenv('ANALYSIS_MAX_BODY_BYTES', 10 * 1024 * 1024))
+        self.max_lines = int(os.getenv('ANALYSIS_MAX_LINES', 100_000))
+        # Statement blocks (def, class, if, for, while, with, try, match) inside one another
+        self.max_nesting = int(os.getenv('ANALYSIS_MAX_NESTING', 200))
+        # Raw syntax-tree depth, expressions included (CPython stops near 3000 itself)
+        self.max_depth = int(os.getenv('ANALYSIS_MAX_DEPTH', 3000))
+        # Inputs at least this long are parsed in an isolated worker process
+        self.isolate_chars = int(os.getenv('ANALYSIS_ISOLATE_CHARS', 200_000))
+        self.worker_cpu_seconds = int(os.getenv('ANALYSIS_WORKER_CPU_SECONDS', 10))
+        self.worker_memory_mb = int(os.getenv('ANALYSIS_WORKER_MEMORY_MB', 1024))
+        self.worker_timeout = float(os.getenv('ANALYSIS_WORKER_TIMEOUT', 20))
+        self.max_workers = int(os.getenv('ANALYSIS_MAX_WORKERS', os.cpu_count() or 2))
+
+
+parse_limits = ParseLimits()
+
+
+def check_source(code_content: str, limits: ParseLimits = parse_limits):
+    """Cheap checks that run before any parsing"""
+    if len(code_content) > limits.max_body_bytes:
+        raise ParseLimitError(413, f"Source exceeds {limits.max_body_bytes} characters")
+    line_count = code_content.count('\n') + 1
+    if line_count > limits.max_lines:
+        raise ParseLimitError(413, f"Source has {line_count} lines; the limit is {limits.max_lines}")
+
+
+def child_nodes(node: ast.AST) -> List[ast.AST]:
+    """
+    Direct children of a node in source order. Reading `_fields` inline is
+    roughly twice as fast as ast.iter_child_nodes on large trees.
+    """
+    children = []
+    for name in node._fields:
+        value = getattr(node, name, None)
+        if isinstance(value, ast.AST):
+            children.append(value)
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, ast.AST):
+                    children.append(item)
+    return children
+
+
+# Statements whose body is one nesting level deeper
+BLOCK_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.If, ast.For, ast.AsyncFor,
+               ast.While, ast.With, ast.AsyncWith, ast.Try, ast.TryStar, ast.Match)
+
+
+def nested_children(node: ast.AST, depth: int, blocks: int,
+                    limits: ParseLimits = parse_limits) -> List[Tuple[ast.AST, int, int]]:
+    """
+    Step of an iterative walk that enforces the nesting limits: raises
+    ParseLimitError if `node` (at tree depth `depth`, inside `blocks`
+    statement blocks) is too deep, else returns its children in source order
+    with their own (depth, blocks). An elif, the only If in its parent's
+    orelse, stays at the parent's block level.
+    """
+    if blocks > limits.max_nesting:
+        raise ParseLimitError(422, f"Code nests statements more than {limits.max_nesting} blocks deep")
+    if depth > limits.max_depth:
+        raise ParseLimitError(422, f"Code's syntax tree is deeper than {limits.max_depth} levels")
+    children = child_nodes(node)
+    if not isinstance(node, BLOCK_NODES):
+        return [(child, depth + 1, blocks) for child in children]
+    elif_node = (node.orelse[0] if isinstance(node, ast.If) and len(node.orelse) == 1
+                 and isinstance(node.orelse[0], ast.If) else None)
+    return [(child, depth + 1, blocks if child is elif_node else blocks + 1) for child in children]
+
+
+def check_tree_depth(tree: ast.AST, limits: ParseLimits = parse_limits):
+    """Walk the tree iteratively so the check itself can't hit the recursion limit"""
+    stack = [(tree, 1, 0)]
+    while stack:
+        stack.extend(nested_children(*stack.pop(), limits))
+
+
+# -------------------- ISOLATED WORKER PARSING --------------------
+def _get_context():
+    methods = multiprocessing.get_all_start_methods()
+    if 'forkserver' in methods:
+        context = multiprocessing.get_context('forkserver')
+        # Workers fork from a server that already imported the parser
+        context.set_forkserver_preload(['app.services.code_analysis'])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+_context = None
+_worker_slots = threading.BoundedSemaphore(parse_limits.max_workers)
+
+
+def _worker_parse(conn, code_content: str, cpu_seconds: int, memory_mb: int):
+    """Entry point of the worker process: apply rlimits, parse, send the result back"""
+    try:
+        if resource is not None:
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+            memory = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+        from app.services.code_analysis import code_analysis_service
+        conn.send(('ok', code_analysis_service.parse_python_file(code_content)))
+    except ParseLimitError as e:
+        conn.send(('limit', e.status_code, e.message))
+    except MemoryError:
+        conn.send(('limit', 422, "Parsing exceeded the memory limit"))
+    except Exception as e:
+        conn.send(('error', str(e)))
+    finally:
+        conn.close()
+
+
+def parse_isolated(code_content: str, limits: ParseLimits = parse_limits) -> Dict[str, Any]:
+    """
+    Parse in a separate process with CPU-time and address-space caps.
+    The worker is killed if it does not answer within `limits.worker_timeout`.
+    """
+    global _context
+    if _context is None:
+        _context = _get_context()
+
+    if not _worker_slots.acquire(timeout=limits.worker_timeout):
+        raise ParseLimitError(503, "All analysis workers are busy, try again later")
+    try:
+        parent_conn, child_conn = _context.Pipe(duplex=False)
+        process = _context.Process(
+            target=_worker_parse,
+            args=(child_conn, code_content, limits.worker_cpu_seconds, limits.worker_memory_mb),
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+
+        try:
+            if not parent_conn.poll(limits.worker_timeout):
+                raise ParseLimitError(422, f"Parsing timed out after {limits.worker_timeout:g}s")
+            message = parent_conn.recv()
+        except EOFError:
+            # Worker died without answering: killed by the CPU or memory cap
+            raise ParseLimitError(422, "Parsing exceeded the CPU or memory limit")
+        finally:
+            if process.is_alive():
+                process.kill()
+            process.join()
+            parent_conn.close()
+    finally:
+        _worker_slots.release()
+
+    if message[0] == 'ok':
+        return message[1]
+    if message[0] == 'limit':
+        raise ParseLimitError(message[1], message[2])
+    raise Exception(f"Worker error: {message[1]}")
@@ -0,0 +1,219 @@
+# app/services/profiling.py
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Leaf frames of threads parked on a lock, queue or selector: dropped unless idle stacks are requested
+IDLE_LEAVES = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('selectors.py', 'select'),
+    ('queue.py', 'get'),
+    ('socket.py', 'accept'),
+}
+
+
+def short_path(filename: str) -> str:
+    """Backend files relative to the backend, libraries relative to site-packages, stdlib by basename"""
+    if filename.startswith(BACKEND_DIR):
+        return os.path.relpath(filename, BACKEND_DIR)
+    if 'site-packages' in filename:
+        return filename.split('site-packages' + os.sep, 1)[-1]
+    return os.path.basename(filename)
+
+
+class StackSampler:
+    """
+    Wall-clock sampling profiler over every thread. A background thread reads
+    sys._current_frames() every `interval` seconds and counts whole stacks,
+    so nothing is hooked into the profiled code and the cost stops with the
+    thread. Output is in folded format ("thread;frame;frame count"), readable
+    by flamegraph.pl, speedscope and inferno.
+    """
+    def __init__(self, interval: float = 0.005, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._labels: Dict[Any, str] = {}
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({short_path(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                leaf = frame.f_code
+                if not self.include_idle and (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def folded(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class CProfileSession:
+    """
+    Deterministic profile of the calling thread. Started from an async route,
+    that is the event loop thread, where every coroutine and any synchronous
+    call made from one (the usual cause of loop stalls) is recorded.
+    """
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.duration = 0.0
+        self._started_at = 0.0
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        self.duration = time.perf_counter() - self._started_at
+
+    def report(self, sort: str = 'cumulative', limit: int = 50) -> str:
+        output = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=output)
+        stats.sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    def rows(self, sort: str = 'cumulative', limit: int = 50) -> List[Dict[str, Any]]:
+        stats = pstats.Stats(self.profile)
+        stats.sort_stats(sort)
+        rows = []
+        for func in stats.fcn_list[:limit]:
+            calls, primitive_calls, total_time, cumulative_time, _ = stats.stats[func]
+            filename, lineno, name = func
+            rows.append({
+                'function': f"{name} ({short_path(filename)}:{lineno})",
+                'calls': calls,
+                'primitive_calls': primitive_calls,
+                'total_seconds': round(total_time, 6),
+                'cumulative_seconds': round(cumulative_time, 6)
+            })
+        return rows
+
+    def dump(self) -> bytes:
+        """Raw pstats data, loadable by snakeviz or pstats.Stats"""
+        self.profile.create_stats()
+        return marshal.dumps(self.profile.stats)
+
+
+class AllocationTracer:
+    """
+    tracemalloc over a window: snapshot, wait, snapshot, and report which
+    allocation sites grew. Tracing is only on during the window unless it
+    was already running.
+    """
+    def __init__(self, frames: int = 10):
+        self.frames = frames
+        self._started_here = False
+        self._before: Optional[tracemalloc.Snapshot] = None
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ))
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_here = True
+        self._before = self._snapshot()
+
+    def stop(self, key_type: str = 'lineno', limit: int = 25) -> Dict[str, Any]:
+        after = self._snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if self._started_here:
+            tracemalloc.stop()
+        diff = after.compare_to(self._before, key_type)
+        self._before = None
+        top = []
+        for stat in diff[:limit]:
+            top.append({
+                'size_diff_bytes': stat.size_diff,
+                'size_bytes': stat.size,
+                'count_diff': stat.count_diff,
+                'count': stat.count,
+                'traceback': [f"{short_path(frame.filename)}:{frame.lineno}" for frame in stat.traceback]
+            })
+        return {
+            'grown_bytes': sum(stat.size_diff for stat in diff),
+            'traced_bytes': current,
+            'peak_traced_bytes': peak,
+            'top': top
+        }
+
+
+class ProfilingService:
+    """Runs at most one profiling session at a time and keeps the last results' metadata"""
+    def __init__(self):
+        self.admin_token = os.getenv('DEBUG_ADMIN_TOKEN', '')
+        self.max_seconds = float(os.getenv('DEBUG_PROFILE_MAX_SECONDS', 120))
+        self._busy = threading.Lock()
+        self.last_session: Optional[Dict[str, Any]] = None
+
+    def acquire(self, kind: str, seconds: float) -> bool:
+        if not self._busy.acquire(blocking=False):
+            return False
+        self.last_session = {'kind': kind, 'seconds': seconds, 'started': time.time(), 'finished': None}
+        return True
+
+    def release(self):
+        if self.last_session is not None:
+            self.last_session['finished'] = time.time()
+        self._busy.release()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'busy': self._busy.locked(),
+            'tracemalloc_tracing': tracemalloc.is_tracing(),
+            'max_seconds': self.max_seconds,
+            'last_session': self.last_session
+        }
+
+
+# Create global instance
+profiling_service = ProfilingService()
@@ -0,0 +1,96 @@
+# app/services/registry.py
+import importlib
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Union
+
+
+class ServiceUnavailable(Exception):
+    """A service could not be constructed, e.g. missing configuration; served as 503"""
+    def __init__(self, name: str, reason: str):
+        super().__init__(f"{name} service unavailable: {reason}")
+        self.name = name
+        self.reason = reason
+
+
+class ServiceRegistry:
+    """
+    Services built on first use instead of at import time, so a process only
+    pays for (and only needs the dependencies and configuration of) the
+    services its requests actually touch. Factories are "module:attribute"
+    strings, imported on first get, or callables.
+    Failed constructions are not cached; the next get retries.
+    """
+    def __init__(self):
+        self._factories: Dict[str, Union[str, Callable[[], Any]]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._errors: Dict[str, str] = {}
+        self._load_seconds: Dict[str, float] = {}
+        # Reentrant: a factory may get() the services it depends on
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Union[str, Callable[[], Any]]):
+        self._factories[name] = factory
+
+    def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is not None:
+                return instance
+            factory = self._factories[name]
+            started = time.perf_counter()
+            try:
+                if isinstance(factory, str):
+                    module, attribute = factory.split(':')
+                    factory = getattr(importlib.import_module(module), attribute)
+                instance = factory()
+            except Exception as e:
+                self._errors[name] = str(e)
+                raise ServiceUnavailable(name, str(e)) from e
+            self._errors.pop(name, None)
+            self._load_seconds[name] = time.perf_counter() - started
+            self._instances[name] = instance
+            print(f"⚙️ {name} service ready in {self._load_seconds[name]:.2f}s")
+            return instance
+
+    def peek(self, name: str) -> Optional[Any]:
+        """The instance if it was already built; never constructs one"""
+        return self._instances.get(name)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        status = {}
+        for name in self._factories:
+            if name in self._instances:
+                status[name] = {'state': 'ready', 'load_seconds': round(self._load_seconds[name], 3)}
+            elif name in self._errors:
+                status[name] = {'state': 'unavailable', 'error': self._errors[name]}
+            else:
+                status[name] = {'state': 'not_loaded'}
+        return status
+
+
+# Create global instance
+registry = ServiceRegistry()
+registry.register('ai', 'app.services.ai_service:AIService')
+registry.register('github', 'app.services.github_service:GitHubService')
+
+
+def get_ai_service():
+    """The AIService; the first call loads the model"""
+    return registry.get('ai')
+
+
+def get_github_service():
+    """The GitHubService; ServiceUnavailable without GITHUB_ACCESS_TOKEN"""
+    return registry.get('github')
+
+
+def find_github_service():
+    """The GitHubService, or None when it can't be built (routes that fall back to the async client)"""
+    try:
+        return registry.get('github')
+    except ServiceUnavailable:
+        return None
@@ -0,0 +1,127 @@
+# app/services/request_scheduler.py
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+import httpx
+
+
+class TokenBucket:
+    """
+    Paces requests so the remaining rate-limit budget lasts until the reset.
+    Starts unlimited and is tuned from X-RateLimit-* headers as responses arrive.
+    """
+    def __init__(self, burst_seconds: float = 60):
+        self.burst_seconds = burst_seconds
+        self.rate: Optional[float] = None  # tokens per second; None = not paced yet
+        self.capacity = 1.0
+        self.tokens = 1.0
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def update(self, remaining: int, reset_epoch: int):
+        """Spread `remaining` requests over the time left in the window"""
+        self._refill()
+        seconds_left = max(reset_epoch - time.time(), 1.0)
+        self.rate = remaining / seconds_left
+        # Allow up to `burst_seconds` worth of budget at once, never more than remains
+        self.capacity = max(1.0, min(float(remaining), self.rate * self.burst_seconds))
+        self.tokens = min(self.tokens, float(remaining), self.capacity)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.rate is None or self.tokens >= 1:
+                    if self.rate is not None:
+                        self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate if self.rate > 0 else 1.0
+                await asyncio.sleep(min(wait, 5.0))
+
+
+class RequestScheduler:
+    """
+    Front door for outgoing GitHub requests:
+      - single-flight: concurrent calls with the same key share one request
+      - token-bucket pacing derived from the rate-limit headers
+      - retries with backoff on secondary rate limits (403/429 + Retry-After)
+    """
+    def __init__(self):
+        self.max_retries = int(os.getenv('GITHUB_MAX_RETRIES', 4))
+        self.backoff_seconds = float(os.getenv('GITHUB_RETRY_BACKOFF', 1.0))
+        self.max_wait_seconds = float(os.getenv('GITHUB_MAX_RETRY_WAIT', 60))
+        self.bucket = TokenBucket(float(os.getenv('GITHUB_BURST_SECONDS', 60)))
+
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.stats = {'requests': 0, 'coalesced': 0, 'retries': 0, 'rate_limited': 0}
+        self.rate_limit: Dict[str, Optional[int]] = {'limit': None, 'remaining': None, 'reset': None}
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats['coalesced'] += 1
+        else:
+            task = asyncio.ensure_future(self._execute(call))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: one caller giving up must not cancel the request for the others
+        return await asyncio.shield(task)
+
+    def observe(self, response: httpx.Response):
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        reset = response.headers.get('X-RateLimit-Reset')
+        if remaining is None or reset is None:
+            return
+        self.rate_limit = {
+            'limit': int(response.headers.get('X-RateLimit-Limit', 0)),
+            'remaining': int(remaining),
+            'reset': int(reset)
+        }
+        self.bucket.update(int(remaining), int(reset))
+
+    def _retry_delay(self, response: httpx.Response, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying, or None if the response is final"""
+        if response.status_code not in (403, 429):
+            return None
+        retry_after = response.headers.get('Retry-After')
+        if retry_after is not None:
+            return float(retry_after)
+        if response.headers.get('X-RateLimit-Remaining') == '0':
+            # Primary limit exhausted: wait for the window to reset
+            return max(float(response.headers.get('X-RateLimit-Reset', 0)) - time.time(), 0) + 1
+        if 'secondary rate limit' in response.text.lower():
+            return self.backoff_seconds * (2 ** attempt)
+        return None  # an ordinary 403 (permissions), not a rate limit
+
+    async def _execute(self, call: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        attempt = 0
+        while True:
+            await self.bucket.acquire()
+            self.stats['requests'] += 1
+            response = await call()
+            self.observe(response)
+
+            delay = self._retry_delay(response, attempt)
+            if delay is None:
+                return response
+            self.stats['rate_limited'] += 1
+            if attempt >= self.max_retries or delay > self.max_wait_seconds:
+                return response
+            attempt += 1
+            self.stats['retries'] += 1
+            await asyncio.sleep(delay)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'in_flight': len(self._inflight),
+            'rate_limit': dict(self.rate_limit),
+            'paced_rate_per_second': round(self.bucket.rate, 3) if self.bucket.rate is not None else None
+        }
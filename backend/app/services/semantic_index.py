@@ -0,0 +1,485 @@
+# app/services/semantic_index.py
+import keyword
+import os
+import re
+import textwrap
+import threading
+import time
+import zlib
+import numpy as np
+from itertools import chain
+from typing import Dict, Iterable, List, Any, Optional, Sequence, Tuple
+from app.services.code_analysis import code_analysis_service
+from app.services.parse_limits import ParseLimitError
+
+_IDENTIFIER = re.compile(r'[A-Za-z][A-Za-z0-9]*')
+_WORD = re.compile(r'[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+')
+# Words present in nearly every function say nothing about what it does
+_STOP_WORDS = {word.lower() for word in keyword.kwlist} | {
+    'self', 'cls', 'args', 'kwargs', 'the', 'an', 'of', 'to', 'and', 'or', 'is', 'be', 'it',
+    'this', 'that', 'with', 'on', 'by', 'at', 'from', 'str', 'int', 'bool', 'dict', 'list',
+    'optional', 'any', 'returns', 'param', 'value'
+}
+
+
+def split_words(text: str) -> List[str]:
+    """Lower-cased words of identifiers and prose: parse_JSONFile -> parse, json, file"""
+    words = []
+    for identifier in _IDENTIFIER.findall(text):
+        for word in _WORD.findall(identifier):
+            word = word.lower()
+            if len(word) < 2 or word in _STOP_WORDS:
+                continue
+            if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+                word = word[:-1]  # crude plural folding: files/file, parses/parse
+            words.append(word)
+    return words
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.maximum(norms, 1e-12, out=norms)
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first, without sorting the rest"""
+    if k >= scores.size:
+        return np.argsort(-scores)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+class HashingEncoder:
+    """
+    Dependency-free text embedding: identifier words and word bigrams are
+    hashed into `dim` signed buckets (the hashing trick), counts are damped
+    with log1p and the vector is L2-normalized. Functions sharing vocabulary
+    (parse/json/file, retry/request) land close together under cosine.
+    """
+    name = 'hashing'
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self._buckets: Dict[str, Tuple[int, float]] = {}
+
+    def _bucket(self, feature: str) -> Tuple[int, float]:
+        bucket = self._buckets.get(feature)
+        if bucket is None:
+            digest = zlib.crc32(feature.encode())
+            bucket = (digest % self.dim, 1.0 if digest & 0x80000000 else -1.0)
+            if len(self._buckets) < 500_000:
+                self._buckets[feature] = bucket
+        return bucket
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = split_words(text)
+            if not words:
+                continue
+            # Bigrams count half: they add word order without drowning the unigrams
+            features = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+            weights = np.ones(len(features))
+            weights[len(words):] = 0.5
+            buckets = [self._bucket(feature) for feature in features]
+            indices = np.fromiter((bucket[0] for bucket in buckets), dtype=np.int64, count=len(buckets))
+            signs = np.fromiter((bucket[1] for bucket in buckets), dtype=np.float64, count=len(buckets))
+            counts = np.bincount(indices, weights=signs * weights, minlength=self.dim)
+            vectors[row] = np.sign(counts) * np.log1p(np.abs(counts))
+        return _normalize(vectors)
+
+
+class ModelEncoder:
+    """Mean-pooled last hidden state of the loaded causal LM (one forward pass per batch)"""
+    name = 'model'
+
+    def __init__(self, model, tokenizer, max_length: int = 256, batch_size: int = 16):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.dim = model.config.hidden_size
+        if tokenizer.pad_token_id is None:
+            tokenizer.pad_token = tokenizer.eos_token
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        import torch
+
+        pooled = []
+        for start in range(0, len(texts), self.batch_size):
+            inputs = self.tokenizer(list(texts[start:start + self.batch_size]), padding=True, truncation=True,
+                                    max_length=self.max_length, return_tensors="pt").to(self.model.device)
+            with torch.no_grad():
+                hidden = self.model(**inputs, output_hidden_states=True).hidden_states[-1]
+            mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            mean = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+            pooled.append(mean.float().cpu().numpy())
+        if not pooled:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return _normalize(np.concatenate(pooled))
+
+
+class VectorIndex:
+    """
+    Cosine top-k over unit vectors kept in one contiguous float32 matrix.
+
+    Small indexes are searched exactly with a single matrix product. Past
+    `ivf_min_size` vectors the index trains IVF partitions: spherical k-means
+    centroids (about sqrt(n) of them), each vector filed under its nearest one,
+    and a query only scores the vectors of its `nprobe` closest partitions.
+    Partitions are retrained whenever the index has grown 4x since the last
+    training. Removal moves the last row into the hole so rows stay dense.
+    """
+    def __init__(self, dim: int, nprobe: int = 8, ivf_min_size: int = 20_000,
+                 capacity: int = 1024, seed: int = 1):
+        self.dim = dim
+        self.nprobe = nprobe
+        self.ivf_min_size = ivf_min_size
+        self._rng = np.random.default_rng(seed)
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._assignments = np.zeros(capacity, dtype=np.int32)
+        self._keys: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._partitions: List[set] = []
+        self._trained_size = 0
+        self.training_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    @property
+    def partition_count(self) -> int:
+        return len(self._partitions)
+
+    def _reserve(self, size: int):
+        capacity = self._vectors.shape[0]
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:len(self._keys)] = self._vectors[:len(self._keys)]
+        assignments = np.zeros(capacity, dtype=np.int32)
+        assignments[:len(self._keys)] = self._assignments[:len(self._keys)]
+        self._vectors, self._assignments = vectors, assignments
+
+    def add(self, keys: Sequence[str], vectors: np.ndarray):
+        """Insert or replace unit vectors under `keys`"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(keys), self.dim)
+        with self._lock:
+            fresh = []
+            for key, vector in zip(keys, vectors):
+                row = self._rows.get(key)
+                if row is None:
+                    fresh.append((key, vector))
+                else:
+                    self._vectors[row] = vector
+                    if self._centroids is not None:
+                        self._partitions[self._assignments[row]].discard(row)
+                        self._file(np.array([row]))
+            start = len(self._keys)
+            self._reserve(start + len(fresh))
+            for offset, (key, vector) in enumerate(fresh):
+                self._rows[key] = start + offset
+                self._keys.append(key)
+                self._vectors[start + offset] = vector
+            if fresh and self._centroids is not None:
+                self._file(np.arange(start, len(self._keys)))
+            if len(self._keys) >= max(self.ivf_min_size, 4 * self._trained_size):
+                self._train()
+
+    def remove(self, keys: Sequence[str]) -> int:
+        removed = 0
+        with self._lock:
+            for key in keys:
+                row = self._rows.pop(key, None)
+                if row is None:
+                    continue
+                removed += 1
+                last = len(self._keys) - 1
+                if self._centroids is not None:
+                    self._partitions[self._assignments[row]].discard(row)
+                if row != last:
+                    moved = self._keys[last]
+                    self._keys[row] = moved
+                    self._rows[moved] = row
+                    self._vectors[row] = self._vectors[last]
+                    if self._centroids is not None:
+                        partition = self._assignments[last]
+                        self._partitions[partition].discard(last)
+                        self._partitions[partition].add(row)
+                        self._assignments[row] = partition
+                self._keys.pop()
+        return removed
+
+    def _assign(self, rows: np.ndarray) -> np.ndarray:
+        """Nearest centroid of each row, in chunks to bound the score matrix"""
+        assignments = np.empty(rows.size, dtype=np.int32)
+        chunk = max(1, (1 << 24) // len(self._centroids))
+        for start in range(0, rows.size, chunk):
+            block = self._vectors[rows[start:start + chunk]]
+            assignments[start:start + chunk] = np.argmax(block @ self._centroids.T, axis=1)
+        return assignments
+
+    def _file(self, rows: np.ndarray):
+        assignments = self._assign(rows)
+        self._assignments[rows] = assignments
+        for row, partition in zip(rows.tolist(), assignments.tolist()):
+            self._partitions[partition].add(row)
+
+    def _train(self, iterations: int = 10):
+        """Spherical k-means on a sample, then file every vector under its centroid"""
+        started = time.perf_counter()
+        size = len(self._keys)
+        count = int(min(max(np.sqrt(size), 16), 4096))
+        sample_rows = self._rng.choice(size, size=min(size, 32 * count), replace=False)
+        sample = self._vectors[sample_rows]
+        centroids = sample[self._rng.choice(sample.shape[0], size=count, replace=False)]
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            empty = np.flatnonzero(np.bincount(labels, minlength=count) == 0)
+            # Empty clusters restart from random sample points
+            sums[empty] = sample[self._rng.choice(sample.shape[0], size=empty.size)]
+            centroids = _normalize(sums)
+
+        self._centroids = centroids
+        self._partitions = [set() for _ in range(count)]
+        self._file(np.arange(size))
+        self._trained_size = size
+        self.training_seconds = time.perf_counter() - started
+        print(f"🧭 Semantic index: {count} partitions trained over {size} vectors "
+              f"in {self.training_seconds:.1f}s")
+
+    def search(self, queries: np.ndarray, k: int = 10, exact: bool = False) -> List[List[Tuple[str, float]]]:
+        """Top-k (key, cosine) per query row, best first"""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            size = len(self._keys)
+            if size == 0 or k <= 0:
+                return [[] for _ in queries]
+            if exact or self._centroids is None:
+                return self._search_exact(queries, k, size)
+            return [self._search_partitions(query, k) for query in queries]
+
+    def _search_exact(self, queries: np.ndarray, k: int, size: int) -> List[List[Tuple[str, float]]]:
+        results = []
+        # Batches of queries share one pass over the matrix, capped at ~64 MB of scores
+        step = max(1, (1 << 24) // size)
+        for start in range(0, len(queries), step):
+            scores = queries[start:start + step] @ self._vectors[:size].T
+            for row_scores in scores:
+                top = _top_k(row_scores, k)
+                results.append([(self._keys[row], float(row_scores[row])) for row in top])
+        return results
+
+    def _search_partitions(self, query: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        probes = _top_k(self._centroids @ query, self.nprobe)
+        members = [self._partitions[probe] for probe in probes]
+        rows = np.fromiter(chain.from_iterable(members), dtype=np.int64, count=sum(map(len, members)))
+        if rows.size == 0:
+            return []
+        scores = self._vectors[rows] @ query
+        top = _top_k(scores, k)
+        return [(self._keys[rows[i]], float(scores[i])) for i in top]
+
+
+class SemanticSearchService:
+    """
+    Embedding index over functions of analyzed repositories: search by
+    meaning, and documented neighbours as few-shot docstring examples
+    """
+    def __init__(self):
+        self.encoder_name = os.getenv('SEMANTIC_ENCODER', 'hashing')  # 'hashing' or 'model'
+        self.dim = int(os.getenv('SEMANTIC_DIM', 256))
+        self.nprobe = int(os.getenv('SEMANTIC_NPROBE', 8))
+        self.ivf_min_size = int(os.getenv('SEMANTIC_IVF_MIN_SIZE', 20_000))
+        self.index_repositories = os.getenv('SEMANTIC_INDEX_REPOSITORIES', 'true').lower() in ('1', 'true', 'yes')
+        self.few_shot_count = int(os.getenv('SEMANTIC_FEW_SHOT', 2))
+        self.few_shot_min_score = float(os.getenv('SEMANTIC_FEW_SHOT_MIN_SCORE', 0.4))
+        self._encoder = None
+        self.functions: Optional[VectorIndex] = None
+        self.examples: Optional[VectorIndex] = None  # documented functions only
+        # key -> (repository, path, name, lineno); kept as tuples, there can be millions
+        self.metadata: Dict[str, Tuple[str, str, str, int]] = {}
+        self._example_text: Dict[str, str] = {}
+        # (repository, path) -> keys of the file's functions; re-indexing a file replaces them all
+        self._files: Dict[Tuple[str, str], List[str]] = {}
+        self._repositories: Dict[str, set] = {}  # repository -> indexed paths
+        self._lock = threading.Lock()
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            encoder = None
+            if self.encoder_name == 'model':
+                from app.services.registry import get_ai_service
+                ai_service = get_ai_service()
+                if ai_service.model is not None:
+                    encoder = ModelEncoder(ai_service.model, ai_service.tokenizer)
+                else:
+                    print("📋 Semantic index: no model loaded, using the hashing encoder")
+            self._encoder = encoder or HashingEncoder(self.dim)
+            self.functions = VectorIndex(self._encoder.dim, self.nprobe, self.ivf_min_size)
+            self.examples = VectorIndex(self._encoder.dim, self.nprobe, self.ivf_min_size)
+        return self._encoder
+
+    def _example(self, lines: List[str], docstring: str) -> Optional[str]:
+        """Signature plus docstring of a documented function, rendered as a few-shot example"""
+        if len(docstring.split()) < 3 or len(docstring) > 800:
+            return None
+        header = []
+        for line in textwrap.dedent('\n'.join(lines)).split('\n'):
+            header.append(line)
+            if line.rstrip().endswith(':'):
+                break
+        else:
+            return None
+        indent = re.match(r'\s*', header[0]).group(0) + '    '
+        body = '\n'.join(indent + line if line else '' for line in docstring.split('\n'))
+        return '\n'.join(header) + f'\n{indent}"""\n{body}\n{indent}"""'
+
+    def index_functions(self, repository: str, path: str, functions: List[Any], content: str) -> int:
+        """
+        Index the functions of one analyzed file (FunctionInfo records or dicts with line spans),
+        replacing whatever was indexed for that file before
+        """
+        encoder = self.encoder
+        lines = content.split('\n')
+        keys, texts, rows = [], [], []
+        for function in functions:
+            source_lines = lines[function['lineno'] - 1:function['end_lineno']]
+            key = f"{repository}:{path}:{function['lineno']}"
+            keys.append(key)
+            # The name goes in twice: it is the densest statement of intent
+            texts.append(function['name'] + '\n' + '\n'.join(source_lines))
+            rows.append((function['name'], function['lineno'], self._example(source_lines, function['docstring'] or '')))
+        vectors = encoder.encode(texts) if keys else None
+
+        documented = [i for i, row in enumerate(rows) if row[2]]
+        with self._lock:
+            # Keys carry line numbers: edited files would otherwise leave their old functions behind
+            self._remove_keys(self._files.pop((repository, path), ()))
+            if not keys:
+                self._repositories.get(repository, set()).discard(path)
+                return 0
+            self.functions.add(keys, vectors)
+            if documented:
+                self.examples.add([keys[i] for i in documented], vectors[documented])
+            for key, (name, lineno, example) in zip(keys, rows):
+                self.metadata[key] = (repository, path, name, lineno)
+                if example:
+                    self._example_text[key] = example
+            self._files[(repository, path)] = keys
+            self._repositories.setdefault(repository, set()).add(path)
+        return len(keys)
+
+    def index_files(self, repository: str, files: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Parse and index Python files
+        Expects: {'path/to/module.py': 'python code content', ...}
+        """
+        indexed = 0
+        failed = []
+        for path, content in files.items():
+            if not path.endswith('.py'):
+                continue
+            try:
+                analysis = code_analysis_service.parse_python_file_bounded(content)
+            except ParseLimitError as e:
+                failed.append({'file': path, 'error': e.message})
+                continue
+            if not analysis['success']:
+                failed.append({'file': path, 'error': analysis.get('error', 'parse failed')})
+                continue
+            indexed += self.index_functions(repository, path, analysis['functions'], content)
+        return {'repository': repository, 'indexed_functions': indexed, 'failed_files': failed}
+
+    def remove_repository(self, repository: str) -> int:
+        """Drop every function of a repository"""
+        with self._lock:
+            keys = []
+            for path in self._repositories.pop(repository, ()):
+                keys.extend(self._files.pop((repository, path), ()))
+            self._remove_keys(keys)
+        return len(keys)
+
+    def retain_files(self, repository: str, paths: Iterable[str]) -> int:
+        """Drop a repository's files that are not in `paths`, e.g. deleted since it was last indexed"""
+        paths = set(paths)
+        with self._lock:
+            indexed = self._repositories.get(repository, set())
+            keys = []
+            for path in indexed - paths:
+                keys.extend(self._files.pop((repository, path), ()))
+            indexed &= paths
+            self._remove_keys(keys)
+        return len(keys)
+
+    def _remove_keys(self, keys: List[str]):
+        """Drop functions from both indexes and the metadata; the caller holds the lock"""
+        if not keys:
+            return
+        self.functions.remove(keys)
+        self.examples.remove(keys)
+        for key in keys:
+            self.metadata.pop(key, None)
+            self._example_text.pop(key, None)
+
+    def search(self, query: str, k: int = 10, repository: str = "", exact: bool = False) -> List[Dict[str, Any]]:
+        """Indexed functions closest in meaning to a description or a code snippet"""
+        vector = self.encoder.encode([query])
+        # A repository filter is applied to an over-fetched candidate list
+        fetch = k * 4 if repository else k
+        results = []
+        for key, score in self.functions.search(vector, fetch, exact)[0]:
+            entry = self.metadata.get(key)
+            if entry is None or (repository and entry[0] != repository):
+                continue
+            results.append({
+                'repository': entry[0],
+                'file': entry[1],
+                'name': entry[2],
+                'lineno': entry[3],
+                'score': round(score, 4)
+            })
+            if len(results) == k:
+                break
+        return results
+
+    def few_shot_examples(self, function_code: str, k: Optional[int] = None) -> List[str]:
+        """Docstrings of the most similar documented functions, for the generation prompt"""
+        if self._encoder is None or not self.examples:
+            return []
+        k = self.few_shot_count if k is None else k
+        vector = self.encoder.encode([function_code])
+        examples = []
+        for key, score in self.examples.search(vector, k)[0]:
+            text = self._example_text.get(key)
+            if score >= self.few_shot_min_score and text:
+                examples.append(text)
+        return examples
+
+    def stats(self) -> Dict[str, Any]:
+        indexed = self.functions is not None
+        return {
+            'encoder': self._encoder.name if indexed else None,
+            'dimensions': self._encoder.dim if indexed else None,
+            'repositories': len(self._repositories),
+            'functions': len(self.functions) if indexed else 0,
+            'documented_examples': len(self.examples) if indexed else 0,
+            'partitions': self.functions.partition_count if indexed else 0,
+            'nprobe': self.nprobe,
+            'matrix_bytes': self.functions._vectors.nbytes + self.examples._vectors.nbytes if indexed else 0
+        }
+
+
+# Create global instance
+semantic_search_service = SemanticSearchService()
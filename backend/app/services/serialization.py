@@ -0,0 +1,41 @@
+# app/services/serialization.py
+import json
+from typing import Any, Optional
+from fastapi import Response
+from app.services.analysis_types import to_plain
+
+# Optional fast encoders; the plain json module is the fallback
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_TYPES = ('application/msgpack', 'application/x-msgpack')
+
+
+def encode_json(payload: Any) -> bytes:
+    """Serialize straight to bytes; orjson handles the slotted dataclasses natively"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, default=to_plain, separators=(',', ':')).encode('utf-8')
+
+
+def encode_msgpack(payload: Any) -> bytes:
+    return msgpack.packb(payload, default=to_plain, use_bin_type=True)
+
+
+def fast_response(payload: Any, accept: Optional[str] = None, status_code: int = 200) -> Response:
+    """
+    Pre-serialized response that bypasses FastAPI's jsonable_encoder.
+    Returns MessagePack when the client asks for it and msgpack is installed.
+    """
+    if accept and msgpack is not None and any(t in accept for t in MSGPACK_TYPES):
+        return Response(content=encode_msgpack(payload), status_code=status_code,
+                        media_type='application/msgpack')
+    return Response(content=encode_json(payload), status_code=status_code,
+                    media_type='application/json')
@@ -0,0 +1,101 @@
+# app/services/text_decoding.py
+import codecs
+from typing import List, Optional
+
+# Optional statistical detector (installed alongside requests); BOM/UTF-8/Latin-1 is the fallback
+try:
+    from charset_normalizer import from_bytes
+except ImportError:
+    from_bytes = None
+
+SAMPLE_BYTES = 64 * 1024
+
+# Legacy encodings source files realistically use; without this restriction
+# the detector happily picks exotic code pages (mac_latin2, cp775) for short,
+# repetitive code samples
+CANDIDATE_ENCODINGS = ['cp1252', 'latin_1', 'cp1250', 'cp1251', 'shift_jis', 'euc_jp',
+                       'gb18030', 'big5', 'euc_kr', 'koi8_r']
+
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+class FileTooLargeError(ValueError):
+    pass
+
+
+def detect_encoding(sample: bytes) -> str:
+    """
+    Pick a codec from the first bytes of a file: byte-order mark, then UTF-8
+    (tolerating a multi-byte sequence cut at the end of the sample), then
+    charset_normalizer when available, then Latin-1, which decodes anything
+    """
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    if from_bytes is not None:
+        match = from_bytes(sample, cp_isolation=CANDIDATE_ENCODINGS).best()
+        if match is not None:
+            return match.encoding
+    return 'latin-1'
+
+
+def decode_bytes(data: bytes, max_bytes: Optional[int] = None) -> str:
+    """Decode a whole file held in memory with the detected encoding"""
+    if max_bytes is not None and len(data) > max_bytes:
+        raise FileTooLargeError(f"File is {len(data)} bytes, above the {max_bytes} byte limit")
+    return data.decode(detect_encoding(data[:SAMPLE_BYTES]), errors='replace')
+
+
+class StreamDecoder:
+    """
+    Decodes a file fed in chunks. The first SAMPLE_BYTES are held back to
+    detect the encoding, after which chunks go through an incremental
+    decoder, so only the text (never base64 or a second bytes copy of the
+    whole file) is kept. Feeding more than max_bytes raises FileTooLargeError.
+    """
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.received = 0
+        self.encoding: Optional[str] = None
+        self._sample: List[bytes] = []
+        self._sample_size = 0
+        self._decoder = None
+        self._parts: List[str] = []
+
+    def _start(self):
+        sample = b''.join(self._sample)
+        self._sample = []
+        self.encoding = detect_encoding(sample[:SAMPLE_BYTES])
+        self._decoder = codecs.getincrementaldecoder(self.encoding)(errors='replace')
+        self._parts.append(self._decoder.decode(sample))
+
+    def feed(self, chunk: bytes):
+        self.received += len(chunk)
+        if self.max_bytes is not None and self.received > self.max_bytes:
+            raise FileTooLargeError(f"File exceeds the {self.max_bytes} byte limit")
+        if self._decoder is not None:
+            self._parts.append(self._decoder.decode(chunk))
+            return
+        self._sample.append(chunk)
+        self._sample_size += len(chunk)
+        if self._sample_size >= SAMPLE_BYTES:
+            self._start()
+
+    def finish(self) -> str:
+        if self._decoder is None:
+            self._start()
+        self._parts.append(self._decoder.decode(b'', final=True))
+        text = ''.join(self._parts)
+        self._parts = []
+        return text
@@ -0,0 +1,263 @@
+# app/services/webhook_service.py
+import asyncio
+import hashlib
+import hmac
+import os
+import threading
+import time
+from typing import Dict, List, Any, Optional, Set, Tuple
+from app.services.async_github import async_github_client
+from app.services.code_analysis import code_analysis_service
+from app.services.parse_limits import ParseLimitError
+from app.services.registry import ServiceUnavailable, get_github_service
+from app.services.text_decoding import decode_bytes
+
+EMPTY_SHA = '0' * 40
+# A push webhook lists at most 2048 commits. (20 is the cap of PushEvent payloads
+# in the Events API, which also carry the real count in 'size'.)
+MAX_PAYLOAD_COMMITS = 2048
+
+
+def verify_signature(secret: str, body: bytes, signature_header: Optional[str]) -> bool:
+    """Check an X-Hub-Signature-256 header against the raw request body"""
+    if not secret or not signature_header or not signature_header.startswith('sha256='):
+        return False
+    expected = 'sha256=' + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected.encode(), signature_header.encode())
+
+
+def local_mirrors():
+    """The GitHub service's mirror store, or None if mirrors (or the service) aren't configured"""
+    try:
+        return get_github_service().mirrors
+    except ServiceUnavailable:
+        return None
+
+
+def paths_from_commits(commits: List[Dict[str, Any]]) -> Tuple[Set[str], Set[str]]:
+    """
+    Net (changed, removed) paths over a push's commits, oldest first,
+    so a file added and then deleted in the same push ends up removed
+    """
+    changed: Set[str] = set()
+    removed: Set[str] = set()
+    for commit in commits:
+        for path in commit.get('added', []) + commit.get('modified', []):
+            removed.discard(path)
+            changed.add(path)
+        for path in commit.get('removed', []):
+            changed.discard(path)
+            removed.add(path)
+    return changed, removed
+
+
+class AnalysisStore:
+    """Latest per-file analysis of each (repository, branch), updated in place"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._branches: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def apply(self, repo: str, branch: str, head: str,
+              results: Dict[str, Dict[str, Any]], removed: Set[str]):
+        with self._lock:
+            state = self._branches.setdefault((repo, branch), {'head': None, 'files': {}, 'updated_at': None})
+            state['files'].update(results)
+            for path in removed:
+                state['files'].pop(path, None)
+            state['head'] = head
+            state['updated_at'] = time.time()
+
+    def drop(self, repo: str, branch: str):
+        with self._lock:
+            self._branches.pop((repo, branch), None)
+
+    def get(self, repo: str, branch: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            state = self._branches.get((repo, branch))
+            if state is None:
+                return None
+            return {'repository': repo, 'branch': branch, 'head': state['head'],
+                    'updated_at': state['updated_at'], 'files': dict(state['files'])}
+
+    def branches(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{'repository': repo, 'branch': branch, 'head': state['head'], 'file_count': len(state['files'])}
+                    for (repo, branch), state in self._branches.items()]
+
+
+class WebhookService:
+    """
+    Keeps stored analysis fresh from GitHub push events.
+
+    Pushes to the same branch are debounced: each one merges its changed
+    paths into a pending batch and restarts a short timer (bounded by a
+    maximum delay), so a burst of pushes costs one fetch-and-analyze pass
+    over the files that actually changed.
+    """
+    def __init__(self):
+        self.secret = os.getenv('GITHUB_WEBHOOK_SECRET', '')
+        self.debounce_seconds = float(os.getenv('WEBHOOK_DEBOUNCE_SECONDS', 2))
+        self.max_delay_seconds = float(os.getenv('WEBHOOK_MAX_DELAY_SECONDS', 30))
+        self.extensions = tuple(os.getenv('WEBHOOK_EXTENSIONS', '.py').split(','))
+
+        self.store = AnalysisStore()
+        self._pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._timers: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._running: Set[asyncio.Task] = set()
+        self._branch_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self.stats = {'pushes': 0, 'batches': 0, 'files_analyzed': 0, 'files_removed': 0, 'compare_fallbacks': 0}
+
+    # -------------------- INTAKE --------------------
+    def handle_push(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge a push into the pending batch for its branch and (re)arm the timer"""
+        repo = payload['repository']['full_name']
+        ref = payload.get('ref', '')
+        if not ref.startswith('refs/heads/'):
+            return {'status': 'ignored', 'reason': f'not a branch push: {ref}'}
+        branch = ref[len('refs/heads/'):]
+        key = (repo, branch)
+        self.stats['pushes'] += 1
+
+        if payload.get('deleted'):
+            self._pending.pop(key, None)
+            timer = self._timers.pop(key, None)
+            if timer is not None:
+                timer.cancel()
+            self.store.drop(repo, branch)
+            return {'status': 'branch deleted', 'repository': repo, 'branch': branch}
+
+        commits = payload.get('commits') or []
+        now = time.monotonic()
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = {
+                'before': payload.get('before', EMPTY_SHA),
+                'changed': set(), 'removed': set(),
+                'needs_compare': False, 'first_seen': now, 'pushes': 0
+            }
+        batch['after'] = payload['after']
+        batch['pushes'] += 1
+
+        # The commit list is capped and omitted for some pushes; then diff the refs instead
+        truncated = len(commits) >= MAX_PAYLOAD_COMMITS or payload.get('size', 0) > len(commits)
+        if payload.get('forced') or truncated or (not commits and not payload.get('created')):
+            batch['needs_compare'] = True
+        changed, removed = paths_from_commits(commits)
+        batch['removed'] = (batch['removed'] - changed) | removed
+        batch['changed'] = (batch['changed'] - removed) | changed
+
+        timer = self._timers.get(key)
+        if timer is not None and not timer.done():
+            timer.cancel()
+        delay = max(0.0, min(self.debounce_seconds, batch['first_seen'] + self.max_delay_seconds - now))
+        self._timers[key] = asyncio.get_running_loop().create_task(self._flush_after(key, delay))
+        return {'status': 'scheduled', 'repository': repo, 'branch': branch,
+                'pending_paths': len(batch['changed']) + len(batch['removed']), 'delay_seconds': delay}
+
+    async def _flush_after(self, key: Tuple[str, str], delay: float):
+        await asyncio.sleep(delay)
+        batch = self._pending.pop(key, None)
+        self._timers.pop(key, None)
+        if batch is None:
+            return
+        # From here on the task is no longer a cancellable timer
+        task = asyncio.current_task()
+        self._running.add(task)
+        lock = self._branch_locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:  # batches for one branch are applied in push order
+                await self._process(key, batch)
+        except Exception as e:
+            print(f"Webhook re-analysis failed for {key[0]}@{key[1]}: {e}")
+        finally:
+            self._running.discard(task)
+
+    async def flush(self):
+        """Run every pending batch now and wait for in-progress ones (shutdown, tools)"""
+        for timer in self._timers.values():
+            timer.cancel()
+        loop = asyncio.get_running_loop()
+        self._timers = {key: loop.create_task(self._flush_after(key, 0)) for key in self._pending}
+        await asyncio.gather(*self._timers.values(), *self._running, return_exceptions=True)
+
+    # -------------------- PROCESSING --------------------
+    async def _compare(self, repo: str, before: str, after: str) -> Tuple[Set[str], Set[str]]:
+        self.stats['compare_fallbacks'] += 1
+        mirrors = await asyncio.to_thread(local_mirrors)
+        if mirrors is not None and mirrors.is_tracked(repo):
+            await asyncio.to_thread(mirrors.fetch, repo)
+            changes = await asyncio.to_thread(mirrors.diff, repo, before, after)
+            files = [{'status': change['status'], 'filename': change['path'],
+                      'previous_filename': change.get('old_path')} for change in changes]
+        else:
+            comparison = await async_github_client.get_json(f"/repos/{repo}/compare/{before}...{after}")
+            files = comparison.get('files', [])
+
+        changed: Set[str] = set()
+        removed: Set[str] = set()
+        for entry in files:
+            status = entry['status']
+            if status in ('removed', 'D'):
+                removed.add(entry['filename'])
+                continue
+            if entry.get('previous_filename'):
+                removed.add(entry['previous_filename'])
+            changed.add(entry['filename'])
+        return changed, removed
+
+    async def _fetch(self, repo: str, paths: List[str], ref: str) -> Dict[str, Dict[str, Any]]:
+        mirrors = await asyncio.to_thread(local_mirrors)
+        if mirrors is not None and mirrors.is_tracked(repo):
+            await asyncio.to_thread(mirrors.fetch, repo)
+
+            def read_all():
+                results = {}
+                for path in paths:
+                    try:
+                        results[path] = {'content': decode_bytes(mirrors.read_blob(repo, path, ref))}
+                    except Exception as e:
+                        results[path] = {'error': str(e)}
+                return results
+            return await asyncio.to_thread(read_all)
+        return await async_github_client.fetch_files(repo, paths, ref)
+
+    def _analyze(self, content: str, path: str) -> Dict[str, Any]:
+        extension = '.' + path.rsplit('.', 1)[-1]
+        try:
+            # Push payloads come from outside: same size limits and worker isolation as the archive analysis
+            if extension == '.py':
+                return code_analysis_service.parse_python_file_bounded(content)
+            return code_analysis_service.analyze_repository_file(content, extension)
+        except ParseLimitError as e:
+            return {'success': False, 'error': e.message, 'functions': [], 'classes': [], 'imports': []}
+
+    async def _process(self, key: Tuple[str, str], batch: Dict[str, Any]):
+        repo, branch = key
+        changed, removed = batch['changed'], batch['removed']
+        if batch['needs_compare'] and batch['before'] != EMPTY_SHA:
+            changed, removed = await self._compare(repo, batch['before'], batch['after'])
+
+        paths = sorted(path for path in changed if path.endswith(self.extensions))
+        fetched = await self._fetch(repo, paths, batch['after']) if paths else {}
+
+        results = {}
+        for path, result in fetched.items():
+            if 'error' in result:
+                results[path] = {'success': False, 'error': result['error'],
+                                 'functions': [], 'classes': [], 'imports': []}
+            else:
+                results[path] = await asyncio.to_thread(self._analyze, result['content'], path)
+
+        self.store.apply(repo, branch, batch['after'], results, removed)
+        self.stats['batches'] += 1
+        self.stats['files_analyzed'] += len(results)
+        self.stats['files_removed'] += len(removed)
+        print(f"Re-analyzed {len(results)} file(s) of {repo}@{branch} "
+              f"({batch['pushes']} push(es), {len(removed)} removed)")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, 'pending_batches': len(self._pending), 'branches': self.store.branches()}
+
+
+# Create a global instance
+webhook_service = WebhookService()
@@ -0,0 +1,149 @@
+# bench_analysis.py
+# End-to-end response time of /api/analysis/analyze-python for a large file:
+# the endpoint as it was at the baseline commit (its own parser and summary,
+# read with `git show`, plain dicts through jsonable_encoder) against the
+# current one (slotted records, pre-serialized JSON or MessagePack). The
+# current parser also computes end lines and metrics per function, so the
+# comparison is of the two endpoints as shipped, not of equal work.
+#
+# Behaviour changes since the baseline parser, visible in the output below:
+# - functions and classes are listed depth-first in source order (a method
+#   right after its class body starts), where ast.walk was breadth-first
+#   (all top-level definitions, then nested ones)
+# - functions, classes and imports are read-only records: item access works
+#   like on the old dicts, but assigning a key raises TypeError; use to_dict()
+#   for a mutable copy
+# Run from the backend directory: python bench_analysis.py [baseline-rev]
+# (default: the repository's root commit)
+import os
+import subprocess
+import sys
+import time
+import timeit
+import types
+
+# Keep parsing in-process so both paths differ only in serialization
+os.environ.setdefault('ANALYSIS_ISOLATE_CHARS', str(10 ** 9))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.routers import analysis
+from app.services.code_analysis import code_analysis_service
+from app.services.serialization import encode_json, encode_msgpack, msgpack
+
+FUNCTION_COUNT = 5000
+ROUNDS = 5
+
+ORDER_SAMPLE = """
+class Store:
+    def get(self, key):
+        def normalize(k):
+            return k.lower()
+        return normalize(key)
+
+def main():
+    return Store()
+"""
+
+
+def load_baseline_service(rev: str):
+    """CodeAnalysisService of code_analysis.py at `rev`, imported under a private module name"""
+    source = subprocess.run(['git', 'show', f'{rev}:backend/app/services/code_analysis.py'],
+                            capture_output=True, text=True, check=True).stdout
+    module = types.ModuleType('baseline_code_analysis')
+    exec(compile(source, f'{rev}:code_analysis.py', 'exec'), module.__dict__)
+    return module.code_analysis_service
+
+
+def root_commit() -> str:
+    return subprocess.run(['git', 'rev-list', '--max-parents=0', 'HEAD'],
+                          capture_output=True, text=True, check=True).stdout.split()[-1]
+
+
+BASELINE_REV = sys.argv[1] if len(sys.argv) > 1 else root_commit()
+baseline_service = load_baseline_service(BASELINE_REV)
+
+app = FastAPI()
+app.include_router(analysis.router, prefix="/api/analysis")
+
+
+@app.post("/baseline/analyze-python")
+async def baseline_analyze(code: dict):
+    """The baseline endpoint: parse, build the summary, return plain dicts"""
+    result = baseline_service.parse_python_file(code['code'])
+    return {'analysis': result, 'summary': baseline_service.get_code_summary(result), 'language': 'python'}
+
+
+def build_source(count):
+    return '\n\n'.join(
+        f"def function_{i}(alpha, beta, gamma=None):\n"
+        f"    \"\"\"Docstring for function {i}.\"\"\"\n"
+        f"    if alpha and beta:\n"
+        f"        return helper_{i % 50}(alpha) + beta\n"
+        f"    return gamma"
+        for i in range(count)
+    )
+
+
+def time_endpoint(client, path, payload, headers=None):
+    timings = []
+    size = 0
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        response = client.post(path, json=payload, headers=headers or {})
+        timings.append(time.perf_counter() - start)
+        size = len(response.content)
+        assert response.status_code == 200, response.text
+    timings.sort()
+    return timings[len(timings) // 2], size
+
+
+if __name__ == "__main__":
+    client = TestClient(app)
+    payload = {'code': build_source(FUNCTION_COUNT)}
+    print(f"Baseline: code_analysis.py at {BASELINE_REV[:12]}")
+
+    timings = {}
+    for label, service in (("baseline", baseline_service), ("current", code_analysis_service)):
+        start = time.perf_counter()
+        parsed = service.parse_python_file(payload['code'])
+        parse_ms = (time.perf_counter() - start) * 1000
+        summary_ms = min(timeit.repeat(lambda: service.get_code_summary(parsed), number=20, repeat=5)) / 20 * 1000
+        timings[label] = parsed
+        print(f"Parse {label:9s} {parse_ms:8.1f} ms   summary {summary_ms:6.2f} ms (best of 5 x 20)")
+    baseline_result, result = timings['baseline'], timings['current']
+
+    payload_out = {'analysis': result, 'summary': '', 'language': 'python'}
+    baseline_out = {'analysis': baseline_result, 'summary': '', 'language': 'python'}
+    encoders = [
+        ("baseline: jsonable_encoder + JSONResponse", lambda: JSONResponse(jsonable_encoder(baseline_out)).body),
+        ("current: encode_json", lambda: encode_json(payload_out)),
+    ]
+    if msgpack is not None:
+        encoders.append(("current: encode_msgpack", lambda: encode_msgpack(payload_out)))
+    for label, encode in encoders:
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            encode()
+        print(f"Serialize {label:42s} {(time.perf_counter() - start) / ROUNDS * 1000:8.1f} ms")
+
+    for label, path, headers in [
+        ("before (baseline endpoint)", "/baseline/analyze-python", None),
+        ("after (pre-serialized JSON)", "/api/analysis/analyze-python", None),
+        ("after (MessagePack)", "/api/analysis/analyze-python", {'Accept': 'application/msgpack'}),
+    ]:
+        median, size = time_endpoint(client, path, payload, headers)
+        print(f"{label:32s} median {median * 1000:8.1f} ms  {size / 1024:8.1f} KiB")
+
+    print("\nFunction order on a nested sample:")
+    for label, service in (("baseline", baseline_service), ("current", code_analysis_service)):
+        names = [f['name'] for f in service.parse_python_file(ORDER_SAMPLE)['functions']]
+        print(f"  {label:9s} {names}")
+    record = code_analysis_service.parse_python_file(ORDER_SAMPLE)['functions'][0]
+    try:
+        record['name'] = 'renamed'
+        print("Records accept item assignment")
+    except TypeError as e:
+        print(f"Records are read-only ({e}); to_dict() gives a mutable copy")
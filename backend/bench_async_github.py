@@ -0,0 +1,78 @@
+# bench_async_github.py
+# Fetches many files from a local mock GitHub API with injected latency,
+# sequentially through the blocking GitHubService and concurrently through
+# the pooled AsyncGitHubClient.
+# Run from the backend directory: python bench_async_github.py
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FILE_COUNT = 100
+LATENCY_SECONDS = 0.05
+
+
+class SlowGitHub(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so connection reuse is visible
+    connections = set()
+
+    def do_GET(self):
+        SlowGitHub.connections.add(self.client_address)
+        time.sleep(LATENCY_SECONDS)
+        name = self.path.split('?')[0].rsplit('/', 1)[-1]
+        body = json.dumps({
+            'type': 'file', 'name': name, 'path': name, 'size': 20, 'download_url': None,
+            'sha': hashlib.sha1(name.encode()).hexdigest(), 'encoding': 'base64',
+            'content': base64.b64encode(f"def {name[:-3]}():\n    pass\n".encode()).decode()
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowGitHub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['GITHUB_API_URL'] = f"http://127.0.0.1:{server.server_port}"
+    os.environ.setdefault('GITHUB_ACCESS_TOKEN', 'mock-token')
+
+    from app.services.github_service import GitHubService, github_response_cache
+    from app.services.async_github import AsyncGitHubClient
+
+    paths = [f"f{i}.py" for i in range(FILE_COUNT)]
+
+    service = GitHubService()
+    start = time.perf_counter()
+    for path in paths:
+        service.get_file_content('octo/demo', path)
+    sequential = time.perf_counter() - start
+    print(f"Sequential (GitHubService): {sequential:6.2f}s  {FILE_COUNT / sequential:7.1f} files/s")
+
+    for concurrency in (5, 10, 20):
+        os.environ['GITHUB_CONCURRENCY'] = str(concurrency)
+        SlowGitHub.connections = set()
+        # Both clients share one response cache; start each run cold
+        github_response_cache().fresh.clear()
+        client = AsyncGitHubClient()
+
+        async def run():
+            start = time.perf_counter()
+            results = await client.fetch_files('octo/demo', paths)
+            elapsed = time.perf_counter() - start
+            await client.aclose()
+            assert all('content' in r for r in results.values())
+            return elapsed
+
+        elapsed = asyncio.run(run())
+        print(f"Async, concurrency {concurrency:3d}:    {elapsed:6.2f}s  {FILE_COUNT / elapsed:7.1f} files/s"
+              f"  ({len(SlowGitHub.connections)} TCP connections)")
+    server.shutdown()
@@ -0,0 +1,102 @@
+# bench_github_cache.py
+# Replays a request trace against a local mock GitHub API and reports cache hit
+# rates and rate-limit consumption. The mock only charges the rate limit for
+# non-304 responses, like GitHub does for authenticated conditional requests.
+# Run from the backend directory: python bench_github_cache.py
+import base64
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TRACE_LENGTH = 3000
+FILE_COUNT = 200
+REPLAY_SECONDS = 3.0
+
+
+class MockGitHub(BaseHTTPRequestHandler):
+    files = {f"src/module_{i}.py": f"def f{i}():\n    return {i}\n" for i in range(FILE_COUNT)}
+    remaining = 5000
+    charged = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        prefix = '/repos/octo/demo/contents/'
+        if not path.startswith(prefix) or path[len(prefix):] not in self.files:
+            return self._send(404, b'{"message": "Not Found"}')
+
+        file_path = path[len(prefix):]
+        content = self.files[file_path]
+        etag = '"' + hashlib.sha1(content.encode()).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            return self._send(304, b'', etag)
+
+        with MockGitHub.lock:
+            MockGitHub.remaining -= 1
+            MockGitHub.charged += 1
+        body = json.dumps({
+            'type': 'file', 'name': file_path.rsplit('/', 1)[-1], 'path': file_path,
+            'size': len(content), 'download_url': None, 'sha': etag.strip('"'), 'encoding': 'base64',
+            'content': base64.b64encode(content.encode()).decode()
+        }).encode()
+        self._send(200, body, etag)
+
+    def _send(self, status, body, etag=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-RateLimit-Limit', '5000')
+        self.send_header('X-RateLimit-Remaining', str(MockGitHub.remaining))
+        self.send_header('X-RateLimit-Reset', str(int(time.time()) + 3600))
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def build_trace(seed=7):
+    """Zipf-like popularity: a few hot files account for most requests"""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(FILE_COUNT)]
+    names = list(MockGitHub.files)
+    return rng.choices(names, weights=weights, k=TRACE_LENGTH)
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockGitHub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['GITHUB_API_URL'] = f"http://127.0.0.1:{server.server_port}"
+    os.environ.setdefault('GITHUB_ACCESS_TOKEN', 'mock-token')
+    # Short freshness window so the replay exercises ETag revalidation too
+    os.environ.setdefault('GITHUB_CONTENT_CACHE_TTL', '0.25')
+
+    from app.services.github_service import GitHubService
+    service = GitHubService()
+
+    trace = build_trace()
+    delay = REPLAY_SECONDS / len(trace)
+    start = time.perf_counter()
+    for index, file_path in enumerate(trace):
+        if index == len(trace) // 2:
+            # Half-way through, a push changes a few hot files
+            for name in list(MockGitHub.files)[:5]:
+                MockGitHub.files[name] += "# changed\n"
+        service.get_file_content('octo/demo', file_path)
+        time.sleep(delay)
+    elapsed = time.perf_counter() - start
+
+    stats = service.cache_stats()
+    print(f"Replayed {len(trace)} lookups of {FILE_COUNT} files in {elapsed:.1f}s")
+    print(f"Fresh-cache hit rate:     {stats['content_cache']['hit_rate']:.1%}")
+    print(f"HTTP requests sent:       {stats['requests']['requests']}")
+    print(f"  of which 304 Not Modified: {stats['requests']['not_modified']}")
+    print(f"Rate limit consumed:      {MockGitHub.charged} (uncached baseline: {len(trace)})")
+    print(f"Remaining budget seen:    {stats['rate_limit']['remaining']}")
+    server.shutdown()
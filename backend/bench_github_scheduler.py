@@ -0,0 +1,123 @@
+# bench_github_scheduler.py
+# Drives the AsyncGitHubClient against a local mock GitHub API that enforces
+# a primary rate limit (fixed budget per window) and a secondary limit
+# (too many concurrent requests -> 403 "secondary rate limit"), and reports
+# how the request scheduler coalesces, paces and retries.
+# Run from the backend directory: python bench_github_scheduler.py
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WINDOW_SECONDS = 4
+WINDOW_BUDGET = 40
+MAX_CONCURRENT = 4
+LATENCY_SECONDS = 0.05
+
+
+class LimitedGitHub(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    lock = threading.Lock()
+    active = 0
+    hits = 0
+    secondary_rejections = 0
+    primary_rejections = 0
+    window_start = time.time()
+    used = 0
+
+    def do_GET(self):
+        cls = LimitedGitHub
+        with cls.lock:
+            now = time.time()
+            if now - cls.window_start >= WINDOW_SECONDS:
+                cls.window_start, cls.used = now, 0
+            reset = int(cls.window_start + WINDOW_SECONDS) + 1
+            cls.hits += 1
+            if cls.used >= WINDOW_BUDGET:
+                cls.primary_rejections += 1
+                return self._send(403, b'{"message": "API rate limit exceeded"}', 0, reset)
+            if cls.active >= MAX_CONCURRENT:
+                cls.secondary_rejections += 1
+                return self._send(403, b'{"message": "You have exceeded a secondary rate limit."}',
+                                  WINDOW_BUDGET - cls.used, reset)
+            cls.active += 1
+            cls.used += 1
+            remaining = WINDOW_BUDGET - cls.used
+
+        time.sleep(LATENCY_SECONDS)
+        name = self.path.split('?')[0].rsplit('/', 1)[-1]
+        body = json.dumps({
+            'type': 'file', 'name': name, 'path': name, 'size': 20, 'download_url': None,
+            'sha': hashlib.sha1(name.encode()).hexdigest(), 'encoding': 'base64',
+            'content': base64.b64encode(f"def {name[:-3]}():\n    pass\n".encode()).decode()
+        }).encode()
+        with cls.lock:
+            cls.active -= 1
+        self._send(200, body, remaining, reset)
+
+    def _send(self, status, body, remaining, reset):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-RateLimit-Limit', str(WINDOW_BUDGET))
+        self.send_header('X-RateLimit-Remaining', str(remaining))
+        self.send_header('X-RateLimit-Reset', str(reset))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def reset_counters():
+    LimitedGitHub.hits = LimitedGitHub.secondary_rejections = LimitedGitHub.primary_rejections = 0
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(('127.0.0.1', 0), LimitedGitHub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['GITHUB_API_URL'] = f"http://127.0.0.1:{server.server_port}"
+    os.environ.setdefault('GITHUB_ACCESS_TOKEN', 'mock-token')
+    os.environ.setdefault('GITHUB_RETRY_BACKOFF', '0.2')
+    os.environ.setdefault('GITHUB_MAX_RETRIES', '8')
+    os.environ.setdefault('GITHUB_BURST_SECONDS', '1')
+    os.environ['GITHUB_CONCURRENCY'] = '10'
+
+    from app.services.async_github import AsyncGitHubClient
+
+    async def run():
+        client = AsyncGitHubClient()
+
+        # 1. Many users open the same file at the same moment
+        reset_counters()
+        results = await asyncio.gather(*(client.get_file_content('octo/demo', 'hot.py') for _ in range(50)))
+        assert len(set(results)) == 1
+        print(f"50 concurrent identical requests -> {LimitedGitHub.hits} upstream call(s), "
+              f"{client.scheduler.stats['coalesced']} coalesced")
+
+        await client.aclose()
+
+        # 2. Fan-out wider than the secondary limit allows, and more than one window's budget.
+        #    A fresh client has seen no rate-limit headers yet, so its first burst is unpaced.
+        client = AsyncGitHubClient()
+        reset_counters()
+        paths = [f"f{i}.py" for i in range(60)]
+        start = time.perf_counter()
+        fetched = await client.fetch_files('octo/demo', paths)
+        elapsed = time.perf_counter() - start
+        failed = [path for path, result in fetched.items() if 'error' in result]
+        print(f"60 distinct files in {elapsed:.1f}s: {len(paths) - len(failed)} ok, {len(failed)} failed")
+        print(f"  upstream calls {LimitedGitHub.hits}, secondary-limit 403s {LimitedGitHub.secondary_rejections}, "
+              f"primary-limit 403s {LimitedGitHub.primary_rejections}")
+
+        metrics = client.scheduler.metrics()
+        print(f"Scheduler: {metrics['retries']} retries, remaining budget {metrics['rate_limit']['remaining']}"
+              f"/{metrics['rate_limit']['limit']}, paced at {metrics['paced_rate_per_second']} req/s")
+        await client.aclose()
+
+    asyncio.run(run())
+    server.shutdown()
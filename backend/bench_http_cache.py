@@ -0,0 +1,86 @@
+# bench_http_cache.py
+# Bytes transferred and latency of repeated frontend requests to the analysis
+# and test-generation endpoints: plain routers vs the caching/compression
+# middleware (first request, server cache hit, If-None-Match revalidation).
+# Run from the backend directory: python bench_http_cache.py
+import os
+import statistics
+import time
+
+# Rule-based generation keeps the numbers about HTTP, not model inference
+os.environ.setdefault('AI_ENABLE_MODEL', 'false')
+os.environ.setdefault('GITHUB_ACCESS_TOKEN', 'unused')  # no GitHub calls are made
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.main import app as cached_app, http_cache_stats, response_cache
+from app.routers import analysis, tests
+
+FUNCTION_COUNT = 800
+ROUNDS = 20
+
+plain_app = FastAPI()
+plain_app.include_router(analysis.router, prefix="/api/analysis")
+plain_app.include_router(tests.router, prefix="/api/tests")
+
+
+def make_source(count: int) -> str:
+    return "\n\n".join(
+        f"def handler_{i}(request, retries=3, *args, **kwargs):\n"
+        f"    \"\"\"Handle request {i}\"\"\"\n"
+        f"    for attempt in range(retries):\n"
+        f"        if request.ok:\n"
+        f"            return request.value + {i}\n"
+        f"    return None"
+        for i in range(count)
+    )
+
+
+REQUESTS = {
+    'analyze-python': ('/api/analysis/analyze-python', {'code': make_source(FUNCTION_COUNT)}),
+    'generate-test': ('/api/tests/generate-test', {
+        'function_code': "def scale(values, factor=2):\n    return [v * factor for v in values]",
+        'function_name': 'scale'
+    }),
+}
+
+
+def measure(client: TestClient, path: str, payload: dict, headers: dict, rounds: int):
+    """Median latency (ms) and downloaded bytes per request, plus the last response"""
+    timings, sizes = [], []
+    response = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        response = client.post(path, json=payload, headers=headers)
+        timings.append((time.perf_counter() - start) * 1000)
+        sizes.append(response.num_bytes_downloaded)
+    return statistics.median(timings), statistics.mean(sizes), response
+
+
+def main():
+    plain = TestClient(plain_app)
+    cached = TestClient(cached_app)
+    print(f"{'endpoint':24s} {'scenario':28s} {'median ms':>10s} {'bytes/req':>11s}  status")
+    for name, (path, payload) in REQUESTS.items():
+        response_cache.clear()
+        rows = []
+        rows.append(('no middleware, identity',) +
+                    measure(plain, path, payload, {'Accept-Encoding': 'identity'}, ROUNDS))
+        rows.append(('first request (miss)',) +
+                    measure(cached, path, payload, {'Accept-Encoding': 'gzip, br'}, 1))
+        rows.append(('repeat (server cache hit)',) +
+                    measure(cached, path, payload, {'Accept-Encoding': 'gzip, br'}, ROUNDS))
+        etag = rows[-1][3].headers['etag']
+        rows.append(('repeat with If-None-Match',) +
+                    measure(cached, path, payload, {'Accept-Encoding': 'gzip, br', 'If-None-Match': etag}, ROUNDS))
+        for scenario, latency, size, response in rows:
+            encoding = response.headers.get('content-encoding', '-')
+            print(f"{name:24s} {scenario:28s} {latency:10.2f} {size:11,.0f}  {response.status_code} {encoding}")
+        baseline, revalidated = rows[0], rows[-1]
+        print(f"{'':24s} {'repeats vs no middleware':28s} {baseline[1] / max(revalidated[1], 1e-9):9.1f}x "
+              f"{1 - revalidated[2] / max(baseline[2], 1):10.1%} fewer bytes\n")
+    print("Middleware counters:", http_cache_stats)
+
+
+if __name__ == "__main__":
+    main()
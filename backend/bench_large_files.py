@@ -0,0 +1,101 @@
+# bench_large_files.py
+# Peak Python memory (tracemalloc) while fetching a 50 MB file from a local
+# stand-in GitHub API: the old path (whole base64 Contents payload -> bytes ->
+# str) against GitHubService.get_file_content, which streams large files from
+# the blobs API through an incremental decoder. Also checks encoding detection.
+# Run from the backend directory: python bench_large_files.py
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+
+FILE_MB = 50
+
+LINE = "def f(x):\n    return 'café' + x  # ünïcode\n"
+BIG = (LINE * (FILE_MB * 1024 * 1024 // len(LINE.encode('utf-8')))).encode('utf-8')
+LATIN = "# Résumé généré automatiquement\nname = 'Zoë'\n".encode('latin-1') * 2000
+
+
+class StandInGitHub(BaseHTTPRequestHandler):
+    files = {'big.py': BIG, 'latin.py': LATIN}
+    shas = {hashlib.sha1(data).hexdigest(): data for data in files.values()}
+    # Bodies are built up front so the server thread allocates nothing while measuring
+    inline = {
+        name: json.dumps({'type': 'file', 'name': name, 'path': name, 'size': len(data), 'sha': hashlib.sha1(data).hexdigest(),
+                          'encoding': 'base64', 'content': base64.b64encode(data).decode()}).encode()
+        for name, data in files.items()
+    }
+    metadata = {
+        name: json.dumps({'type': 'file', 'name': name, 'path': name, 'size': len(data), 'sha': hashlib.sha1(data).hexdigest(),
+                          'encoding': 'none', 'content': ''}).encode()
+        for name, data in files.items()
+    }
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path.startswith('/legacy/'):
+            return self._send(self.inline[path.rsplit('/', 1)[-1]])
+        if '/git/blobs/' in path:
+            return self._send(self.shas[path.rsplit('/', 1)[-1]], 'application/vnd.github.raw')
+        name = path.rsplit('/', 1)[-1]
+        data = self.files[name]
+        # Like GitHub: files over 1 MB come back without inline content
+        self._send(self.metadata[name] if len(data) > 1024 * 1024 else self.inline[name])
+
+    def _send(self, body, content_type='application/json'):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        view = memoryview(body)
+        for start in range(0, len(body), 1024 * 1024):
+            self.wfile.write(view[start:start + 1024 * 1024])
+
+    def log_message(self, *args):
+        pass
+
+
+def measure(label, fetch):
+    tracemalloc.start()
+    start = time.perf_counter()
+    text = fetch()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:34s} peak {peak / 2 ** 20:7.1f} MB  {elapsed:5.2f}s  ({len(text) / 2 ** 20:.1f} M chars)")
+    return text
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInGitHub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['GITHUB_API_URL'] = f"http://127.0.0.1:{server.server_port}"
+    os.environ.setdefault('GITHUB_ACCESS_TOKEN', 'mock-token')
+
+    from app.services.github_service import GitHubService
+    service = GitHubService()
+    service.get_file_content('octo/demo', 'latin.py')  # warm imports and the connection pool
+
+    def legacy():
+        payload = requests.get(f"{service.api_url}/legacy/big.py", timeout=60).json()
+        return base64.b64decode(payload['content']).decode('utf-8')
+
+    old = measure(f"Old path ({FILE_MB} MB, base64 inline)", legacy)
+    del old
+    new = measure(f"Streamed blob ({FILE_MB} MB)", lambda: service.get_file_content('octo/demo', 'big.py'))
+    assert new == BIG.decode('utf-8')
+    del new
+
+    print("Latin-1 file decodes as:", repr(service.get_file_content('octo/demo', 'latin.py')[:30]))
+
+    service.max_file_bytes = 10 * 1024 * 1024
+    try:
+        service.get_file_content('octo/demo', 'big.py')
+    except Exception as e:
+        print("Max-size guard:", e)
+    server.shutdown()
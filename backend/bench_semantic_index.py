@@ -0,0 +1,89 @@
+# bench_semantic_index.py
+# Query latency and recall of the semantic function index at scale: exact
+# cosine top-k (one matrix-vector product over every row) vs IVF partitions,
+# plus encoder throughput on this repository's own functions.
+# Synthetic vectors are clustered like real embeddings (functions form topics);
+# uniformly random vectors would make every partition equally (un)likely.
+# Run from the backend directory: python bench_semantic_index.py [size]
+import glob
+import os
+import statistics
+import sys
+import time
+import numpy as np
+
+from app.services.semantic_index import HashingEncoder, VectorIndex, split_words
+from app.services.code_analysis import code_analysis_service
+
+SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+DIM = 256
+TOPICS = 5_000
+QUERIES = 200
+K = 10
+BATCH = 50_000
+
+
+def clustered_vectors(rng, centers: np.ndarray, count: int, spread: float = 0.03) -> np.ndarray:
+    vectors = centers[rng.integers(0, len(centers), size=count)]
+    vectors = vectors + rng.normal(scale=spread, size=vectors.shape).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def timed_search(index: VectorIndex, queries: np.ndarray, exact: bool):
+    results, timings = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(index.search(query, K, exact=exact)[0])
+        timings.append((time.perf_counter() - start) * 1000)
+    return results, timings
+
+
+def main():
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(TOPICS, DIM)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+
+    index = VectorIndex(DIM, nprobe=8)
+    start = time.perf_counter()
+    for offset in range(0, SIZE, BATCH):
+        count = min(BATCH, SIZE - offset)
+        index.add([f"fn{offset + i}" for i in range(count)], clustered_vectors(rng, centers, count))
+    build = time.perf_counter() - start
+    print(f"Indexed {len(index):,} x {DIM} float32 ({index._vectors[:len(index)].nbytes / 2**20:,.0f} MB) "
+          f"in {build:.1f}s, {index.partition_count} partitions (last training {index.training_seconds:.1f}s)")
+
+    queries = clustered_vectors(rng, centers, QUERIES)
+    exact, exact_ms = timed_search(index, queries, exact=True)
+    approximate, ivf_ms = timed_search(index, queries, exact=False)
+    recall = statistics.mean(
+        len({key for key, _ in found} & {key for key, _ in truth}) / K
+        for found, truth in zip(approximate, exact)
+    )
+    print(f"{'search':10s} {'p50 ms':>8s} {'p95 ms':>8s}")
+    for name, timings in (('exact', exact_ms), ('ivf', ivf_ms)):
+        timings = sorted(timings)
+        print(f"{name:10s} {statistics.median(timings):8.2f} {timings[int(len(timings) * 0.95)]:8.2f}")
+    print(f"IVF recall@{K} vs exact: {recall:.3f}  (nprobe={index.nprobe})")
+
+    start = time.perf_counter()
+    removed = index.remove([f"fn{i}" for i in range(0, SIZE, 10)])
+    print(f"Removed {removed:,} functions in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    # Encoder throughput on real code
+    texts = []
+    for path in glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '**', '*.py'), recursive=True):
+        content = open(path, encoding='utf-8').read()
+        lines = content.split('\n')
+        for function in code_analysis_service.parse_python_file(content)['functions']:
+            texts.append('\n'.join(lines[function['lineno'] - 1:function['end_lineno']]))
+    encoder = HashingEncoder(DIM)
+    start = time.perf_counter()
+    encoder.encode(texts)
+    seconds = time.perf_counter() - start
+    words = sum(len(split_words(text)) for text in texts)
+    print(f"Hashing encoder: {len(texts)} functions ({words:,} words) in {seconds * 1000:.0f} ms, "
+          f"{len(texts) / seconds:,.0f} functions/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# check_archive_analysis.py
+# End-to-end check of GitHubService.analyze_repository_archive against a local
+# stand-in for the tarball endpoint serving a small fixture .tar.gz: nested
+# paths, non-Python members, a Latin-1 file, a file that fails to parse and a
+# ref that must reach the server as a single quoted path segment. Also checks
+# that a failed download keeps the previous semantic index and that files
+# removed from the repository are pruned from it on the next analysis.
+# Exits with code 1 on the first failed check.
+# Run from the backend directory: python check_archive_analysis.py
+import io
+import os
+import sys
+import tarfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REF = 'feature/x y#1'
+QUOTED_REF = 'feature%2Fx%20y%231'
+
+FIXTURE = {
+    'setup.py': b'from setuptools import setup\n\nsetup(name="demo")\n',
+    'pkg/__init__.py': b'',
+    'pkg/core/deep/util.py': (
+        b'def parse_config(path):\n'
+        b'    """Read the YAML configuration file at path"""\n'
+        b'    with open(path) as f:\n'
+        b'        return f.read()\n'
+    ),
+    'pkg/legacy.py': (
+        '# -*- coding: latin-1 -*-\n'
+        'def accent():\n'
+        '    """Renvoie le mot \u00e9t\u00e9"""\n'
+        '    return "\u00e9t\u00e9"\n'
+    ).encode('latin-1'),
+    'pkg/broken.py': b'def broken(:\n    pass\n',
+    'README.md': b'# demo\n',
+    'pkg/notes.txt': b'not python\n',
+    'data/blob.bin': bytes(range(256)),
+}
+PYTHON_FILES = {'setup.py', 'pkg/__init__.py', 'pkg/core/deep/util.py', 'pkg/legacy.py', 'pkg/broken.py'}
+
+
+def build_archive(files) -> bytes:
+    """Gzipped tarball laid out like GitHub's: everything under "owner-repo-sha/" """
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as archive:
+        directory = tarfile.TarInfo('octo-demo-0123abc/pkg/looks_like.py')
+        directory.type = tarfile.DIRTYPE
+        archive.addfile(directory)
+        for path, data in files.items():
+            member = tarfile.TarInfo(f'octo-demo-0123abc/{path}')
+            member.size = len(data)
+            member.mtime = int(time.time())
+            archive.addfile(member, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+class MockTarball(BaseHTTPRequestHandler):
+    archive = build_archive(FIXTURE)
+    requested = []
+
+    def do_GET(self):
+        MockTarball.requested.append(self.path)
+        if self.path not in ('/repos/octo/demo/tarball', f'/repos/octo/demo/tarball/{QUOTED_REF}'):
+            return self._send(404, b'{"message": "Not Found"}', 'application/json')
+        self._send(200, MockTarball.archive, 'application/x-gzip')
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def check(condition: bool, message: str):
+    print(f"{'✅' if condition else '❌'} {message}")
+    if not condition:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockTarball)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['GITHUB_API_URL'] = f"http://127.0.0.1:{server.server_port}"
+    os.environ.setdefault('GITHUB_ACCESS_TOKEN', 'mock-token')
+    os.environ.pop('GITHUB_MIRROR_DIR', None)
+    os.environ['SEMANTIC_INDEX_REPOSITORIES'] = 'true'
+
+    from app.services.github_service import GitHubService
+    from app.services.semantic_index import semantic_search_service
+
+    service = GitHubService()
+    result = service.analyze_repository_archive('octo/demo', REF)
+    check(MockTarball.requested[-1] == f'/repos/octo/demo/tarball/{QUOTED_REF}',
+          f"ref sent as one quoted segment: {MockTarball.requested[-1]}")
+    check(set(result['files']) == PYTHON_FILES, f"only Python files, wrapper directory stripped: {sorted(result['files'])}")
+    check(result['failed_count'] == 1 and not result['files']['pkg/broken.py']['success'],
+          "the unparsable file is reported as failed")
+    names = {function['name'] for analysis in result['files'].values() for function in analysis['functions']}
+    check(names == {'parse_config', 'accent'}, f"functions found: {sorted(names)}")
+    legacy = result['files']['pkg/legacy.py']['functions'][0]
+    check(legacy['docstring'] == 'Renvoie le mot \u00e9t\u00e9', f"Latin-1 file decoded: {legacy['docstring']!r}")
+
+    hits = semantic_search_service.search('read yaml configuration file', 1, 'octo/demo')
+    check(bool(hits) and hits[0]['file'] == 'pkg/core/deep/util.py', f"indexed for semantic search: {hits}")
+
+    try:
+        service.analyze_repository_archive('octo/demo', 'no-such-ref')
+        check(False, "unknown ref raises")
+    except Exception as e:
+        check('not found' in str(e), f"unknown ref raises: {e}")
+    hits = semantic_search_service.search('read yaml configuration file', 1, 'octo/demo')
+    check(bool(hits), "a failed download keeps the previous index")
+
+    MockTarball.archive = build_archive({path: data for path, data in FIXTURE.items()
+                                         if path != 'pkg/core/deep/util.py'})
+    result = service.analyze_repository_archive('octo/demo')
+    check(MockTarball.requested[-1] == '/repos/octo/demo/tarball', "no ref: default branch tarball")
+    hits = semantic_search_service.search('read yaml configuration file', 10, 'octo/demo')
+    check(all(hit['file'] != 'pkg/core/deep/util.py' for hit in hits),
+          f"files deleted from the repository leave the index: {[hit['file'] for hit in hits]}")
+    server.shutdown()
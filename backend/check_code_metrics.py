@@ -0,0 +1,92 @@
+# check_code_metrics.py
+# Per-function metrics from CodeAnalysisService.parse_python_file on small
+# fixtures with known complexity and nesting (a flat if/elif chain counts as
+# one level), then POST /api/analysis/metrics through the app: aggregation,
+# hot spots and top_n validation.
+# Exits with code 1 on the first failed check.
+# Run from the backend directory: python check_code_metrics.py
+import sys
+import textwrap
+
+FIXTURES = {
+    'straight': ('''
+        def straight(a, b):
+            total = a + b
+            return total
+    ''', {'complexity': 1, 'max_nesting': 0, 'statements': 2, 'params': 2}),
+    'flat_elif': ('''
+        def flat_elif(x):
+            if x == 1:
+                return 'one'
+            elif x == 2:
+                return 'two'
+            elif x == 3:
+                return 'three'
+            elif x == 4:
+                return 'four'
+            else:
+                return 'many'
+    ''', {'complexity': 5, 'max_nesting': 1}),
+    'nested_if': ('''
+        def nested_if(x):
+            if x > 0:
+                if x > 1:
+                    if x > 2:
+                        return 3
+            return 0
+    ''', {'complexity': 4, 'max_nesting': 3}),
+    'elif_with_block': ('''
+        def elif_with_block(items):
+            if not items:
+                return None
+            elif len(items) == 1:
+                for item in items:
+                    if item:
+                        return item
+            return items
+    ''', {'complexity': 5, 'max_nesting': 3}),
+    'else_block': ('''
+        def else_block(x):
+            if x:
+                return 1
+            else:
+                y = x * 2
+                if y:
+                    return y
+            return 0
+    ''', {'complexity': 3, 'max_nesting': 2}),
+}
+
+
+def check(condition: bool, message: str):
+    print(f"{'✅' if condition else '❌'} {message}")
+    if not condition:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.code_analysis import code_analysis_service
+
+    sources = {f'{name}.py': textwrap.dedent(source) for name, (source, _) in FIXTURES.items()}
+    for name, (_, expected) in FIXTURES.items():
+        result = code_analysis_service.parse_python_file(sources[f'{name}.py'])
+        metrics = result['functions'][0]['metrics']
+        actual = {metric: metrics[metric] for metric in expected}
+        check(actual == expected, f"{name}: {actual}")
+
+    with TestClient(app) as client:
+        response = client.post('/api/analysis/metrics', json={'files': sources, 'top_n': 2})
+        report = response.json()
+        check(response.status_code == 200 and report['function_count'] == len(FIXTURES),
+              f"metrics route: status {response.status_code}, {report.get('function_count')} functions")
+        nesting = [(spot['name'], spot['max_nesting']) for spot in report['hot_spots']['max_nesting']]
+        check([depth for _, depth in nesting] == [3, 3] and 'flat_elif' not in dict(nesting),
+              f"nesting hot spots: {nesting}")
+        check(report['percentiles']['max_nesting']['p50'] == 2.0,
+              f"median nesting: {report['percentiles']['max_nesting']['p50']}")
+
+        for top_n in (0, 101, 'ten', None):
+            response = client.post('/api/analysis/metrics', json={'files': sources, 'top_n': top_n})
+            check(response.status_code == 400, f"top_n={top_n!r}: {response.status_code} {response.json()['detail']}")
@@ -0,0 +1,84 @@
+# check_github_tree.py
+# Calls GET /api/github/tree through the app against a local stand-in for the
+# Git Trees API, once without GitHub credentials (no sync service, async client
+# only) and once with a token but no mirror for the repository. Checks the
+# filters, pagination and the NDJSON stream.
+# Exits with code 1 on the first failed check.
+# Run from the backend directory: python check_github_tree.py
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TREE = [
+    {'path': 'setup.py', 'type': 'blob', 'sha': 'a1', 'size': 120},
+    {'path': 'pkg', 'type': 'tree', 'sha': 'b2'},
+    {'path': 'pkg/core.py', 'type': 'blob', 'sha': 'c3', 'size': 4000},
+    {'path': 'pkg/core.pyi', 'type': 'blob', 'sha': 'd4', 'size': 300},
+    {'path': 'README.md', 'type': 'blob', 'sha': 'e5', 'size': 50},
+]
+
+
+class MockTrees(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/repos/octo/demo':
+            return self._send({'full_name': 'octo/demo', 'default_branch': 'main'})
+        if path == '/repos/octo/demo/git/trees/main':
+            return self._send({'sha': 'main', 'tree': TREE, 'truncated': False})
+        self._send({'message': 'Not Found'}, 404)
+
+    def _send(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def check(condition: bool, message: str):
+    print(f"{'✅' if condition else '❌'} {message}")
+    if not condition:
+        sys.exit(1)
+
+
+def check_tree(client, label: str):
+    response = client.get('/api/github/tree', params={'repo_url': 'octo/demo'})
+    check(response.status_code == 200, f"{label}: status {response.status_code} {response.text[:200]}")
+    check(response.json()['total'] == 4, f"{label}: blobs only by default: {response.json()['total']}")
+
+    response = client.get('/api/github/tree', params={'repo_url': 'octo/demo', 'extensions': '.py,.pyi',
+                                                      'max_size': 1000, 'per_page': 1, 'page': 2})
+    data = response.json()
+    check(data['total'] == 2 and data['has_more'] is False and data['entries'][0]['path'] == 'pkg/core.pyi',
+          f"{label}: filtered and paginated: {data}")
+
+    response = client.get('/api/github/tree', params={'repo_url': 'octo/demo', 'entry_type': '', 'stream': 'true'})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    check(len(lines) == len(TREE), f"{label}: NDJSON stream has every entry: {len(lines)}")
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockTrees)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['GITHUB_API_URL'] = f"http://127.0.0.1:{server.server_port}"
+    os.environ.pop('GITHUB_ACCESS_TOKEN', None)
+    os.environ.pop('GITHUB_MIRROR_DIR', None)
+
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.registry import registry
+
+    with TestClient(app) as client:
+        check_tree(client, "no GitHub service")
+        check(registry.peek('github') is None, "the sync service was not built without a token")
+
+        os.environ['GITHUB_ACCESS_TOKEN'] = 'mock-token'
+        check_tree(client, "GitHub service without mirror")
+        check(registry.peek('github') is not None, "the sync service was consulted for a mirror")
+    server.shutdown()
@@ -0,0 +1,80 @@
+# check_startup_time.py
+# Cold-start budget for the API process: imports app.main in fresh interpreters
+# under `python -X importtime` and fails (exit code 1) if the import takes
+# longer than the budget or pulls in a dependency that must stay lazy.
+# GITHUB_ACCESS_TOKEN is removed from the child environment, so the app must
+# also start without GitHub credentials.
+# Run from the backend directory: python check_startup_time.py [--budget-ms 1500]
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+# Only loaded once a request needs them (model generation, the GitHub API)
+LAZY_MODULES = ('torch', 'transformers', 'github', 'tree_sitter', 'requests')
+
+
+def parse_importtime(stderr: str):
+    """(module, self_us, cumulative_us, depth) rows of -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def measure(module: str):
+    env = dict(os.environ)
+    env.pop('GITHUB_ACCESS_TOKEN', None)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr[-3000:])
+        raise SystemExit(f"❌ import {module} failed")
+    rows = parse_importtime(result.stderr)
+    total = next(cumulative for name, _, cumulative, depth in rows if name == module and depth == 0)
+    return total, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if the API's cold import exceeds a time budget")
+    parser.add_argument('--module', default='app.main')
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('STARTUP_BUDGET_MS', 1500)))
+    parser.add_argument('--runs', type=int, default=3, help='best of N fresh interpreters')
+    parser.add_argument('--top', type=int, default=12)
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    total, rows = min(runs, key=lambda run: run[0])
+    total_ms = total / 1000
+
+    by_package = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        by_package[name.split('.')[0] if not name.startswith('app.') else name] += self_us
+    print(f"Slowest packages and app modules (self time, best of {args.runs}):")
+    for name, self_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {name}")
+
+    failures = []
+    loaded = sorted({name.split('.')[0] for name, _, _, _ in rows} & set(LAZY_MODULES))
+    if loaded:
+        failures.append(f"eagerly imported: {', '.join(loaded)}")
+    if total_ms > args.budget_ms:
+        failures.append(f"import took {total_ms:.0f} ms, budget is {args.budget_ms:.0f} ms")
+
+    print(f"\nimport {args.module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms), "
+          f"{len(rows)} modules")
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ Startup within budget, heavy dependencies stay lazy")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,349 +1,479 @@
+"""
+Génération des datasets de fine-tuning (docstrings et tests).
+
+Pipeline en flux : les templates sont développés paresseusement en variantes
+(paramètres renommés), dédupliqués exactement par hash de contenu, répartis
+en train/eval par hash (reproductible, sans shuffle) et écrits en JSONL,
+éventuellement shardé, compressé et produit par plusieurs workers. La mémoire
+reste constante quel que soit le nombre d'exemples.
+
+Usage :
+    python data_generation.py                                   # les 4 fichiers JSONL habituels
+    python data_generation.py --variants 20000 --workers 8 --shard-size 100000 --compress -o out/
+"""
+import argparse
+import gzip
+import hashlib
+import io
 import json
+import os
 import random
+import time
+import tokenize
+from multiprocessing import Pool
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-# Fonctions pour générer le dataset
-def generate_docstring_dataset():
-    """Génère un dataset de 300 exemples pour les docstrings"""
-    functions = [
-        # Fonctions mathématiques
-        ("def add(a, b):\n    return a + b", "add"),
-        ("def subtract(a, b):\n    return a - b", "subtract"),
-        ("def multiply(a, b):\n    return a * b", "multiply"),
-        ("def divide(a, b):\n    return a / b if b != 0 else None", "divide"),
-        ("def power(base, exponent):\n    return base ** exponent", "power"),
-        ("def sqrt(number):\n    return number ** 0.5", "sqrt"),
-        ("def factorial(n):\n    if n <= 1:\n        return 1\n    return n * factorial(n-1)", "factorial"),
-        ("def is_prime(n):\n    if n < 2:\n        return False\n    for i in range(2, int(n**0.5)+1):\n        if n % i == 0:\n            return False\n    return True", "is_prime"),
-        ("def gcd(a, b):\n    while b:\n        a, b = b, a % b\n    return a", "gcd"),
-        ("def lcm(a, b):\n    return abs(a*b) // gcd(a, b) if a and b else 0", "lcm"),
-        
-        # Fonctions de manipulation de strings
-        ("def reverse_string(s):\n    return s[::-1]", "reverse_string"),
-        ("def count_vowels(s):\n    vowels = 'aeiouAEIOU'\n    return sum(1 for char in s if char in vowels)", "count_vowels"),
-        ("def is_palindrome(s):\n    s = ''.join(c for c in s if c.isalnum()).lower()\n    return s == s[::-1]", "is_palindrome"),
-        ("def capitalize_words(s):\n    return ' '.join(word.capitalize() for word in s.split())", "capitalize_words"),
-        ("def remove_whitespace(s):\n    return ''.join(s.split())", "remove_whitespace"),
-        ("def count_words(s):\n    return len(s.split())", "count_words"),
-        ("def find_substring(s, sub):\n    return s.find(sub)", "find_substring"),
-        ("def replace_substring(s, old, new):\n    return s.replace(old, new)", "replace_substring"),
-        ("def string_to_list(s, delimiter=','):\n    return s.split(delimiter)", "string_to_list"),
-        ("def list_to_string(lst, delimiter=','):\n    return delimiter.join(str(x) for x in lst)", "list_to_string"),
-        
-        # Fonctions de manipulation de listes
-        ("def find_max(lst):\n    return max(lst) if lst else None", "find_max"),
-        ("def find_min(lst):\n    return min(lst) if lst else None", "find_min"),
-        ("def sum_list(lst):\n    return sum(lst)", "sum_list"),
-        ("def average(lst):\n    return sum(lst) / len(lst) if lst else 0", "average"),
-        ("def remove_duplicates(lst):\n    return list(dict.fromkeys(lst))", "remove_duplicates"),
-        ("def flatten(nested_list):\n    result = []\n    for item in nested_list:\n        if isinstance(item, list):\n            result.extend(flatten(item))\n        else:\n            result.append(item)\n    return result", "flatten"),
-        ("def chunk_list(lst, size):\n    return [lst[i:i+size] for i in range(0, len(lst), size)]", "chunk_list"),
-        ("def rotate_list(lst, n):\n    n = n % len(lst)\n    return lst[-n:] + lst[:-n]", "rotate_list"),
-        ("def count_occurrences(lst, item):\n    return lst.count(item)", "count_occurrences"),
-        ("def filter_even_numbers(lst):\n    return [x for x in lst if x % 2 == 0]", "filter_even_numbers"),
-        
-        # Fonctions de manipulation de dictionnaires
-        ("def merge_dicts(d1, d2):\n    result = d1.copy()\n    result.update(d2)\n    return result", "merge_dicts"),
-        ("def invert_dict(d):\n    return {v: k for k, v in d.items()}", "invert_dict"),
-        ("def get_dict_keys(d):\n    return list(d.keys())", "get_dict_keys"),
-        ("def get_dict_values(d):\n    return list(d.values())", "get_dict_values"),
-        ("def filter_dict_by_keys(d, keys):\n    return {k: v for k, v in d.items() if k in keys}", "filter_dict_by_keys"),
-        ("def sort_dict_by_value(d, reverse=False):\n    return dict(sorted(d.items(), key=lambda x: x[1], reverse=reverse))", "sort_dict_by_value"),
-        ("def sort_dict_by_key(d, reverse=False):\n    return dict(sorted(d.items(), key=lambda x: x[0], reverse=reverse))", "sort_dict_by_key"),
-        ("def dict_to_list_of_tuples(d):\n    return list(d.items())", "dict_to_list_of_tuples"),
-        ("def list_of_tuples_to_dict(lst):\n    return dict(lst)", "list_of_tuples_to_dict"),
-        ("def deep_update_dict(d, u):\n    for k, v in u.items():\n        if isinstance(v, dict) and k in d and isinstance(d[k], dict):\n            deep_update_dict(d[k], v)\n        else:\n            d[k] = v\n    return d", "deep_update_dict"),
-        
-        # Fonctions de date et heure
-        ("def get_current_datetime():\n    from datetime import datetime\n    return datetime.now()", "get_current_datetime"),
-        ("def format_datetime(dt, format_str='%Y-%m-%d %H:%M:%S'):\n    return dt.strftime(format_str)", "format_datetime"),
-        ("def parse_datetime(dt_str, format_str='%Y-%m-%d %H:%M:%S'):\n    from datetime import datetime\n    return datetime.strptime(dt_str, format_str)", "parse_datetime"),
-        ("def add_days_to_date(dt, days):\n    from datetime import timedelta\n    return dt + timedelta(days=days)", "add_days_to_date"),
-        ("def date_diff(date1, date2):\n    return abs((date1 - date2).days)", "date_diff"),
-        ("def is_leap_year(year):\n    return (year % 4 == 0 and year % 100 != 0) or (year % 400 == 0)", "is_leap_year"),
-        ("def get_day_of_week(dt):\n    return dt.strftime('%A')", "get_day_of_week"),
-        ("def get_week_number(dt):\n    return dt.isocalendar()[1]", "get_week_number"),
-        ("def datetime_to_timestamp(dt):\n    return dt.timestamp()", "datetime_to_timestamp"),
-        ("def timestamp_to_datetime(ts):\n    from datetime import datetime\n    return datetime.fromtimestamp(ts)", "timestamp_to_datetime"),
-        
-        # Fonctions de fichiers et I/O
-        ("def read_file(filename):\n    with open(filename, 'r') as f:\n        return f.read()", "read_file"),
-        ("def write_file(filename, content):\n    with open(filename, 'w') as f:\n        f.write(content)", "write_file"),
-        ("def append_to_file(filename, content):\n    with open(filename, 'a') as f:\n        f.write(content)", "append_to_file"),
-        ("def file_exists(filename):\n    import os\n    return os.path.exists(filename)", "file_exists"),
-        ("def get_file_size(filename):\n    import os\n    return os.path.getsize(filename)", "get_file_size"),
-        ("def list_files(directory):\n    import os\n    return [f for f in os.listdir(directory) if os.path.isfile(os.path.join(directory, f))]", "list_files"),
-        ("def list_directories(directory):\n    import os\n    return [d for d in os.listdir(directory) if os.path.isdir(os.path.join(directory, d))]", "list_directories"),
-        ("def create_directory(directory):\n    import os\n    os.makedirs(directory, exist_ok=True)", "create_directory"),
-        ("def delete_file(filename):\n    import os\n    if os.path.exists(filename):\n        os.remove(filename)", "delete_file"),
-        ("def get_file_extension(filename):\n    import os\n    return os.path.splitext(filename)[1]", "get_file_extension"),
-        
-        # Fonctions de validation et vérification
-        ("def is_valid_email(email):\n    import re\n    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\\.[a-zA-Z]{2,}$'\n    return bool(re.match(pattern, email))", "is_valid_email"),
-        ("def is_valid_url(url):\n    import re\n    pattern = r'^https?:\\/\\/(?:www\\.)?[-a-zA-Z0-9@:%._\\+~#=]{1,256}\\.[a-zA-Z0-9()]{1,6}\\b(?:[-a-zA-Z0-9()@:%_\\+.~#?&\\/=]*)$'\n    return bool(re.match(pattern, url))", "is_valid_url"),
-        ("def is_valid_phone(phone):\n    import re\n    pattern = r'^\\+?[1-9]\\d{1,14}$'\n    return bool(re.match(pattern, phone))", "is_valid_phone"),
-        ("def is_valid_ip(ip):\n    import re\n    pattern = r'^((25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\\.){3}(25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$'\n    return bool(re.match(pattern, ip))", "is_valid_ip"),
-        ("def is_valid_credit_card(number):\n    def luhn_check(card_number):\n        def digits_of(n):\n            return [int(d) for d in str(n)]\n        digits = digits_of(card_number)\n        odd_digits = digits[-1::-2]\n        even_digits = digits[-2::-2]\n        checksum = sum(odd_digits)\n        for d in even_digits:\n            checksum += sum(digits_of(d*2))\n        return checksum % 10 == 0\n    \n    import re\n    if not re.match(r'^[0-9]{13,19}$', number):\n        return False\n    return luhn_check(number)", "is_valid_credit_card"),
-        ("def is_valid_password(password):\n    if len(password) < 8:\n        return False\n    if not any(char.isupper() for char in password):\n        return False\n    if not any(char.islower() for char in password):\n        return False\n    if not any(char.isdigit() for char in password):\n        return False\n    return True", "is_valid_password"),
-        ("def is_valid_date(date_str, format_str='%Y-%m-%d'):\n    from datetime import datetime\n    try:\n        datetime.strptime(date_str, format_str)\n        return True\n    except ValueError:\n        return False", "is_valid_date"),
-        ("def is_valid_time(time_str, format_str='%H:%M:%S'):\n    from datetime import datetime\n    try:\n        datetime.strptime(time_str, format_str)\n        return True\n    except ValueError:\n        return False", "is_valid_time"),
-        ("def is_valid_json(json_str):\n    import json\n    try:\n        json.loads(json_str)\n        return True\n    except ValueError:\n        return False", "is_valid_json"),
-        ("def is_valid_xml(xml_str):\n    try:\n        import xml.etree.ElementTree as ET\n        ET.fromstring(xml_str)\n        return True\n    except ET.ParseError:\n        return False", "is_valid_xml"),
-        
-        # Fonctions de conversion
-        ("def celsius_to_fahrenheit(c):\n    return (c * 9/5) + 32", "celsius_to_fahrenheit"),
-        ("def fahrenheit_to_celsius(f):\n    return (f - 32) * 5/9", "fahrenheit_to_celsius"),
-        ("def kilometers_to_miles(km):\n    return km * 0.621371", "kilometers_to_miles"),
-        ("def miles_to_kilometers(miles):\n    return miles * 1.60934", "miles_to_kilometers"),
-        ("def kilograms_to_pounds(kg):\n    return kg * 2.20462", "kilograms_to_pounds"),
-        ("def pounds_to_kilograms(lb):\n    return lb * 0.453592", "pounds_to_kilograms"),
-        ("def liters_to_gallons(liters):\n    return liters * 0.264172", "liters_to_gallons"),
-        ("def gallons_to_liters(gallons):\n    return gallons * 3.78541", "gallons_to_liters"),
-        ("def bytes_to_megabytes(bytes):\n    return bytes / (1024 * 1024)", "bytes_to_megabytes"),
-        ("def megabytes_to_gigabytes(mb):\n    return mb / 1024", "megabytes_to_gigabytes"),
-        
-        # Fonctions utilitaires diverses
-        ("def generate_random_string(length=8):\n    import random\n    import string\n    return ''.join(random.choice(string.ascii_letters + string.digits) for _ in range(length))", "generate_random_string"),
-        ("def generate_random_number(min_val=0, max_val=100):\n    import random\n    return random.randint(min_val, max_val)", "generate_random_number"),
-        ("def shuffle_list(lst):\n    import random\n    random.shuffle(lst)\n    return lst", "shuffle_list"),
-        ("def get_environment_variable(name):\n    import os\n    return os.environ.get(name)", "get_environment_variable"),
-        ("def set_environment_variable(name, value):\n    import os\n    os.environ[name] = value", "set_environment_variable"),
-        ("def get_current_username():\n    import getpass\n    return getpass.getuser()", "get_current_username"),
-        ("def get_system_platform():\n    import platform\n    return platform.system()", "get_system_platform"),
-        ("def get_python_version():\n    import sys\n    return sys.version", "get_python_version"),
-        ("def measure_execution_time(func, *args, **kwargs):\n    import time\n    start = time.time()\n    result = func(*args, **kwargs)\n    end = time.time()\n    return result, end - start", "measure_execution_time"),
-        ("def retry_operation(operation, max_attempts=3, delay=1):\n    import time\n    for attempt in range(max_attempts):\n        try:\n            return operation()\n        except Exception as e:\n            if attempt == max_attempts - 1:\n                raise e\n            time.sleep(delay)", "retry_operation"),
-    ]
+# Templates : (code de la fonction, nom de la fonction)
+FUNCTIONS = [
+    # Fonctions mathématiques
+    ("def add(a, b):\n    return a + b", "add"),
+    ("def subtract(a, b):\n    return a - b", "subtract"),
+    ("def multiply(a, b):\n    return a * b", "multiply"),
+    ("def divide(a, b):\n    return a / b if b != 0 else None", "divide"),
+    ("def power(base, exponent):\n    return base ** exponent", "power"),
+    ("def sqrt(number):\n    return number ** 0.5", "sqrt"),
+    ("def factorial(n):\n    if n <= 1:\n        return 1\n    return n * factorial(n-1)", "factorial"),
+    ("def is_prime(n):\n    if n < 2:\n        return False\n    for i in range(2, int(n**0.5)+1):\n        if n % i == 0:\n            return False\n    return True", "is_prime"),
+    ("def gcd(a, b):\n    while b:\n        a, b = b, a % b\n    return a", "gcd"),
+    ("def lcm(a, b):\n    return abs(a*b) // gcd(a, b) if a and b else 0", "lcm"),
     
-    # Générer plus d'exemples en variant les paramètres
-    additional_functions = []
-    for func, name in functions:
-        # Variantes avec différents types de paramètres
-        if "a, b" in func:
-            variants = [
-                func.replace("a, b", "x, y"),
-                func.replace("a, b", "num1, num2"),
-                func.replace("a, b", "first, second"),
-                func.replace("a, b", "value1, value2"),
-            ]
-            additional_functions.extend([(v, name) for v in variants])
+    # Fonctions de manipulation de strings
+    ("def reverse_string(s):\n    return s[::-1]", "reverse_string"),
+    ("def count_vowels(s):\n    vowels = 'aeiouAEIOU'\n    return sum(1 for char in s if char in vowels)", "count_vowels"),
+    ("def is_palindrome(s):\n    s = ''.join(c for c in s if c.isalnum()).lower()\n    return s == s[::-1]", "is_palindrome"),
+    ("def capitalize_words(s):\n    return ' '.join(word.capitalize() for word in s.split())", "capitalize_words"),
+    ("def remove_whitespace(s):\n    return ''.join(s.split())", "remove_whitespace"),
+    ("def count_words(s):\n    return len(s.split())", "count_words"),
+    ("def find_substring(s, sub):\n    return s.find(sub)", "find_substring"),
+    ("def replace_substring(s, old, new):\n    return s.replace(old, new)", "replace_substring"),
+    ("def string_to_list(s, delimiter=','):\n    return s.split(delimiter)", "string_to_list"),
+    ("def list_to_string(lst, delimiter=','):\n    return delimiter.join(str(x) for x in lst)", "list_to_string"),
     
-    functions.extend(additional_functions)
+    # Fonctions de manipulation de listes
+    ("def find_max(lst):\n    return max(lst) if lst else None", "find_max"),
+    ("def find_min(lst):\n    return min(lst) if lst else None", "find_min"),
+    ("def sum_list(lst):\n    return sum(lst)", "sum_list"),
+    ("def average(lst):\n    return sum(lst) / len(lst) if lst else 0", "average"),
+    ("def remove_duplicates(lst):\n    return list(dict.fromkeys(lst))", "remove_duplicates"),
+    ("def flatten(nested_list):\n    result = []\n    for item in nested_list:\n        if isinstance(item, list):\n            result.extend(flatten(item))\n        else:\n            result.append(item)\n    return result", "flatten"),
+    ("def chunk_list(lst, size):\n    return [lst[i:i+size] for i in range(0, len(lst), size)]", "chunk_list"),
+    ("def rotate_list(lst, n):\n    n = n % len(lst)\n    return lst[-n:] + lst[:-n]", "rotate_list"),
+    ("def count_occurrences(lst, item):\n    return lst.count(item)", "count_occurrences"),
+    ("def filter_even_numbers(lst):\n    return [x for x in lst if x % 2 == 0]", "filter_even_numbers"),
     
-    # Générer les docstrings
-    docstrings = []
-    for func_code, func_name in functions:
-        # Générer un docstring basé sur le nom de la fonction et ses paramètres
-        lines = func_code.split('\n')
-        def_line = lines[0]
-        
-        # Extraire les paramètres
-        params_start = def_line.find('(') + 1
-        params_end = def_line.find(')')
-        params_str = def_line[params_start:params_end]
-        params = [p.strip() for p in params_str.split(',')] if params_str else []
-        
-        # Générer le docstring
-        docstring_lines = ['"""']
-        docstring_lines.append(f"{func_name.replace('_', ' ').title()}.")
-        docstring_lines.append("")
-        
-        if params:
-            docstring_lines.append("Args:")
-            for param in params:
-                if '=' in param:
-                    param_name = param.split('=')[0].strip()
-                    default_value = param.split('=')[1].strip()
-                    docstring_lines.append(f"    {param_name} (any): Parameter description. Defaults to {default_value}.")
-                else:
-                    docstring_lines.append(f"    {param} (any): Parameter description.")
-            docstring_lines.append("")
-        
-        docstring_lines.append("Returns:")
-        docstring_lines.append("    any: Return value description.")
-        docstring_lines.append('"""')
-        
-        docstring = '\n'.join(docstring_lines)
-        docstrings.append({"input": func_code, "output": docstring})
+    # Fonctions de manipulation de dictionnaires
+    ("def merge_dicts(d1, d2):\n    result = d1.copy()\n    result.update(d2)\n    return result", "merge_dicts"),
+    ("def invert_dict(d):\n    return {v: k for k, v in d.items()}", "invert_dict"),
+    ("def get_dict_keys(d):\n    return list(d.keys())", "get_dict_keys"),
+    ("def get_dict_values(d):\n    return list(d.values())", "get_dict_values"),
+    ("def filter_dict_by_keys(d, keys):\n    return {k: v for k, v in d.items() if k in keys}", "filter_dict_by_keys"),
+    ("def sort_dict_by_value(d, reverse=False):\n    return dict(sorted(d.items(), key=lambda x: x[1], reverse=reverse))", "sort_dict_by_value"),
+    ("def sort_dict_by_key(d, reverse=False):\n    return dict(sorted(d.items(), key=lambda x: x[0], reverse=reverse))", "sort_dict_by_key"),
+    ("def dict_to_list_of_tuples(d):\n    return list(d.items())", "dict_to_list_of_tuples"),
+    ("def list_of_tuples_to_dict(lst):\n    return dict(lst)", "list_of_tuples_to_dict"),
+    ("def deep_update_dict(d, u):\n    for k, v in u.items():\n        if isinstance(v, dict) and k in d and isinstance(d[k], dict):\n            deep_update_dict(d[k], v)\n        else:\n            d[k] = v\n    return d", "deep_update_dict"),
     
-    return docstrings
-
-def generate_test_dataset():
-    """Génère un dataset de 300 exemples pour les tests"""
-    functions = [
-        # Fonctions mathématiques
-        ("def add(a, b):\n    return a + b", "add"),
-        ("def subtract(a, b):\n    return a - b", "subtract"),
-        ("def multiply(a, b):\n    return a * b", "multiply"),
-        ("def divide(a, b):\n    return a / b if b != 0 else None", "divide"),
-        ("def power(base, exponent):\n    return base ** exponent", "power"),
-        ("def sqrt(number):\n    return number ** 0.5", "sqrt"),
-        ("def factorial(n):\n    if n <= 1:\n        return 1\n    return n * factorial(n-1)", "factorial"),
-        ("def is_prime(n):\n    if n < 2:\n        return False\n    for i in range(2, int(n**0.5)+1):\n        if n % i == 0:\n            return False\n    return True", "is_prime"),
-        
-        # Fonctions de manipulation de strings
-        ("def reverse_string(s):\n    return s[::-1]", "reverse_string"),
-        ("def count_vowels(s):\n    vowels = 'aeiouAEIOU'\n    return sum(1 for char in s if char in vowels)", "count_vowels"),
-        ("def is_palindrome(s):\n    s = ''.join(c for c in s if c.isalnum()).lower()\n    return s == s[::-1]", "is_palindrome"),
-        ("def capitalize_words(s):\n    return ' '.join(word.capitalize() for word in s.split())", "capitalize_words"),
-        
-        # Fonctions de manipulation de listes
-        ("def find_max(lst):\n    return max(lst) if lst else None", "find_max"),
-        ("def find_min(lst):\n    return min(lst) if lst else None", "find_min"),
-        ("def sum_list(lst):\n    return sum(lst)", "sum_list"),
-        ("def average(lst):\n    return sum(lst) / len(lst) if lst else 0", "average"),
-        ("def remove_duplicates(lst):\n    return list(dict.fromkeys(lst))", "remove_duplicates"),
-        
-        # Fonctions de manipulation de dictionnaires
-        ("def merge_dicts(d1, d2):\n    result = d1.copy()\n    result.update(d2)\n    return result", "merge_dicts"),
-        ("def invert_dict(d):\n    return {v: k for k, v in d.items()}", "invert_dict"),
-        
-        # Fonctions de validation
-        ("def is_valid_email(email):\n    import re\n    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\\.[a-zA-Z]{2,}$'\n    return bool(re.match(pattern, email))", "is_valid_email"),
-        ("def is_valid_url(url):\n    import re\n    pattern = r'^https?:\\/\\/(?:www\\.)?[-a-zA-Z0-9@:%._\\+~#=]{1,256}\\.[a-zA-Z0-9()]{1,6}\\b(?:[-a-zA-Z0-9()@:%_\\+.~#?&\\/=]*)$'\n    return bool(re.match(pattern, url))", "is_valid_url"),
-        
-        # Fonctions de conversion
-        ("def celsius_to_fahrenheit(c):\n    return (c * 9/5) + 32", "celsius_to_fahrenheit"),
-        ("def fahrenheit_to_celsius(f):\n    return (f - 32) * 5/9", "fahrenheit_to_celsius"),
-        ("def kilometers_to_miles(km):\n    return km * 0.621371", "kilometers_to_miles"),
-        
-        # Fonctions utilitaires
-        ("def generate_random_string(length=8):\n    import random\n    import string\n    return ''.join(random.choice(string.ascii_letters + string.digits) for _ in range(length))", "generate_random_string"),
-        ("def get_environment_variable(name):\n    import os\n    return os.environ.get(name)", "get_environment_variable"),
-    ]
+    # Fonctions de date et heure
+    ("def get_current_datetime():\n    from datetime import datetime\n    return datetime.now()", "get_current_datetime"),
+    ("def format_datetime(dt, format_str='%Y-%m-%d %H:%M:%S'):\n    return dt.strftime(format_str)", "format_datetime"),
+    ("def parse_datetime(dt_str, format_str='%Y-%m-%d %H:%M:%S'):\n    from datetime import datetime\n    return datetime.strptime(dt_str, format_str)", "parse_datetime"),
+    ("def add_days_to_date(dt, days):\n    from datetime import timedelta\n    return dt + timedelta(days=days)", "add_days_to_date"),
+    ("def date_diff(date1, date2):\n    return abs((date1 - date2).days)", "date_diff"),
+    ("def is_leap_year(year):\n    return (year % 4 == 0 and year % 100 != 0) or (year % 400 == 0)", "is_leap_year"),
+    ("def get_day_of_week(dt):\n    return dt.strftime('%A')", "get_day_of_week"),
+    ("def get_week_number(dt):\n    return dt.isocalendar()[1]", "get_week_number"),
+    ("def datetime_to_timestamp(dt):\n    return dt.timestamp()", "datetime_to_timestamp"),
+    ("def timestamp_to_datetime(ts):\n    from datetime import datetime\n    return datetime.fromtimestamp(ts)", "timestamp_to_datetime"),
     
-    # Générer plus d'exemples
-    additional_functions = []
-    for func, name in functions:
-        variants = [
-            func.replace("a, b", "x, y"),
-            func.replace("a, b", "num1, num2"),
-        ]
-        additional_functions.extend([(v, name) for v in variants])
+    # Fonctions de fichiers et I/O
+    ("def read_file(filename):\n    with open(filename, 'r') as f:\n        return f.read()", "read_file"),
+    ("def write_file(filename, content):\n    with open(filename, 'w') as f:\n        f.write(content)", "write_file"),
+    ("def append_to_file(filename, content):\n    with open(filename, 'a') as f:\n        f.write(content)", "append_to_file"),
+    ("def file_exists(filename):\n    import os\n    return os.path.exists(filename)", "file_exists"),
+    ("def get_file_size(filename):\n    import os\n    return os.path.getsize(filename)", "get_file_size"),
+    ("def list_files(directory):\n    import os\n    return [f for f in os.listdir(directory) if os.path.isfile(os.path.join(directory, f))]", "list_files"),
+    ("def list_directories(directory):\n    import os\n    return [d for d in os.listdir(directory) if os.path.isdir(os.path.join(directory, d))]", "list_directories"),
+    ("def create_directory(directory):\n    import os\n    os.makedirs(directory, exist_ok=True)", "create_directory"),
+    ("def delete_file(filename):\n    import os\n    if os.path.exists(filename):\n        os.remove(filename)", "delete_file"),
+    ("def get_file_extension(filename):\n    import os\n    return os.path.splitext(filename)[1]", "get_file_extension"),
     
-    functions.extend(additional_functions)
+    # Fonctions de validation et vérification
+    ("def is_valid_email(email):\n    import re\n    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\\.[a-zA-Z]{2,}$'\n    return bool(re.match(pattern, email))", "is_valid_email"),
+    ("def is_valid_url(url):\n    import re\n    pattern = r'^https?:\\/\\/(?:www\\.)?[-a-zA-Z0-9@:%._\\+~#=]{1,256}\\.[a-zA-Z0-9()]{1,6}\\b(?:[-a-zA-Z0-9()@:%_\\+.~#?&\\/=]*)$'\n    return bool(re.match(pattern, url))", "is_valid_url"),
+    ("def is_valid_phone(phone):\n    import re\n    pattern = r'^\\+?[1-9]\\d{1,14}$'\n    return bool(re.match(pattern, phone))", "is_valid_phone"),
+    ("def is_valid_ip(ip):\n    import re\n    pattern = r'^((25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\\.){3}(25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$'\n    return bool(re.match(pattern, ip))", "is_valid_ip"),
+    ("def is_valid_credit_card(number):\n    def luhn_check(card_number):\n        def digits_of(n):\n            return [int(d) for d in str(n)]\n        digits = digits_of(card_number)\n        odd_digits = digits[-1::-2]\n        even_digits = digits[-2::-2]\n        checksum = sum(odd_digits)\n        for d in even_digits:\n            checksum += sum(digits_of(d*2))\n        return checksum % 10 == 0\n    \n    import re\n    if not re.match(r'^[0-9]{13,19}$', number):\n        return False\n    return luhn_check(number)", "is_valid_credit_card"),
+    ("def is_valid_password(password):\n    if len(password) < 8:\n        return False\n    if not any(char.isupper() for char in password):\n        return False\n    if not any(char.islower() for char in password):\n        return False\n    if not any(char.isdigit() for char in password):\n        return False\n    return True", "is_valid_password"),
+    ("def is_valid_date(date_str, format_str='%Y-%m-%d'):\n    from datetime import datetime\n    try:\n        datetime.strptime(date_str, format_str)\n        return True\n    except ValueError:\n        return False", "is_valid_date"),
+    ("def is_valid_time(time_str, format_str='%H:%M:%S'):\n    from datetime import datetime\n    try:\n        datetime.strptime(time_str, format_str)\n        return True\n    except ValueError:\n        return False", "is_valid_time"),
+    ("def is_valid_json(json_str):\n    import json\n    try:\n        json.loads(json_str)\n        return True\n    except ValueError:\n        return False", "is_valid_json"),
+    ("def is_valid_xml(xml_str):\n    try:\n        import xml.etree.ElementTree as ET\n        ET.fromstring(xml_str)\n        return True\n    except ET.ParseError:\n        return False", "is_valid_xml"),
     
-    # Générer les tests
-    tests = []
-    for func_code, func_name in functions:
-        # Générer un test basé sur le nom de la fonction
-        test_code = f"import pytest\n\n\ndef test_{func_name}():\n"
-        
-        # Ajouter des assertions basées sur le type de fonction
-        if "add" in func_name:
-            test_code += f"    assert {func_name}(2, 3) == 5\n"
-            test_code += f"    assert {func_name}(-1, 1) == 0\n"
-            test_code += f"    assert {func_name}(0, 0) == 0\n"
-        elif "subtract" in func_name:
-            test_code += f"    assert {func_name}(5, 3) == 2\n"
-            test_code += f"    assert {func_name}(0, 5) == -5\n"
-        elif "multiply" in func_name:
-            test_code += f"    assert {func_name}(3, 4) == 12\n"
-            test_code += f"    assert {func_name}(-2, 3) == -6\n"
-        elif "divide" in func_name:
-            test_code += f"    assert {func_name}(10, 2) == 5\n"
-            test_code += f"    assert {func_name}(5, 2) == 2.5\n"
-            test_code += f"    assert {func_name}(5, 0) is None\n"
-        elif "power" in func_name:
-            test_code += f"    assert {func_name}(2, 3) == 8\n"
-            test_code += f"    assert {func_name}(5, 0) == 1\n"
-        elif "sqrt" in func_name:
-            test_code += f"    assert {func_name}(9) == 3\n"
-            test_code += f"    assert {func_name}(16) == 4\n"
-        elif "factorial" in func_name:
-            test_code += f"    assert {func_name}(0) == 1\n"
-            test_code += f"    assert {func_name}(5) == 120\n"
-        elif "is_prime" in func_name:
-            test_code += f"    assert {func_name}(2) is True\n"
-            test_code += f"    assert {func_name}(4) is False\n"
-            test_code += f"    assert {func_name}(17) is True\n"
-        elif "reverse_string" in func_name:
-            test_code += f"    assert {func_name}('hello') == 'olleh'\n"
-            test_code += f"    assert {func_name}('') == ''\n"
-        elif "count_vowels" in func_name:
-            test_code += f"    assert {func_name}('hello') == 2\n"
-            test_code += f"    assert {func_name}('xyz') == 0\n"
-        elif "is_palindrome" in func_name:
-            test_code += f"    assert {func_name}('racecar') is True\n"
-            test_code += f"    assert {func_name}('hello') is False\n"
-        elif "capitalize_words" in func_name:
-            test_code += f"    assert {func_name}('hello world') == 'Hello World'\n"
-            test_code += f"    assert {func_name}('') == ''\n"
-        elif "find_max" in func_name:
-            test_code += f"    assert {func_name}([1, 5, 3, 9, 2]) == 9\n"
-            test_code += f"    assert {func_name}([]) is None\n"
-        elif "find_min" in func_name:
-            test_code += f"    assert {func_name}([5, 2, 8, 1, 9]) == 1\n"
-            test_code += f"    assert {func_name}([]) is None\n"
-        elif "sum_list" in func_name:
-            test_code += f"    assert {func_name}([1, 2, 3, 4]) == 10\n"
-            test_code += f"    assert {func_name}([]) == 0\n"
-        elif "average" in func_name:
-            test_code += f"    assert {func_name}([1, 2, 3, 4, 5]) == 3\n"
-            test_code += f"    assert {func_name}([]) == 0\n"
-        elif "remove_duplicates" in func_name:
-            test_code += f"    assert {func_name}([1, 2, 2, 3, 3, 3]) == [1, 2, 3]\n"
-            test_code += f"    assert {func_name}([]) == []\n"
-        elif "merge_dicts" in func_name:
-            test_code += f"    assert {func_name}({{'a': 1}}, {{'b': 2}}) == {{'a': 1, 'b': 2}}\n"
-            test_code += f"    assert {func_name}({{}}, {{'a': 1}}) == {{'a': 1}}\n"
-        elif "invert_dict" in func_name:
-            test_code += f"    assert {func_name}({{'a': 1, 'b': 2}}) == {{1: 'a', 2: 'b'}}\n"
-            test_code += f"    assert {func_name}({{}}) == {{}}\n"
-        elif "is_valid_email" in func_name:
-            test_code += f"    assert {func_name}('test@example.com') is True\n"
-            test_code += f"    assert {func_name}('invalid') is False\n"
-        elif "is_valid_url" in func_name:
-            test_code += f"    assert {func_name}('https://example.com') is True\n"
-            test_code += f"    assert {func_name}('invalid') is False\n"
-        elif "celsius_to_fahrenheit" in func_name:
-            test_code += f"    assert {func_name}(0) == 32\n"
-            test_code += f"    assert {func_name}(100) == 212\n"
-        elif "fahrenheit_to_celsius" in func_name:
-            test_code += f"    assert {func_name}(32) == 0\n"
-            test_code += f"    assert {func_name}(212) == 100\n"
-        elif "kilometers_to_miles" in func_name:
-            test_code += f"    assert {func_name}(10) == pytest.approx(6.21371, 0.001)\n"
-        elif "generate_random_string" in func_name:
-            test_code += f"    result = {func_name}(10)\n"
-            test_code += f"    assert len(result) == 10\n"
-            test_code += f"    assert isinstance(result, str)\n"
-        elif "get_environment_variable" in func_name:
-            test_code += f"    import os\n"
-            test_code += f"    os.environ['TEST_VAR'] = 'test_value'\n"
-            test_code += f"    assert {func_name}('TEST_VAR') == 'test_value'\n"
-            test_code += f"    assert {func_name}('NONEXISTENT') is None\n"
-        else:
-            # Fallback pour les fonctions non couvertes
-            test_code += f"    # Test cases for {func_name}\n"
-            test_code += f"    assert {func_name}() is not None\n"
-        
-        tests.append({"input": func_code, "output": test_code})
+    # Fonctions de conversion
+    ("def celsius_to_fahrenheit(c):\n    return (c * 9/5) + 32", "celsius_to_fahrenheit"),
+    ("def fahrenheit_to_celsius(f):\n    return (f - 32) * 5/9", "fahrenheit_to_celsius"),
+    ("def kilometers_to_miles(km):\n    return km * 0.621371", "kilometers_to_miles"),
+    ("def miles_to_kilometers(miles):\n    return miles * 1.60934", "miles_to_kilometers"),
+    ("def kilograms_to_pounds(kg):\n    return kg * 2.20462", "kilograms_to_pounds"),
+    ("def pounds_to_kilograms(lb):\n    return lb * 0.453592", "pounds_to_kilograms"),
+    ("def liters_to_gallons(liters):\n    return liters * 0.264172", "liters_to_gallons"),
+    ("def gallons_to_liters(gallons):\n    return gallons * 3.78541", "gallons_to_liters"),
+    ("def bytes_to_megabytes(bytes):\n    return bytes / (1024 * 1024)", "bytes_to_megabytes"),
+    ("def megabytes_to_gigabytes(mb):\n    return mb / 1024", "megabytes_to_gigabytes"),
     
-    return tests
+    # Fonctions utilitaires diverses
+    ("def generate_random_string(length=8):\n    import random\n    import string\n    return ''.join(random.choice(string.ascii_letters + string.digits) for _ in range(length))", "generate_random_string"),
+    ("def generate_random_number(min_val=0, max_val=100):\n    import random\n    return random.randint(min_val, max_val)", "generate_random_number"),
+    ("def shuffle_list(lst):\n    import random\n    random.shuffle(lst)\n    return lst", "shuffle_list"),
+    ("def get_environment_variable(name):\n    import os\n    return os.environ.get(name)", "get_environment_variable"),
+    ("def set_environment_variable(name, value):\n    import os\n    os.environ[name] = value", "set_environment_variable"),
+    ("def get_current_username():\n    import getpass\n    return getpass.getuser()", "get_current_username"),
+    ("def get_system_platform():\n    import platform\n    return platform.system()", "get_system_platform"),
+    ("def get_python_version():\n    import sys\n    return sys.version", "get_python_version"),
+    ("def measure_execution_time(func, *args, **kwargs):\n    import time\n    start = time.time()\n    result = func(*args, **kwargs)\n    end = time.time()\n    return result, end - start", "measure_execution_time"),
+    ("def retry_operation(operation, max_attempts=3, delay=1):\n    import time\n    for attempt in range(max_attempts):\n        try:\n            return operation()\n        except Exception as e:\n            if attempt == max_attempts - 1:\n                raise e\n            time.sleep(delay)", "retry_operation"),
+]
+
+# Assertions des tests générés, par nom de fonction
+TEST_ASSERTIONS = {
+    'add': ["assert add(2, 3) == 5", "assert add(-1, 1) == 0", "assert add(0, 0) == 0"],
+    'subtract': ["assert subtract(5, 3) == 2", "assert subtract(0, 5) == -5"],
+    'multiply': ["assert multiply(3, 4) == 12", "assert multiply(-2, 3) == -6"],
+    'divide': ["assert divide(10, 2) == 5", "assert divide(5, 2) == 2.5", "assert divide(5, 0) is None"],
+    'power': ["assert power(2, 3) == 8", "assert power(5, 0) == 1"],
+    'sqrt': ["assert sqrt(9) == 3", "assert sqrt(16) == 4"],
+    'factorial': ["assert factorial(0) == 1", "assert factorial(5) == 120"],
+    'is_prime': ["assert is_prime(2) is True", "assert is_prime(4) is False", "assert is_prime(17) is True"],
+    'reverse_string': ["assert reverse_string('hello') == 'olleh'", "assert reverse_string('') == ''"],
+    'count_vowels': ["assert count_vowels('hello') == 2", "assert count_vowels('xyz') == 0"],
+    'is_palindrome': ["assert is_palindrome('racecar') is True", "assert is_palindrome('hello') is False"],
+    'capitalize_words': ["assert capitalize_words('hello world') == 'Hello World'", "assert capitalize_words('') == ''"],
+    'find_max': ["assert find_max([1, 5, 3, 9, 2]) == 9", "assert find_max([]) is None"],
+    'find_min': ["assert find_min([5, 2, 8, 1, 9]) == 1", "assert find_min([]) is None"],
+    'sum_list': ["assert sum_list([1, 2, 3, 4]) == 10", "assert sum_list([]) == 0"],
+    'average': ["assert average([1, 2, 3, 4, 5]) == 3", "assert average([]) == 0"],
+    'remove_duplicates': ["assert remove_duplicates([1, 2, 2, 3, 3, 3]) == [1, 2, 3]", "assert remove_duplicates([]) == []"],
+    'merge_dicts': ["assert merge_dicts({'a': 1}, {'b': 2}) == {'a': 1, 'b': 2}", "assert merge_dicts({}, {'a': 1}) == {'a': 1}"],
+    'invert_dict': ["assert invert_dict({'a': 1, 'b': 2}) == {1: 'a', 2: 'b'}", "assert invert_dict({}) == {}"],
+    'is_valid_email': ["assert is_valid_email('test@example.com') is True", "assert is_valid_email('invalid') is False"],
+    'is_valid_url': ["assert is_valid_url('https://example.com') is True", "assert is_valid_url('invalid') is False"],
+    'celsius_to_fahrenheit': ["assert celsius_to_fahrenheit(0) == 32", "assert celsius_to_fahrenheit(100) == 212"],
+    'fahrenheit_to_celsius': ["assert fahrenheit_to_celsius(32) == 0", "assert fahrenheit_to_celsius(212) == 100"],
+    'kilometers_to_miles': ["assert kilometers_to_miles(10) == pytest.approx(6.21371, 0.001)"],
+    'generate_random_string': ["result = generate_random_string(10)", "assert len(result) == 10",
+                               "assert isinstance(result, str)"],
+    'get_environment_variable': ["import os", "os.environ['TEST_VAR'] = 'test_value'",
+                                 "assert get_environment_variable('TEST_VAR') == 'test_value'",
+                                 "assert get_environment_variable('NONEXISTENT') is None"],
+}
+
+# Renommages historiques de (a, b), toujours inclus
+LEGACY_RENAMES = {
+    'docstring': ["x, y", "num1, num2", "first, second", "value1, value2"],
+    'tests': ["x, y", "num1, num2"],
+}
+
+# Vocabulaire des noms de paramètres générés (préfixe + racine + suffixe)
+NAME_PREFIXES = ['', 'input_', 'raw_', 'new_', 'first_', 'other_', 'base_', 'user_', 'current_', 'source_']
+NAME_STEMS = ['value', 'item', 'data', 'number', 'text', 'count', 'items', 'record', 'entry', 'target',
+              'key', 'values', 'amount', 'content', 'path', 'limit']
+NAME_SUFFIXES = ['', '1', '2', '_a', '_b', '_in', '_list', '_val']
+
+TASK_FILES = {'docstring': 'docstring', 'tests': 'tests'}
+
+
+# -------------------- VARIANTES --------------------
+def _tokens(code: str) -> List[tokenize.TokenInfo]:
+    return list(tokenize.generate_tokens(io.StringIO(code).readline))
+
+
+def parameter_names(code: str) -> List[str]:
+    """Noms des paramètres de la signature (première ligne)"""
+    def_line = code.split('\n', 1)[0]
+    params_str = def_line[def_line.find('(') + 1:def_line.rfind(')')]
+    return [p.split('=')[0].strip().lstrip('*') for p in params_str.split(',') if p.strip()]
+
+
+def parameter_spans(code: str, params: Iterable[str]) -> List[Tuple[int, int, int, str]]:
+    """
+    Positions (ligne, début, fin, nom) des paramètres dans le code, via tokenize :
+    les chaînes, les attributs (obj.nom) et les arguments nommés d'appels
+    (f(nom=...)) sont ignorés. Calculé une fois par template.
+    """
+    params = set(params)
+    tokens = _tokens(code)
+    spans = []
+    depth = 0
+    for index, tok in enumerate(tokens):
+        if tok.type == tokenize.OP:
+            depth += tok.string in '([{'
+            depth -= tok.string in ')]}'
+        if tok.type != tokenize.NAME or tok.string not in params:
+            continue
+        previous = tokens[index - 1].string if index else ''
+        following = tokens[index + 1].string if index + 1 < len(tokens) else ''
+        if previous == '.':
+            continue
+        if tok.start[0] > 1 and depth > 0 and following == '=' and previous in ('(', ','):
+            continue
+        spans.append((tok.start[0] - 1, tok.start[1], tok.end[1], tok.string))
+    # De droite à gauche, pour que chaque remplacement laisse les positions suivantes valides
+    spans.sort(reverse=True)
+    return spans
+
+
+def apply_renames(lines: List[str], spans: List[Tuple[int, int, int, str]], mapping: Dict[str, str]) -> str:
+    lines = list(lines)
+    for row, start, end, name in spans:
+        line = lines[row]
+        lines[row] = line[:start] + mapping[name] + line[end:]
+    return '\n'.join(lines)
+
+
+def rename_parameters(code: str, mapping: Dict[str, str]) -> str:
+    return apply_renames(code.split('\n'), parameter_spans(code, mapping), mapping)
+
+
+def expand_variants(code: str, task: str, variants: int, seed: int) -> Iterator[str]:
+    """
+    Le template tel quel, les renommages historiques de (a, b), puis `variants`
+    renommages aléatoires. Le RNG est dérivé de (seed, tâche, template) :
+    le résultat ne dépend ni de l'ordre ni du nombre de workers.
+    """
+    yield code
+    params = parameter_names(code)
+    if params[:2] == ['a', 'b']:
+        # Renommés aussi dans le corps (l'ancien str.replace ne touchait que la signature)
+        for replacement in LEGACY_RENAMES[task]:
+            yield rename_parameters(code, dict(zip(['a', 'b'], replacement.split(', '))))
+    if not params or not variants:
+        return
+
+    taken = {tok.string for tok in _tokens(code) if tok.type == tokenize.NAME}
+    lines = code.split('\n')
+    spans = parameter_spans(code, params)
+    rng = random.Random(f"{seed}:{task}:{code}")
+    for _ in range(variants):
+        mapping = {}
+        for param in params:
+            while True:
+                name = rng.choice(NAME_PREFIXES) + rng.choice(NAME_STEMS) + rng.choice(NAME_SUFFIXES)
+                if name not in taken and name not in mapping.values():
+                    break
+            mapping[param] = name
+        yield apply_renames(lines, spans, mapping)
+
+
+# -------------------- SORTIES --------------------
+def build_docstring(func_code: str, func_name: str) -> str:
+    """Docstring au format Google à partir du nom de la fonction et de ses paramètres"""
+    def_line = func_code.split('\n')[0]
+    params_str = def_line[def_line.find('(') + 1:def_line.find(')')]
+    params = [p.strip() for p in params_str.split(',')] if params_str else []
+
+    docstring_lines = ['"""']
+    docstring_lines.append(f"{func_name.replace('_', ' ').title()}.")
+    docstring_lines.append("")
+
+    if params:
+        docstring_lines.append("Args:")
+        for param in params:
+            if '=' in param:
+                param_name = param.split('=')[0].strip()
+                default_value = param.split('=')[1].strip()
+                docstring_lines.append(f"    {param_name} (any): Parameter description. Defaults to {default_value}.")
+            else:
+                docstring_lines.append(f"    {param} (any): Parameter description.")
+        docstring_lines.append("")
+
+    docstring_lines.append("Returns:")
+    docstring_lines.append("    any: Return value description.")
+    docstring_lines.append('"""')
+    return '\n'.join(docstring_lines)
+
+
+def build_test(func_code: str, func_name: str) -> str:
+    """Test pytest à partir des assertions connues de la fonction"""
+    test_code = f"import pytest\n\n\ndef test_{func_name}():\n"
+    # Fallback pour les fonctions non couvertes
+    assertions = TEST_ASSERTIONS.get(func_name, [f"# Test cases for {func_name}", f"assert {func_name}() is not None"])
+    return test_code + ''.join(f"    {line}\n" for line in assertions)
+
+
+TASKS = {
+    'docstring': ([index for index in range(len(FUNCTIONS))], build_docstring),
+    'tests': ([index for index, (_, name) in enumerate(FUNCTIONS) if name in TEST_ASSERTIONS], build_test),
+}
+
 
-# Générer les datasets
-docstring_data = generate_docstring_dataset()
-test_data = generate_test_dataset()
+def generate_examples(task: str, template_indices: Iterable[int], variants: int, seed: int,
+                      counters: Dict[str, int]) -> Iterator[Dict[str, str]]:
+    """
+    Exemples {"input", "output"} d'une tâche, sans doublons. Les noms de fonctions
+    étant uniques par template, deux templates ne produisent jamais le même exemple :
+    l'ensemble des hash vus est donc remis à zéro à chaque template (mémoire bornée).
+    """
+    build = TASKS[task][1]
+    for index in template_indices:
+        func_code, func_name = FUNCTIONS[index]
+        seen = set()
+        for code in expand_variants(func_code, task, variants, seed):
+            example = {"input": code, "output": build(code, func_name)}
+            digest = hashlib.sha1(f"{code}\0{example['output']}".encode('utf-8')).digest()
+            if digest in seen:
+                counters['duplicates'] += 1
+                continue
+            seen.add(digest)
+            yield example
 
-# Diviser en train et eval (80/20)
-def split_dataset(dataset, train_ratio=0.8):
-    random.shuffle(dataset)
-    split_idx = int(len(dataset) * train_ratio)
-    return dataset[:split_idx], dataset[split_idx:]
 
-docstring_train, docstring_eval = split_dataset(docstring_data)
-test_train, test_eval = split_dataset(test_data)
+def example_split(example: Dict[str, str], group_key: str, eval_ratio: float, grouped: bool) -> str:
+    """
+    Répartition train/eval par hash : stable d'une exécution à l'autre.
+    Avec `grouped`, tous les exemples d'un même groupe (fonction, fichier...)
+    tombent dans le même split.
+    """
+    key = group_key if grouped else example['input']
+    bucket = int.from_bytes(hashlib.sha256(key.encode('utf-8')).digest()[:8], 'big') / 2 ** 64
+    return 'eval' if bucket < eval_ratio else 'train'
 
-# Sauvegarder les fichiers
-def save_jsonl(data, filename):
-    with open(filename, 'w') as f:
+
+# -------------------- ÉCRITURE --------------------
+def open_jsonl(filename: str):
+    if filename.endswith('.gz'):
+        return gzip.open(filename, 'wt', encoding='utf-8', compresslevel=6)
+    return open(filename, 'w', encoding='utf-8')
+
+
+def save_jsonl(data: Iterable[Dict[str, Any]], filename: str) -> int:
+    """Écrit un itérable d'exemples en JSONL (gzip si le nom finit par .gz), en flux"""
+    count = 0
+    with open_jsonl(filename) as f:
         for item in data:
             f.write(json.dumps(item) + '\n')
+            count += 1
+    return count
+
+
+class ShardWriter:
+    """Fichiers JSONL d'une (tâche, split) pour un worker, avec rotation tous les `shard_size` exemples"""
+    def __init__(self, output_dir: str, stem: str, worker: int, sharded: bool, shard_size: int, compress: bool):
+        self.output_dir = output_dir
+        self.stem = stem
+        self.worker = worker
+        self.sharded = sharded
+        self.shard_size = shard_size
+        self.extension = '.jsonl.gz' if compress else '.jsonl'
+        self.files: List[str] = []
+        self.count = 0
+        self._handle = None
+        self._in_shard = 0
+
+    def _open(self):
+        if self.sharded:
+            name = f"{self.stem}-w{self.worker:03d}-{len(self.files):05d}{self.extension}"
+        else:
+            name = self.stem + self.extension
+        path = os.path.join(self.output_dir, name)
+        self.files.append(path)
+        self._handle = open_jsonl(path)
+        self._in_shard = 0
+
+    def write(self, example: Dict[str, str]):
+        if self._handle is None or (self.shard_size and self._in_shard >= self.shard_size):
+            self.close()
+            self._open()
+        self._handle.write(json.dumps(example) + '\n')
+        self._in_shard += 1
+        self.count += 1
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+def run_worker(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Un worker traite une part des templates de chaque tâche et écrit ses propres shards"""
+    worker, workers = job['worker'], job['workers']
+    sharded = workers > 1 or job['shard_size'] > 0
+    result = {'worker': worker, 'tasks': {}}
+    for task in job['tasks']:
+        indices, _ = TASKS[task]
+        counters = {'duplicates': 0}
+        writers = {
+            split: ShardWriter(job['output_dir'], f"{TASK_FILES[task]}_{split}", worker,
+                               sharded, job['shard_size'], job['compress'])
+            for split in ('train', 'eval')
+        }
+        for index in indices[worker::workers]:
+            func_name = FUNCTIONS[index][1]
+            for example in generate_examples(task, [index], job['variants'], job['seed'], counters):
+                split = example_split(example, func_name, job['eval_ratio'], job['group_by_function'])
+                writers[split].write(example)
+        for writer in writers.values():
+            writer.close()
+        result['tasks'][task] = {
+            'train': writers['train'].count,
+            'eval': writers['eval'].count,
+            'duplicates': counters['duplicates'],
+            'files': writers['train'].files + writers['eval'].files
+        }
+    return result
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Génère les datasets de fine-tuning (docstrings et tests)")
+    parser.add_argument('-o', '--output-dir', default='.', help="dossier de sortie")
+    parser.add_argument('--tasks', default='docstring,tests', help="tâches à générer, séparées par des virgules")
+    parser.add_argument('--variants', type=int, default=0,
+                        help="renommages aléatoires de paramètres par template (0 = templates et variantes historiques)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--eval-ratio', type=float, default=0.2)
+    parser.add_argument('--group-by-function', action='store_true',
+                        help="toutes les variantes d'une fonction dans le même split (pas de fuite train/eval)")
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--shard-size', type=int, default=0, help="exemples par shard (0 = pas de rotation)")
+    parser.add_argument('--compress', action='store_true', help="écrit des .jsonl.gz")
+    args = parser.parse_args(argv)
+
+    tasks = [task.strip() for task in args.tasks.split(',') if task.strip()]
+    unknown = [task for task in tasks if task not in TASKS]
+    if unknown:
+        parser.error(f"unknown task(s): {', '.join(unknown)}")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    jobs = [{
+        'worker': worker, 'workers': args.workers, 'tasks': tasks, 'output_dir': args.output_dir,
+        'variants': args.variants, 'seed': args.seed, 'eval_ratio': args.eval_ratio,
+        'group_by_function': args.group_by_function, 'shard_size': args.shard_size, 'compress': args.compress
+    } for worker in range(args.workers)]
+
+    start = time.perf_counter()
+    if args.workers > 1:
+        with Pool(args.workers) as pool:
+            results = pool.map(run_worker, jobs)
+    else:
+        results = [run_worker(jobs[0])]
+    elapsed = time.perf_counter() - start
+
+    manifest = {'seed': args.seed, 'variants': args.variants, 'eval_ratio': args.eval_ratio,
+                'group_by_function': args.group_by_function, 'workers': args.workers, 'tasks': {}}
+    for task in tasks:
+        totals = {'train': 0, 'eval': 0, 'duplicates': 0, 'files': []}
+        for result in results:
+            for key, value in result['tasks'][task].items():
+                totals[key] += value
+        totals['files'] = sorted(os.path.relpath(path, args.output_dir) for path in totals['files'])
+        manifest['tasks'][task] = totals
+        print(f"Generated {totals['train']} train and {totals['eval']} eval {task} examples "
+              f"({totals['duplicates']} duplicates dropped, {len(totals['files'])} file(s))")
+
+    if len(results) > 1 or args.shard_size:
+        with open(os.path.join(args.output_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+    print(f"Done in {elapsed:.1f}s")
 
-save_jsonl(docstring_train, "docstring_train.jsonl")
-save_jsonl(docstring_eval, "docstring_eval.jsonl")
-save_jsonl(test_train, "tests_train.jsonl")
-save_jsonl(test_eval, "tests_eval.jsonl")
 
-print(f"Generated {len(docstring_train)} train and {len(docstring_eval)} eval docstring examples")
-print(f"Generated {len(test_train)} train and {len(test_eval)} eval test examples")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+Évaluation hors ligne de AIService sur docstring_eval.jsonl et tests_eval.jsonl.
+
+Docstrings : generate_documentation_batch (prompts envoyés par batch), avec pour
+chaque exemple sa part de la latence du batch, les tokens générés, le résultat
+de la validation et l'usage du fallback à règles, puis des scores (couverture
+des paramètres, format Args/Returns, chaîne bien formée, recouvrement avec la
+référence). La durée des appels par batch est rapportée à part.
+Tests : generate_test, puis exécution des tests générés dans des sous-processus
+isolés en parallèle.
+
+Le rapport JSON est comparable d'un run à l'autre : --compare refuse (code de
+sortie 1) une baisse de qualité ou une hausse de latence au-delà des seuils,
+pour valider un changement de modèle, de prompt ou de précision.
+
+Usage :
+    python evaluate.py -o baseline.json --no-ai
+    python evaluate.py --adapter lora-output/adapter --merge -o lora.json --compare baseline.json
+"""
+import argparse
+import ast
+import hashlib
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from token_cache import iter_jsonl
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(HERE, '..', 'backend')
+
+# Exécuté dans un interpréteur isolé (-I) : définit la fonction puis appelle chaque test_*
+TEST_RUNNER = r'''
+import json, sys
+job = json.load(sys.stdin)
+namespace = {"__name__": "evaluated"}
+try:
+    exec(compile(job["code"], "function.py", "exec"), namespace)
+    exec(compile(job["test"], "test_function.py", "exec"), namespace)
+    tests = [value for key, value in namespace.items() if key.startswith("test") and callable(value)]
+    for test in tests:
+        test()
+    print(json.dumps({"passed": bool(tests), "tests": len(tests), "error": None if tests else "no tests"}))
+except BaseException as e:
+    print(json.dumps({"passed": False, "tests": 0, "error": f"{type(e).__name__}: {e}"[:200]}))
+'''
+
+DOCSTRING_METRICS = ['param_coverage', 'has_summary', 'args_section', 'returns_section', 'well_formed', 'reference_f1']
+TEST_METRICS = ['executes', 'calls_function', 'meaningful_assertions', 'reference_f1']
+
+
+# -------------------- ANALYSE DE LA FONCTION --------------------
+def describe_function(code: str) -> Dict[str, Any]:
+    """Nom, paramètres (hors self/cls) et présence d'un `return valeur`"""
+    try:
+        tree = ast.parse(code)
+        node = next(n for n in ast.walk(tree) if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)))
+    except (SyntaxError, StopIteration):
+        match = re.search(r'def\s+(\w+)', code)
+        return {'name': match.group(1) if match else 'function', 'params': [], 'returns_value': 'return ' in code}
+    args = node.args
+    params = [a.arg for a in args.posonlyargs + args.args + args.kwonlyargs]
+    params += [a.arg for a in (args.vararg, args.kwarg) if a]
+    returns_value = any(isinstance(n, ast.Return) and n.value is not None for n in ast.walk(node))
+    return {'name': node.name, 'params': [p for p in params if p not in ('self', 'cls')], 'returns_value': returns_value}
+
+
+def word_f1(candidate: str, reference: str) -> float:
+    """F1 sur les mots (multiensembles) : recouvrement grossier avec la sortie de référence"""
+    candidate_words = re.findall(r'\w+', candidate.lower())
+    reference_words = re.findall(r'\w+', reference.lower())
+    if not candidate_words or not reference_words:
+        return 0.0
+    remaining: Dict[str, int] = {}
+    for word in reference_words:
+        remaining[word] = remaining.get(word, 0) + 1
+    common = 0
+    for word in candidate_words:
+        if remaining.get(word):
+            remaining[word] -= 1
+            common += 1
+    if not common:
+        return 0.0
+    precision, recall = common / len(candidate_words), common / len(reference_words)
+    return 2 * precision * recall / (precision + recall)
+
+
+# -------------------- SCORES --------------------
+def score_docstring(function: Dict[str, Any], documentation: str, reference: str) -> Dict[str, float]:
+    try:
+        body = ast.literal_eval(documentation.strip())
+        well_formed = isinstance(body, str)
+    except (ValueError, SyntaxError):
+        body, well_formed = documentation.strip().strip('"\''), False
+    body = str(body).strip()
+    params = function['params']
+    mentioned = [p for p in params if re.search(rf'\b{re.escape(p)}\b', body)]
+    summary = body.split('\n', 1)[0].strip()
+    return {
+        'param_coverage': len(mentioned) / len(params) if params else 1.0,
+        'has_summary': float(len(summary.split()) >= 2 and summary[-1:] in '.!?'),
+        'args_section': float(not params or bool(re.search(r'^\s*(Args|Arguments|Parameters)\s*:', body, re.M))),
+        'returns_section': float(not function['returns_value'] or bool(re.search(r'^\s*Returns?\s*:', body, re.M))),
+        'well_formed': float(well_formed),
+        'reference_f1': word_f1(body, reference),
+    }
+
+
+def score_test(function: Dict[str, Any], test_code: str, reference: str, outcome: Dict[str, Any]) -> Dict[str, float]:
+    """Exécution, appel de la fonction testée, et assertions qui vérifient une valeur (pas seulement `is not None`)"""
+    calls, meaningful = False, 0
+    try:
+        for node in ast.walk(ast.parse(test_code)):
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == function['name']:
+                calls = True
+            if isinstance(node, ast.Assert):
+                test = node.test
+                trivial = (isinstance(test, ast.Compare) and len(test.ops) == 1
+                           and isinstance(test.ops[0], (ast.Is, ast.IsNot))
+                           and isinstance(test.comparators[0], ast.Constant) and test.comparators[0].value is None)
+                meaningful += not trivial
+            if isinstance(node, ast.Attribute) and node.attr == 'raises':
+                meaningful += 1
+    except SyntaxError:
+        pass
+    return {
+        'executes': float(outcome['passed']),
+        'calls_function': float(calls),
+        'meaningful_assertions': float(meaningful > 0),
+        'reference_f1': word_f1(test_code, reference),
+    }
+
+
+def run_test(job: Dict[str, str], timeout: float) -> Dict[str, Any]:
+    try:
+        completed = subprocess.run([sys.executable, '-I', '-c', TEST_RUNNER], input=json.dumps(job),
+                                   capture_output=True, text=True, timeout=timeout)
+        lines = completed.stdout.strip().splitlines()
+        if lines:
+            return json.loads(lines[-1])
+        return {'passed': False, 'tests': 0, 'error': completed.stderr.strip()[-200:] or 'no output'}
+    except subprocess.TimeoutExpired:
+        return {'passed': False, 'tests': 0, 'error': f'timeout after {timeout}s'}
+
+
+# -------------------- ÉVALUATION --------------------
+def load_examples(path: str, limit: int) -> List[Dict[str, Any]]:
+    examples = []
+    for record in iter_jsonl(path):
+        examples.append(dict(record, function=describe_function(record['input'])))
+        if limit and len(examples) >= limit:
+            break
+    return examples
+
+
+def file_sha1(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def evaluate_docstrings(service, examples: List[Dict[str, Any]], batch_size: int, overrides: Dict[str, Any]):
+    start = time.perf_counter()
+    results = service.generate_documentation_batch(
+        [{'code': e['input'], 'name': e['function']['name']} for e in examples], batch_size=batch_size, **overrides)
+    seconds = time.perf_counter() - start
+    records = []
+    for example, result in zip(examples, results):
+        scores = score_docstring(example['function'], result['documentation'], example['output'])
+        records.append(dict(result, scores=scores))
+    return records, seconds
+
+
+def evaluate_tests(service, examples: List[Dict[str, Any]], workers: int, timeout: float):
+    start = time.perf_counter()
+    records = []
+    for example in examples:
+        generation_start = time.perf_counter()
+        test_code = service.generate_test(example['input'], example['function']['name'])
+        records.append({
+            'name': example['function']['name'], 'source': 'rule_based', 'ai_attempted': False, 'valid': True,
+            'tokens_generated': 0, 'latency_ms': (time.perf_counter() - generation_start) * 1000, 'test': test_code
+        })
+    seconds = time.perf_counter() - start
+
+    # Les tests de référence tournent aussi : un exemple dont la référence échoue (ex. dépendance manquante) est signalé
+    jobs = [{'code': e['input'], 'test': r['test']} for e, r in zip(examples, records)]
+    jobs += [{'code': e['input'], 'test': e['output']} for e in examples]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(lambda job: run_test(job, timeout), jobs))
+    for index, (example, record) in enumerate(zip(examples, records)):
+        outcome, reference_outcome = outcomes[index], outcomes[len(examples) + index]
+        record.update(outcome=outcome, reference_passes=reference_outcome['passed'],
+                      scores=score_test(example['function'], record['test'], example['output'], outcome))
+    return records, seconds
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def summarize(records: List[Dict[str, Any]], metrics: List[str], seconds: float) -> Dict[str, Any]:
+    count = max(len(records), 1)
+    attempted = [r for r in records if r['ai_attempted']]
+    latencies = [r['latency_ms'] for r in records]
+    tokens = sum(r['tokens_generated'] for r in records)
+    scores = {m: sum(r['scores'][m] for r in records) / count for m in metrics}
+    # Durée de chaque appel du pipeline, comptée une fois par batch (les exemples sont dans l'ordre des batches)
+    batches, index = [], 0
+    while index < len(records) and 'batch_ms' in records[index]:
+        batches.append(records[index]['batch_ms'])
+        index += records[index]['batch_size']
+    return {
+        'examples': len(records),
+        'quality': sum(scores.values()) / len(metrics),
+        'scores': scores,
+        'fallback_rate': sum(r['source'] == 'rule_based' for r in records) / count,
+        'validation_pass_rate': sum(r['valid'] for r in attempted) / len(attempted) if attempted else None,
+        'latency_mean_ms': sum(latencies) / count,
+        'latency_p50_ms': percentile(latencies, 0.5),
+        'latency_p95_ms': percentile(latencies, 0.95),
+        'batch_latency_p50_ms': percentile(batches, 0.5) if batches else None,
+        'batch_latency_p95_ms': percentile(batches, 0.95) if batches else None,
+        'tokens_generated': tokens,
+        'tokens_per_sec': tokens / seconds if seconds else 0.0,
+        'examples_per_sec': len(records) / seconds if seconds else 0.0,
+        'seconds': seconds,
+    }
+
+
+# -------------------- COMPARAISON --------------------
+def compare_reports(report: Dict[str, Any], baseline: Dict[str, Any], max_quality_drop: float,
+                    max_latency_increase: float, latency_slack_ms: float) -> List[str]:
+    """Affiche les écarts avec un rapport précédent ; renvoie les seuils franchis"""
+    failures = []
+    for task in ('docstring', 'tests'):
+        new, old = report.get(task, {}).get('summary'), baseline.get(task, {}).get('summary')
+        if not new or not old:
+            continue
+        if report['config']['datasets'].get(task) != baseline.get('config', {}).get('datasets', {}).get(task):
+            print(f"⚠️ {task}: evaluation set differs from the baseline, deltas are not like for like")
+        print(f"\n{task}")
+        for key in ['quality', 'fallback_rate', 'latency_p50_ms', 'latency_p95_ms', 'tokens_per_sec', 'examples_per_sec']:
+            print(f"  {key:22s} {old[key]:12.4f} -> {new[key]:12.4f}  ({new[key] - old[key]:+.4f})")
+        for metric, value in new['scores'].items():
+            before = old['scores'].get(metric)
+            if before is not None:
+                print(f"  {metric:22s} {before:12.4f} -> {value:12.4f}  ({value - before:+.4f})")
+
+        if new['quality'] < old['quality'] - max_quality_drop:
+            failures.append(f"{task}: quality {old['quality']:.4f} -> {new['quality']:.4f}")
+        limit = old['latency_p95_ms'] * (1 + max_latency_increase) + latency_slack_ms
+        if new['latency_p95_ms'] > limit:
+            failures.append(f"{task}: p95 latency {old['latency_p95_ms']:.1f}ms -> {new['latency_p95_ms']:.1f}ms")
+    return failures
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Évalue la génération de docstrings et de tests d'AIService")
+    parser.add_argument('--docstring-eval', default=os.path.join(HERE, 'docstring_eval.jsonl'))
+    parser.add_argument('--tests-eval', default=os.path.join(HERE, 'tests_eval.jsonl'))
+    parser.add_argument('--limit', type=int, default=0, help="exemples maximum par tâche (0 = tous)")
+    parser.add_argument('--model', default=None, help="AI_MODEL_NAME")
+    parser.add_argument('--adapter', default=None, help="AI_LORA_ADAPTER (dossier produit par train_lora.py)")
+    parser.add_argument('--merge', action='store_true', help="AI_LORA_MERGE")
+    parser.add_argument('--no-ai', action='store_true', help="fallback à règles seulement")
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--sample', action='store_true', help="échantillonnage de production (défaut : greedy, reproductible)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="sous-processus d'exécution des tests")
+    parser.add_argument('--timeout', type=float, default=10.0, help="secondes par exécution de test")
+    parser.add_argument('-o', '--output', default='eval_report.json')
+    parser.add_argument('--compare', default=None, help="rapport de référence")
+    parser.add_argument('--max-quality-drop', type=float, default=0.02)
+    parser.add_argument('--max-latency-increase', type=float, default=0.10, help="hausse relative tolérée du p95")
+    parser.add_argument('--latency-slack-ms', type=float, default=5.0, help="marge absolue (bruit des mesures courtes)")
+    args = parser.parse_args(argv)
+
+    # AIService lit sa configuration à l'import (instance globale)
+    if args.model:
+        os.environ['AI_MODEL_NAME'] = args.model
+    if args.adapter:
+        os.environ['AI_LORA_ADAPTER'] = os.path.abspath(args.adapter)
+    if args.merge:
+        os.environ['AI_LORA_MERGE'] = 'true'
+    if args.no_ai:
+        os.environ['AI_ENABLE_MODEL'] = 'false'
+    sys.path.insert(0, BACKEND_DIR)
+    from app.services.ai_service import ai_service
+
+    overrides = {} if args.sample else {'do_sample': False}
+    report: Dict[str, Any] = {'config': {
+        'model': ai_service.model_name if ai_service.generation_pipeline else None,
+        'adapter': ai_service.lora_adapter, 'merged': ai_service.merge_adapter,
+        'dtype': str(getattr(ai_service.model, 'dtype', None)),
+        'prompt_sha1': hashlib.sha1(ai_service._build_doc_prompt('{input}').encode('utf-8')).hexdigest(),
+        'batch_size': args.batch_size, 'sampling': 'production' if args.sample else 'greedy',
+        'datasets': {'docstring': file_sha1(args.docstring_eval), 'tests': file_sha1(args.tests_eval)},
+        'python': platform.python_version(), 'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }}
+
+    docstring_examples = load_examples(args.docstring_eval, args.limit)
+    records, seconds = evaluate_docstrings(ai_service, docstring_examples, args.batch_size, overrides)
+    report['docstring'] = {'summary': summarize(records, DOCSTRING_METRICS, seconds), 'examples': records}
+
+    test_examples = load_examples(args.tests_eval, args.limit)
+    records, seconds = evaluate_tests(ai_service, test_examples, args.workers, args.timeout)
+    report['tests'] = {'summary': summarize(records, TEST_METRICS, seconds), 'examples': records}
+    report['tests']['summary']['reference_failures'] = sum(not r['reference_passes'] for r in records)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    for task in ('docstring', 'tests'):
+        summary = report[task]['summary']
+        print(f"{task:9s} quality {summary['quality']:.3f}  fallback {summary['fallback_rate']:.0%}  "
+              f"p50 {summary['latency_p50_ms']:.1f}ms  p95 {summary['latency_p95_ms']:.1f}ms  "
+              f"{summary['tokens_per_sec']:.1f} tokens/s  ({summary['examples']} examples)")
+    print(f"Report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        failures = compare_reports(report, baseline, args.max_quality_drop, args.max_latency_increase,
+                                   args.latency_slack_ms)
+        if failures:
+            print("\n❌ Regression against baseline:\n  " + '\n  '.join(failures))
+            sys.exit(1)
+        print("\n✅ No regression against baseline")
+
+
+if __name__ == "__main__":
+    main()
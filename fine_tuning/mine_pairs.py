@@ -0,0 +1,201 @@
+"""
+Extraction de paires (fonction, docstring) réelles depuis des arborescences
+de code Python locales, pour remplacer les exemples jouets.
+
+Chaque fichier est analysé par CodeAnalysisService.parse_python_file
+(include_source=True) dans un pool de processus ; les fonctions dont la
+docstring passe les filtres de qualité deviennent un exemple
+{"input": code sans docstring, "output": '\"\"\"\\n<docstring>\\n\"\"\"'},
+même format que save_jsonl / data_generation.py. Dédupliqué par hash,
+réparti train/eval par hash et écrit en shards JSONL.
+
+Usage :
+    python mine_pairs.py ~/src /usr/lib/python3.11 -o mined/ --workers 8 --compress
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from multiprocessing import Pool
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from data_generation import ShardWriter, example_split
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+EXCLUDED_DIRS = {'.git', '.hg', '.svn', '__pycache__', 'node_modules', '.tox', '.nox',
+                 '.mypy_cache', '.pytest_cache', 'build', 'dist', '.eggs'}
+
+# Docstrings de remplissage ou générées qui n'apprennent rien au modèle
+PLACEHOLDER_PATTERN = re.compile(
+    r'TODO|FIXME|XXX|Parameter description|Return value description|'
+    r'[Ii]nsert (?:docstring|description)|[Dd]ocstring (?:here|goes)|^\W*\w+\W*$'
+)
+
+_service = None
+_filters: Dict[str, Any] = {}
+
+
+def _init_worker(filters: Dict[str, Any]):
+    global _service, _filters
+    sys.path.insert(0, BACKEND_DIR)
+    from app.services.code_analysis import code_analysis_service
+    _service = code_analysis_service
+    _filters = filters
+
+
+def iter_python_files(roots: List[str], max_file_bytes: int) -> Iterator[str]:
+    """Fichiers .py des racines, dans un ordre stable (sorties reproductibles)"""
+    for root in roots:
+        if os.path.isfile(root):
+            yield root
+            continue
+        for directory, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d not in EXCLUDED_DIRS and not d.startswith('.'))
+            for name in sorted(filenames):
+                if not name.endswith('.py'):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    if os.path.getsize(path) <= max_file_bytes:
+                        yield path
+                except OSError:
+                    continue
+
+
+def strip_docstring(function) -> Optional[str]:
+    """Source de la fonction sans les lignes de sa docstring (None si impossible proprement)"""
+    if function.docstring_lineno <= function.lineno:
+        return None  # pas de docstring, ou sur la ligne du def
+    lines = function.source.split('\n')
+    start = function.docstring_lineno - function.lineno
+    end = function.docstring_end_lineno - function.lineno
+    return '\n'.join(lines[:start] + lines[end + 1:])
+
+
+def quality_issue(function, code: Optional[str], filters: Dict[str, Any]) -> Optional[str]:
+    """Raison du rejet d'une fonction, ou None si elle fait un bon exemple"""
+    docstring = function.docstring.strip()
+    if not docstring:
+        return 'no_docstring'
+    if code is None:
+        return 'inline_docstring'
+    if function.name.startswith('test') or (function.name.startswith('__') and function.name != '__init__'):
+        return 'test_or_dunder'
+    if len(docstring) < filters['min_doc_chars'] or len(docstring.split('\n', 1)[0].split()) < filters['min_doc_words']:
+        return 'doc_too_short'
+    if len(docstring) > filters['max_doc_chars']:
+        return 'doc_too_long'
+    if PLACEHOLDER_PATTERN.search(docstring):
+        return 'placeholder_doc'
+    if filters['ascii_only'] and not docstring.isascii():
+        return 'non_ascii'
+    body_lines = sum(1 for line in code.split('\n')[1:] if line.strip() and not line.strip().startswith('#'))
+    if body_lines < filters['min_body_lines']:
+        return 'body_too_short'
+    if body_lines > filters['max_body_lines']:
+        return 'body_too_long'
+    return None
+
+
+def mine_file(path: str) -> Tuple[str, List[Tuple[str, str, str]], Dict[str, int]]:
+    """(chemin, [(input, output, nom)], compteurs) pour un fichier ; tourne dans un worker"""
+    counters: Dict[str, int] = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            code_content = f.read()
+    except (OSError, UnicodeDecodeError):
+        return path, [], {'unreadable_file': 1}
+
+    try:
+        analysis = _service.parse_python_file(code_content, include_source=True)
+    except Exception:  # ParseLimitError : imbrication pathologique
+        return path, [], {'unparsable_file': 1}
+    if not analysis['success']:
+        return path, [], {'unparsable_file': 1}
+
+    pairs = []
+    for function in analysis['functions']:
+        counters['functions'] = counters.get('functions', 0) + 1
+        code = strip_docstring(function)
+        issue = quality_issue(function, code, _filters)
+        if issue:
+            counters[issue] = counters.get(issue, 0) + 1
+            continue
+        pairs.append((code, f'"""\n{function.docstring.strip()}\n"""', function.name))
+    return path, pairs, counters
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Extrait des paires (fonction, docstring) de code Python local")
+    parser.add_argument('roots', nargs='+', help="dossiers ou fichiers à parcourir")
+    parser.add_argument('-o', '--output-dir', default='mined')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunksize', type=int, default=16, help="fichiers envoyés par tâche au pool")
+    parser.add_argument('--shard-size', type=int, default=100000)
+    parser.add_argument('--compress', action='store_true')
+    parser.add_argument('--eval-ratio', type=float, default=0.1)
+    parser.add_argument('--group-by', choices=['file', 'example'], default='file',
+                        help="'file' : toutes les fonctions d'un fichier dans le même split")
+    parser.add_argument('--max-file-bytes', type=int, default=1024 * 1024)
+    parser.add_argument('--min-doc-chars', type=int, default=20)
+    parser.add_argument('--max-doc-chars', type=int, default=2000)
+    parser.add_argument('--min-doc-words', type=int, default=3, help="mots minimum sur la première ligne")
+    parser.add_argument('--min-body-lines', type=int, default=2)
+    parser.add_argument('--max-body-lines', type=int, default=150)
+    parser.add_argument('--ascii-only', action='store_true')
+    args = parser.parse_args(argv)
+
+    filters = {key: getattr(args, key) for key in (
+        'min_doc_chars', 'max_doc_chars', 'min_doc_words', 'min_body_lines', 'max_body_lines', 'ascii_only')}
+    os.makedirs(args.output_dir, exist_ok=True)
+    writers = {split: ShardWriter(args.output_dir, f"mined_{split}", 0, True, args.shard_size, args.compress)
+               for split in ('train', 'eval')}
+
+    totals: Dict[str, int] = {'files': 0, 'duplicates': 0}
+    seen = set()
+    start = time.perf_counter()
+    files = iter_python_files(args.roots, args.max_file_bytes)
+    with Pool(args.workers, initializer=_init_worker, initargs=(filters,)) as pool:
+        for path, pairs, counters in pool.imap(mine_file, files, chunksize=args.chunksize):
+            totals['files'] += 1
+            for key, value in counters.items():
+                totals[key] = totals.get(key, 0) + value
+            for code, docstring, name in pairs:
+                digest = hashlib.sha1(code.encode('utf-8')).digest()[:8]
+                if digest in seen:
+                    totals['duplicates'] += 1
+                    continue
+                seen.add(digest)
+                example = {"input": code, "output": docstring}
+                writers[example_split(example, path, args.eval_ratio, args.group_by == 'file')].write(example)
+            if totals['files'] % 5000 == 0:
+                elapsed = time.perf_counter() - start
+                print(f"{totals['files']} files, {totals.get('functions', 0)} functions "
+                      f"({totals.get('functions', 0) / elapsed * 60:,.0f}/min)")
+    for writer in writers.values():
+        writer.close()
+    elapsed = time.perf_counter() - start
+
+    functions = totals.get('functions', 0)
+    manifest = {
+        'roots': args.roots, 'filters': filters, 'eval_ratio': args.eval_ratio, 'group_by': args.group_by,
+        'train': writers['train'].count, 'eval': writers['eval'].count, 'counters': totals,
+        'files': sorted(os.path.relpath(path, args.output_dir) for writer in writers.values() for path in writer.files)
+    }
+    with open(os.path.join(args.output_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Scanned {totals['files']} files and {functions} functions in {elapsed:.1f}s "
+          f"({functions / max(elapsed, 1e-9) * 60:,.0f} functions/min, {args.workers} worker(s))")
+    print(f"Kept {writers['train'].count} train and {writers['eval'].count} eval pairs "
+          f"({totals['duplicates']} duplicates dropped)")
+    rejected = {key: value for key, value in totals.items() if key not in ('files', 'functions', 'duplicates')}
+    print("Rejected:", ', '.join(f"{key}={value}" for key, value in sorted(rejected.items())))
+
+
+if __name__ == "__main__":
+    main()
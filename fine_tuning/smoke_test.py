@@ -0,0 +1,144 @@
+"""
+Test de fumée de train_lora.py sur CPU, sans réseau : un tokenizer BPE entraîné
+sur les JSONL du dossier et un GPT-2 minuscule initialisé au hasard, écrits dans
+un dossier temporaire, puis :
+
+- isolation du packing : les logits d'un exemple packé derrière un autre sont
+  identiques à ceux de l'exemple seul (eager et sdpa), ce qui n'est pas le cas
+  avec un masque 2D plein ;
+- quelques pas d'entraînement avec checkpoints, puis reprise (--resume) : les
+  pertes pas à pas sont celles d'un run sans interruption ;
+- débit en tokens/s avec et sans packing (--benchmark-steps).
+
+Sort avec le code 1 au premier contrôle qui échoue.
+
+Usage :
+    python smoke_test.py
+    python smoke_test.py --keep /tmp/smoke   # garde modèle, checkpoints et throughput.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from token_cache import load_or_build
+from train_lora import collate, parse_args, train
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA = [os.path.join(HERE, 'docstring_train.jsonl'), os.path.join(HERE, 'tests_train.jsonl')]
+MAX_SEQ_LEN = 256
+
+
+def check(condition: bool, message: str):
+    print(f"{'✅' if condition else '❌'} {message}")
+    if not condition:
+        sys.exit(1)
+
+
+def build_tiny_model(model_dir: str):
+    """Tokenizer byte-level entraîné sur les données et GPT-2 à 2 couches, poids aléatoires"""
+    import torch
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+    from transformers import GPT2Config, GPT2LMHeadModel, PreTrainedTokenizerFast
+
+    def texts():
+        for path in DATA:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    record = json.loads(line)
+                    yield record['input']
+                    yield record['output']
+
+    tokenizer = Tokenizer(models.BPE())
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    tokenizer.train_from_iterator(texts(), trainers.BpeTrainer(
+        vocab_size=1000, special_tokens=['<|endoftext|>'],
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet()))
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=tokenizer, eos_token='<|endoftext|>',
+                                        pad_token='<|endoftext|>')
+    tokenizer.save_pretrained(model_dir)
+
+    torch.manual_seed(0)
+    config = GPT2Config(vocab_size=len(tokenizer), n_positions=MAX_SEQ_LEN, n_embd=64, n_layer=2, n_head=4,
+                        bos_token_id=tokenizer.eos_token_id, eos_token_id=tokenizer.eos_token_id)
+    GPT2LMHeadModel(config).save_pretrained(model_dir)
+
+
+def check_packing_isolation(model_dir: str, cache_dir: str):
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    cache = load_or_build(tokenizer, DATA, cache_dir, MAX_SEQ_LEN)
+    # Deux exemples qui tiennent ensemble dans une séquence
+    order = sorted(range(len(cache.lengths)), key=lambda i: cache.lengths[i])
+    first, second = order[0], order[1]
+    offset = int(cache.lengths[first])
+    length = int(cache.lengths[second])
+
+    for implementation in ('eager', 'sdpa'):
+        model = AutoModelForCausalLM.from_pretrained(model_dir, attn_implementation=implementation).eval()
+        with torch.no_grad():
+            alone = model(**collate([[second]], cache, tokenizer.pad_token_id, model.dtype)).logits[0, :length]
+            batch = collate([[first, second], [second]], cache, tokenizer.pad_token_id, model.dtype)
+            packed = model(**batch).logits[0, offset:offset + length]
+            check(torch.allclose(alone, packed, atol=1e-4),
+                  f"{implementation}: packed example matches the example alone "
+                  f"(max diff {(alone - packed).abs().max():.2e})")
+
+            batch['attention_mask'] = torch.ones_like(batch['input_ids'])
+            leaky = model(**batch).logits[0, offset:offset + length]
+            check(not torch.allclose(alone, leaky, atol=1e-4),
+                  f"{implementation}: a flat 2D mask lets the example see its neighbour")
+
+
+def load_summary(output_dir: str):
+    with open(os.path.join(output_dir, 'training_summary.json')) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Test de fumée CPU de train_lora.py (GPT-2 minuscule, hors ligne)")
+    parser.add_argument('--keep', default=None, help="dossier de travail conservé (défaut : temporaire)")
+    parser.add_argument('--steps', type=int, default=4)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work = args.keep or tmp
+        model_dir = os.path.join(work, 'tiny-gpt2')
+        cache_dir = os.path.join(work, 'token_cache')
+        output_dir = os.path.join(work, 'lora-output')
+        resumed_dir = os.path.join(work, 'lora-resumed')
+        build_tiny_model(model_dir)
+
+        check_packing_isolation(model_dir, cache_dir)
+
+        common = ['--model', model_dir, '--train', *DATA, '--eval', '--cache-dir', cache_dir,
+                  '--device', 'cpu', '--max-seq-len', str(MAX_SEQ_LEN), '--batch-size', '2', '--grad-accum', '2',
+                  '--max-steps', str(args.steps), '--log-every', '1', '--save-every', '1',
+                  '--save-total-limit', str(args.steps)]
+        train(parse_args(common + ['-o', output_dir]))
+        half = os.path.join(output_dir, f'checkpoint-{args.steps // 2}')
+        check(os.path.exists(os.path.join(half, 'trainer_state.json')), f"checkpoint written: {half}")
+
+        # Reprise depuis le checkpoint du milieu : mêmes pertes pas à pas que le run sans interruption
+        train(parse_args(common + ['-o', resumed_dir, '--resume', half]))
+        straight, resumed = (load_summary(path) for path in (output_dir, resumed_dir))
+        check(resumed['steps'] == args.steps and len(resumed['loss_history']) == args.steps,
+              f"resumed run ends at step {resumed['steps']}")
+        check(all(abs(a[1] - b[1]) < 1e-4 for a, b in zip(resumed['loss_history'], straight['loss_history'])),
+              f"resumed losses match the uninterrupted run: "
+              f"{[round(loss, 4) for _, loss in resumed['loss_history']]}")
+
+        train(parse_args(common + ['-o', output_dir, '--benchmark-steps', '3']))
+        with open(os.path.join(output_dir, 'throughput.json')) as f:
+            throughput = json.load(f)
+        check(throughput['packed']['padding_ratio'] < throughput['unpacked']['padding_ratio'],
+              f"packing reduces padding ({throughput['packed']['padding_ratio']:.1%} vs "
+              f"{throughput['unpacked']['padding_ratio']:.1%})")
+
+
+if __name__ == "__main__":
+    main()
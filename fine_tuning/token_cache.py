@@ -0,0 +1,207 @@
+"""
+Cache de datasets pré-tokenisés, chargé par memory mapping.
+
+Les JSONL (input/output) sont tokenisés une seule fois avec le tokenizer du
+modèle et écrits à plat sur disque :
+    tokens.bin          tous les tokens, exemple après exemple (uint16 ou uint32)
+    offsets.bin         int64, n + 1 bornes : l'exemple i est tokens[offsets[i]:offsets[i + 1]]
+    prompt_lengths.bin  int32, tokens de prompt de chaque exemple (labels masqués)
+    meta.json           dtype, comptes, identité du tokenizer et des sources ; écrit en dernier
+Le dossier est nommé par un hash de l'identité du tokenizer (vocabulaire,
+tokens spéciaux), du format de prompt et des fichiers sources (chemin, taille,
+mtime) : changer l'un d'eux donne une autre clé, donc une reconstruction.
+Le chargement ne lit que meta.json puis mappe les tableaux : quasi instantané
+quelle que soit la taille, et l'accès à un exemple ne copie rien.
+
+Usage :
+    python token_cache.py --model bigcode/starcoderbase-1b --data docstring_train.jsonl tests_train.jsonl
+"""
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Même format de prompt à l'entraînement et à l'inférence (copié dans l'adaptateur)
+PROMPT_FORMAT = {
+    'docstring': "# Write a Python docstring for this function:\n\n{input}\n\n# Docstring:\n",
+    'tests': "# Write pytest tests for this function:\n\n{input}\n\n# Tests:\n",
+}
+
+IGNORE_INDEX = -100
+CACHE_VERSION = 1
+
+
+# -------------------- SOURCES --------------------
+def task_for_file(path: str) -> str:
+    return 'tests' if os.path.basename(path).startswith('tests') else 'docstring'
+
+
+def iter_jsonl(path: str) -> Iterator[Dict[str, str]]:
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def expand_paths(patterns: List[str]) -> List[str]:
+    """Fichiers, dossiers de shards ou motifs glob"""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths += sorted(glob.glob(os.path.join(pattern, '*.jsonl')) + glob.glob(os.path.join(pattern, '*.jsonl.gz')))
+        else:
+            paths += sorted(glob.glob(pattern)) or [pattern]
+    return paths
+
+
+# -------------------- CLÉ DU CACHE --------------------
+def tokenizer_fingerprint(tokenizer) -> str:
+    """Identité du tokenizer : classe, vocabulaire/merges complets et tokens spéciaux"""
+    digest = hashlib.sha1()
+    digest.update(type(tokenizer).__name__.encode('utf-8'))
+    backend = getattr(tokenizer, 'backend_tokenizer', None)
+    if backend is not None:
+        digest.update(backend.to_str().encode('utf-8'))  # tokenizers "fast" : modèle, normaliseur, pré-tokeniseur
+    else:
+        digest.update(json.dumps(sorted(tokenizer.get_vocab().items())).encode('utf-8'))
+    digest.update(json.dumps([tokenizer.eos_token_id, list(getattr(tokenizer, 'all_special_tokens', []))]).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def source_fingerprint(paths: List[str]) -> List[List]:
+    return [[os.path.abspath(path), os.path.getsize(path), os.stat(path).st_mtime_ns] for path in paths]
+
+
+def cache_key(tokenizer, paths: List[str], prompt_format: Dict[str, str]) -> Tuple[str, Dict]:
+    identity = {
+        'version': CACHE_VERSION,
+        'tokenizer': getattr(tokenizer, 'name_or_path', ''),
+        'tokenizer_sha1': tokenizer_fingerprint(tokenizer),
+        'prompt_format': prompt_format,
+        'sources': source_fingerprint(paths),
+    }
+    return hashlib.sha1(json.dumps(identity, sort_keys=True).encode('utf-8')).hexdigest()[:16], identity
+
+
+# -------------------- CONSTRUCTION --------------------
+def build_cache(tokenizer, paths: List[str], directory: str, identity: Dict,
+                prompt_format: Dict[str, str] = PROMPT_FORMAT, batch_size: int = 1000) -> None:
+    """Tokenise en flux vers un dossier temporaire, renommé une fois complet"""
+    dtype = np.uint16 if len(tokenizer) <= np.iinfo(np.uint16).max + 1 else np.uint32
+    partial = directory + '.partial'
+    shutil.rmtree(partial, ignore_errors=True)
+    os.makedirs(partial)
+
+    eos = tokenizer.eos_token_id
+    count = total = 0
+    start = time.perf_counter()
+    with open(os.path.join(partial, 'tokens.bin'), 'wb') as tokens_file, \
+            open(os.path.join(partial, 'offsets.bin'), 'wb') as offsets_file, \
+            open(os.path.join(partial, 'prompt_lengths.bin'), 'wb') as prompts_file:
+        offsets_file.write(np.zeros(1, dtype=np.int64).tobytes())
+        for path in paths:
+            template = prompt_format[task_for_file(path)]
+            records = iter_jsonl(path)
+            while True:
+                chunk = [record for _, record in zip(range(batch_size), records)]
+                if not chunk:
+                    break
+                prompts = tokenizer([template.format(input=r['input']) for r in chunk], add_special_tokens=False)['input_ids']
+                outputs = tokenizer([r['output'] for r in chunk], add_special_tokens=False)['input_ids']
+                lengths = np.array([len(p) + len(o) + 1 for p, o in zip(prompts, outputs)], dtype=np.int64)
+                flat = [token for p, o in zip(prompts, outputs) for token in (*p, *o, eos)]
+                tokens_file.write(np.asarray(flat, dtype=dtype).tobytes())
+                offsets_file.write((total + np.cumsum(lengths)).tobytes())
+                prompts_file.write(np.array([len(p) for p in prompts], dtype=np.int32).tobytes())
+                count += len(chunk)
+                total += int(lengths.sum())
+
+    meta = dict(identity, dtype=np.dtype(dtype).name, examples=count, tokens=total,
+                build_seconds=time.perf_counter() - start)
+    with open(os.path.join(partial, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(partial, directory)
+
+
+class TokenCache:
+    """
+    Vue en lecture seule d'un cache : len(), lengths (tailles tronquées à
+    max_seq_len) et example(i) -> (input_ids, labels) en tableaux NumPy
+    """
+    def __init__(self, directory: str, max_seq_len: Optional[int] = None):
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json')) as f:
+            self.meta = json.load(f)
+        count, total = self.meta['examples'], self.meta['tokens']
+        self.tokens = self._map('tokens.bin', self.meta['dtype'], total)
+        self.offsets = self._map('offsets.bin', 'int64', count + 1)
+        self.prompt_lengths = self._map('prompt_lengths.bin', 'int32', count)
+        self.max_seq_len = max_seq_len
+        lengths = np.diff(self.offsets)
+        self.lengths = np.minimum(lengths, max_seq_len) if max_seq_len else lengths
+
+    def _map(self, name: str, dtype: str, count: int) -> np.ndarray:
+        if not count:
+            return np.zeros(0, dtype=dtype)  # np.memmap refuse les fichiers vides
+        return np.memmap(os.path.join(self.directory, name), dtype=dtype, mode='r', shape=(count,))
+
+    def __len__(self) -> int:
+        return len(self.prompt_lengths)
+
+    def example(self, index: int) -> Tuple[np.ndarray, np.ndarray]:
+        start = int(self.offsets[index])
+        end = start + int(self.lengths[index])
+        input_ids = self.tokens[start:end].astype(np.int64)
+        labels = input_ids.copy()
+        labels[:int(self.prompt_lengths[index])] = IGNORE_INDEX
+        return input_ids, labels
+
+
+def load_or_build(tokenizer, patterns: List[str], cache_dir: str, max_seq_len: Optional[int] = None,
+                  prompt_format: Dict[str, str] = PROMPT_FORMAT) -> TokenCache:
+    """Cache correspondant au tokenizer et aux sources, construit s'il n'existe pas encore"""
+    paths = expand_paths(patterns)
+    key, identity = cache_key(tokenizer, paths, prompt_format)
+    directory = os.path.join(cache_dir, key)
+    if os.path.exists(os.path.join(directory, 'meta.json')):
+        cache = TokenCache(directory, max_seq_len)
+        print(f"⚡ Token cache hit: {directory} ({len(cache)} examples, {cache.meta['tokens']} tokens)")
+        return cache
+    print(f"🔧 Building token cache {directory} from {len(paths)} file(s)...")
+    os.makedirs(cache_dir, exist_ok=True)
+    build_cache(tokenizer, paths, directory, identity, prompt_format)
+    cache = TokenCache(directory, max_seq_len)
+    print(f"✅ Cached {len(cache)} examples, {cache.meta['tokens']} tokens in {cache.meta['build_seconds']:.1f}s")
+    return cache
+
+
+def main(argv: Optional[List[str]] = None):
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Pré-tokenise des JSONL dans le cache mappé en mémoire")
+    parser.add_argument('--model', default='bigcode/starcoderbase-1b', help="modèle dont on prend le tokenizer")
+    parser.add_argument('--hf-token', default=None)
+    parser.add_argument('--data', nargs='+', default=[os.path.join(here, 'docstring_train.jsonl'),
+                                                      os.path.join(here, 'tests_train.jsonl')],
+                        help="fichiers JSONL, dossiers de shards ou motifs glob")
+    parser.add_argument('--cache-dir', default=os.path.join(here, 'token_cache'))
+    args = parser.parse_args(argv)
+
+    from transformers import AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(args.model, token=args.hf_token)
+    start = time.perf_counter()
+    cache = load_or_build(tokenizer, args.data, args.cache_dir)
+    print(f"Loaded {len(cache)} examples in {time.perf_counter() - start:.3f}s "
+          f"(longest {int(cache.lengths.max()) if len(cache) else 0} tokens)")
+
+
+if __name__ == "__main__":
+    main()
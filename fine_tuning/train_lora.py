@@ -0,0 +1,450 @@
+"""
+Fine-tuning LoRA d'un modèle causal (starcoderbase-1b par défaut, ou n'importe
+quel modèle local) sur les JSONL de data_generation.py / mine_pairs.py.
+
+- packing : les exemples courts sont regroupés (first-fit decreasing, sans les
+  couper) dans des séquences de --max-seq-len tokens au lieu d'être paddés ;
+  les position_ids repartent de 0 à chaque exemple, un masque d'attention 4D
+  bloc-diagonal (causal dans chaque exemple) empêche un exemple de voir ceux
+  placés avant lui, et seule la sortie est apprise. Avec
+  --attn-implementation flash_attention_2, le masque est omis et flash-attention
+  découpe les séquences aux remises à zéro des position_ids (chemin varlen)
+- les datasets sont tokenisés une fois dans le cache mappé de token_cache.py
+- accumulation de gradient, checkpoints réguliers et reprise (--resume)
+- l'adaptateur final (+ prompt_format.json) se charge dans AIService via
+  AI_LORA_ADAPTER=<output>/adapter, fusionné au démarrage si AI_LORA_MERGE=1
+
+Dépendances (torch, transformers, peft...) : pip install -r requirements.txt
+
+Tourne sur CPU avec un petit modèle, par exemple :
+    python train_lora.py --model hf-internal-testing/tiny-random-gpt2 --max-steps 20 --device cpu
+    python train_lora.py --model hf-internal-testing/tiny-random-gpt2 --benchmark-steps 10   # tokens/s avec et sans packing
+    python smoke_test.py   # GPT-2 minuscule initialisé au hasard, hors ligne : masque, reprise, débit
+"""
+import argparse
+import bisect
+import glob
+import json
+import math
+import os
+import random
+import shutil
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from token_cache import IGNORE_INDEX, PROMPT_FORMAT, TokenCache, load_or_build
+
+
+# -------------------- DONNÉES --------------------
+def pack_examples(lengths: List[int], max_seq_len: int) -> List[List[int]]:
+    """
+    Regroupe des exemples (par indice) dans des séquences d'au plus max_seq_len
+    tokens, en first-fit decreasing (best fit via bisect) : quasiment pas de
+    padding et aucun exemple coupé en deux
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    bins: List[List[int]] = []
+    free: List[Tuple[int, int]] = []  # (place libre, indice du bin), trié
+    for index in order:
+        size = lengths[index]
+        position = bisect.bisect_left(free, (size, -1))
+        if position < len(free):
+            space, bin_index = free.pop(position)
+            bins[bin_index].append(index)
+            bisect.insort(free, (space - size, bin_index))
+        else:
+            bins.append([index])
+            bisect.insort(free, (max_seq_len - size, len(bins) - 1))
+    return bins
+
+
+def build_sequences(lengths: np.ndarray, max_seq_len: int, packing: bool) -> List[List[int]]:
+    """Séquences d'entraînement en indices d'exemples : un par séquence, ou plusieurs en packing"""
+    if packing:
+        return pack_examples(lengths.tolist(), max_seq_len)
+    return [[index] for index in range(len(lengths))]
+
+
+def sequence_tokens(sequences: List[List[int]], cache: TokenCache) -> int:
+    """Tokens réels (hors padding) d'un batch"""
+    return sum(int(cache.lengths[group].sum()) for group in sequences)
+
+
+def collate(sequences: List[List[int]], cache: TokenCache, pad_token_id: int, dtype=None, varlen: bool = False):
+    """
+    Assemble un batch depuis le cache, avec padding dynamique à la plus longue séquence.
+    Dès qu'une ligne contient plusieurs exemples, attention_mask est un masque additif
+    4D (batch, 1, largeur, largeur) dans le dtype du modèle : causal à l'intérieur de
+    chaque exemple, fermé entre exemples et sur le padding. Avec varlen (flash-attention),
+    il n'y a pas de masque : les position_ids suffisent à séparer les exemples.
+    """
+    import torch
+    width = max(int(cache.lengths[group].sum()) for group in sequences)
+    input_ids = np.full((len(sequences), width), pad_token_id, dtype=np.int64)
+    labels = np.full((len(sequences), width), IGNORE_INDEX, dtype=np.int64)
+    position_ids = np.zeros((len(sequences), width), dtype=np.int64)
+    # Indice de l'exemple de chaque position dans sa ligne, -1 pour le padding
+    segments = np.full((len(sequences), width), -1, dtype=np.int64)
+    for row, group in enumerate(sequences):
+        column = 0
+        for segment, index in enumerate(group):
+            ids, example_labels = cache.example(index)
+            end = column + len(ids)
+            input_ids[row, column:end] = ids
+            labels[row, column:end] = example_labels
+            position_ids[row, column:end] = np.arange(len(ids))
+            segments[row, column:end] = segment
+            column = end
+    batch = {'input_ids': torch.from_numpy(input_ids), 'labels': torch.from_numpy(labels),
+             'position_ids': torch.from_numpy(position_ids)}
+    if varlen:
+        return batch
+    if all(len(group) == 1 for group in sequences):
+        batch['attention_mask'] = torch.from_numpy((segments >= 0).astype(np.int64))
+        return batch
+
+    segments = torch.from_numpy(segments)
+    same_example = (segments[:, :, None] == segments[:, None, :]) & (segments[:, :, None] >= 0)
+    causal = torch.ones(width, width, dtype=torch.bool).tril()
+    allowed = same_example & causal
+    # Les lignes de padding gardent leur diagonale : une ligne entièrement masquée donne des NaN
+    allowed |= torch.eye(width, dtype=torch.bool)
+    dtype = dtype or torch.float32
+    mask = torch.zeros(allowed.shape, dtype=dtype).masked_fill_(~allowed, torch.finfo(dtype).min)
+    batch['attention_mask'] = mask[:, None, :, :]
+    return batch
+
+
+def batch_order(count: int, batch_size: int, seed: int, epoch: int) -> List[List[int]]:
+    """Ordre des batches d'une époque, reproductible (pour la reprise)"""
+    indices = list(range(count))
+    random.Random(seed * 1000003 + epoch).shuffle(indices)
+    return [indices[i:i + batch_size] for i in range(0, count, batch_size)]
+
+
+# -------------------- MODÈLE --------------------
+def default_target_modules(model) -> List[str]:
+    """Modules d'attention usuels selon l'architecture, sinon toutes les couches linéaires"""
+    names = {name.rsplit('.', 1)[-1] for name, _ in model.named_modules()}
+    for candidates in (['q_proj', 'k_proj', 'v_proj', 'o_proj'], ['c_attn', 'c_proj'],
+                       ['query_key_value', 'dense'], ['Wqkv', 'out_proj']):
+        found = [name for name in candidates if name in names]
+        if found:
+            return found
+    import torch
+    return sorted({name.rsplit('.', 1)[-1] for name, module in model.named_modules()
+                   if isinstance(module, torch.nn.Linear) and 'lm_head' not in name})
+
+
+def load_model(args):
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    from peft import LoraConfig, get_peft_model
+
+    device = args.device
+    if device == 'auto':
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    # float32 sur CPU (le float16 y est lent ou non supporté)
+    dtype = torch.float32 if device == 'cpu' else getattr(torch, args.dtype)
+
+    tokenizer = AutoTokenizer.from_pretrained(args.model, token=args.hf_token)
+    if tokenizer.pad_token_id is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    model = AutoModelForCausalLM.from_pretrained(args.model, torch_dtype=dtype, token=args.hf_token,
+                                                 attn_implementation=args.attn_implementation)
+    if args.gradient_checkpointing:
+        model.gradient_checkpointing_enable()
+        model.enable_input_require_grads()
+
+    config = LoraConfig(
+        r=args.lora_r,
+        lora_alpha=args.lora_alpha,
+        lora_dropout=args.lora_dropout,
+        target_modules=args.target_modules.split(',') if args.target_modules else default_target_modules(model),
+        task_type='CAUSAL_LM'
+    )
+    model = get_peft_model(model, config)
+    model.to(device)
+    return model, tokenizer, device
+
+
+def uses_varlen(args) -> bool:
+    """flash-attention sépare les exemples packés d'après les position_ids, sans masque 4D"""
+    return args.packing and args.attn_implementation == 'flash_attention_2'
+
+
+# -------------------- CHECKPOINTS --------------------
+def latest_checkpoint(output_dir: str) -> Optional[str]:
+    checkpoints = glob.glob(os.path.join(output_dir, 'checkpoint-*'))
+    checkpoints = [path for path in checkpoints if os.path.exists(os.path.join(path, 'trainer_state.json'))]
+    return max(checkpoints, key=lambda path: int(path.rsplit('-', 1)[-1]), default=None)
+
+
+def save_checkpoint(model, optimizer, scheduler, state: Dict[str, Any], output_dir: str, keep: int):
+    import torch
+    path = os.path.join(output_dir, f"checkpoint-{state['step']}")
+    model.save_pretrained(path)
+    torch.save(optimizer.state_dict(), os.path.join(path, 'optimizer.pt'))
+    torch.save(scheduler.state_dict(), os.path.join(path, 'scheduler.pt'))
+    state = dict(state, torch_rng=torch.get_rng_state().tolist())
+    # Écrit en dernier : un checkpoint sans trainer_state.json est incomplet et ignoré
+    with open(os.path.join(path, 'trainer_state.json'), 'w') as f:
+        json.dump(state, f)
+
+    checkpoints = sorted(glob.glob(os.path.join(output_dir, 'checkpoint-*')), key=lambda p: int(p.rsplit('-', 1)[-1]))
+    for old in checkpoints[:-keep]:
+        shutil.rmtree(old, ignore_errors=True)
+    print(f"💾 Checkpoint saved: {path}")
+
+
+def load_checkpoint(model, optimizer, scheduler, path: str) -> Dict[str, Any]:
+    import torch
+    from peft import set_peft_model_state_dict
+
+    weights = os.path.join(path, 'adapter_model.safetensors')
+    if os.path.exists(weights):
+        from safetensors.torch import load_file
+        adapter_state = load_file(weights)
+    else:
+        adapter_state = torch.load(os.path.join(path, 'adapter_model.bin'), map_location='cpu')
+    set_peft_model_state_dict(model, adapter_state)
+    optimizer.load_state_dict(torch.load(os.path.join(path, 'optimizer.pt'), map_location='cpu'))
+    scheduler.load_state_dict(torch.load(os.path.join(path, 'scheduler.pt'), map_location='cpu'))
+    with open(os.path.join(path, 'trainer_state.json')) as f:
+        state = json.load(f)
+    torch.set_rng_state(torch.tensor(state.pop('torch_rng'), dtype=torch.uint8))
+    print(f"♻️ Resumed from {path} (step {state['step']}, epoch {state['epoch']}, batch {state['batch']})")
+    return state
+
+
+# -------------------- DÉBIT --------------------
+def measure_throughput(model, sequences, cache: TokenCache, batch_size: int, pad_token_id: int, device: str,
+                       steps: int, varlen: bool = False) -> Dict[str, float]:
+    """Forward + backward sur `steps` batches, sans mise à jour : tokens réels et paddés par seconde"""
+    model.train()
+    batches = batch_order(len(sequences), batch_size, 0, 0)[:steps]
+    real = padded = 0
+    start = time.perf_counter()
+    for batch_indices in batches:
+        groups = [sequences[i] for i in batch_indices]
+        batch = collate(groups, cache, pad_token_id, model.dtype, varlen)
+        batch = {key: value.to(device) for key, value in batch.items()}
+        model(**batch).loss.backward()
+        model.zero_grad(set_to_none=True)
+        real += sequence_tokens(groups, cache)
+        padded += batch['input_ids'].numel()
+    elapsed = time.perf_counter() - start
+    return {'batches': len(batches), 'real_tokens_per_sec': real / elapsed,
+            'padding_ratio': 1 - real / max(padded, 1), 'seconds': elapsed}
+
+
+def benchmark(model, cache: TokenCache, args, pad_token_id: int, device: str):
+    """Même nombre d'exemples traités avec et sans packing"""
+    packed = build_sequences(cache.lengths, args.max_seq_len, packing=True)
+    unpacked = build_sequences(cache.lengths, args.max_seq_len, packing=False)
+    steps = min(args.benchmark_steps, math.ceil(len(packed) / args.batch_size))
+    # Sans packing, il faut plus de batches pour voir autant d'exemples
+    per_sequence = len(unpacked) / max(len(packed), 1)
+    results = {
+        'packed': measure_throughput(model, packed, cache, args.batch_size, pad_token_id, device, steps,
+                                     uses_varlen(args)),
+        'unpacked': measure_throughput(model, unpacked, cache, args.batch_size, pad_token_id, device,
+                                       math.ceil(steps * per_sequence), uses_varlen(args))
+    }
+    for name, result in results.items():
+        print(f"{name:9s} {result['real_tokens_per_sec']:10.1f} real tokens/s  "
+              f"padding {result['padding_ratio']:.1%}  ({result['batches']} batches, {result['seconds']:.1f}s)")
+    speedup = results['packed']['real_tokens_per_sec'] / max(results['unpacked']['real_tokens_per_sec'], 1e-9)
+    print(f"Packing speedup: {speedup:.2f}x")
+    return results
+
+
+# -------------------- ENTRAÎNEMENT --------------------
+def evaluate_loss(model, cache: TokenCache, batch_size: int, pad_token_id: int, device: str) -> float:
+    """Perte moyenne par token de sortie sur le jeu d'évaluation (exemples triés par longueur, peu de padding)"""
+    import torch
+    model.eval()
+    order = np.argsort(cache.lengths, kind='stable').tolist()
+    total_loss = total_tokens = 0.0
+    with torch.no_grad():
+        for start in range(0, len(order), batch_size):
+            batch = collate([[index] for index in order[start:start + batch_size]], cache, pad_token_id, model.dtype)
+            batch = {key: value.to(device) for key, value in batch.items()}
+            # La perte HF est une moyenne sur les labels décalés d'un cran : on repondère par leur nombre
+            tokens = int((batch['labels'][:, 1:] != IGNORE_INDEX).sum())
+            total_loss += model(**batch).loss.item() * tokens
+            total_tokens += tokens
+    model.train()
+    return total_loss / max(total_tokens, 1)
+
+
+def train(args):
+    import torch
+    from transformers import get_scheduler
+
+    torch.manual_seed(args.seed)
+    model, tokenizer, device = load_model(args)
+    model.print_trainable_parameters()
+
+    cache = load_or_build(tokenizer, args.train, args.cache_dir, args.max_seq_len)
+    eval_cache = load_or_build(tokenizer, args.eval, args.cache_dir, args.max_seq_len) if args.eval else None
+
+    if args.benchmark_steps:
+        results = benchmark(model, cache, args, tokenizer.pad_token_id, device)
+        os.makedirs(args.output_dir, exist_ok=True)
+        with open(os.path.join(args.output_dir, 'throughput.json'), 'w') as f:
+            json.dump(results, f, indent=2)
+        return
+
+    sequences = build_sequences(cache.lengths, args.max_seq_len, packing=args.packing)
+    real_tokens = int(cache.lengths.sum())
+    print(f"📦 {len(sequences)} sequences ({'packed' if args.packing else 'unpacked'}), {real_tokens} tokens")
+
+    batches_per_epoch = math.ceil(len(sequences) / args.batch_size)
+    steps_per_epoch = math.ceil(batches_per_epoch / args.grad_accum)
+    total_steps = args.max_steps or steps_per_epoch * args.epochs
+
+    optimizer = torch.optim.AdamW([p for p in model.parameters() if p.requires_grad],
+                                  lr=args.lr, weight_decay=args.weight_decay)
+    scheduler = get_scheduler('linear', optimizer, num_warmup_steps=int(total_steps * args.warmup_ratio),
+                              num_training_steps=total_steps)
+
+    state = {'step': 0, 'epoch': 0, 'batch': 0, 'tokens': 0, 'loss_history': []}
+    if args.resume:
+        checkpoint = args.resume if os.path.isdir(args.resume) else latest_checkpoint(args.output_dir)
+        if checkpoint:
+            state = load_checkpoint(model, optimizer, scheduler, checkpoint)
+
+    model.train()
+    start = time.perf_counter()
+    window_tokens, window_start, window_loss, window_batches = 0, time.perf_counter(), 0.0, 0
+    while state['step'] < total_steps and state['epoch'] < args.epochs:
+        order = batch_order(len(sequences), args.batch_size, args.seed, state['epoch'])
+        # Un checkpoint est toujours pris à une frontière d'accumulation : on reprend au batch suivant
+        for batch_index in range(state['batch'], len(order)):
+            groups = [sequences[i] for i in order[batch_index]]
+            batch = collate(groups, cache, tokenizer.pad_token_id, model.dtype, uses_varlen(args))
+            batch = {key: value.to(device) for key, value in batch.items()}
+            loss = model(**batch).loss
+            # Le dernier groupe d'une époque peut compter moins de grad_accum batches
+            group_start = batch_index - batch_index % args.grad_accum
+            (loss / min(args.grad_accum, len(order) - group_start)).backward()
+
+            tokens = sequence_tokens(groups, cache)
+            state['tokens'] += tokens
+            window_tokens += tokens
+            window_loss += loss.item()
+            window_batches += 1
+
+            last_batch = batch_index + 1 == len(order)
+            if (batch_index + 1) % args.grad_accum and not last_batch:
+                continue
+
+            torch.nn.utils.clip_grad_norm_(model.parameters(), args.max_grad_norm)
+            optimizer.step()
+            scheduler.step()
+            optimizer.zero_grad(set_to_none=True)
+            state['step'] += 1
+            state['batch'] = batch_index + 1
+
+            if state['step'] % args.log_every == 0 or state['step'] == total_steps:
+                elapsed = time.perf_counter() - window_start
+                average = window_loss / max(window_batches, 1)
+                state['loss_history'].append([state['step'], average])
+                print(f"step {state['step']}/{total_steps}  loss {average:.4f}  "
+                      f"lr {scheduler.get_last_lr()[0]:.2e}  {window_tokens / elapsed:,.0f} tokens/s")
+                window_tokens, window_start, window_loss, window_batches = 0, time.perf_counter(), 0.0, 0
+
+            if eval_cache is not None and args.eval_every and state['step'] % args.eval_every == 0:
+                eval_loss = evaluate_loss(model, eval_cache, args.batch_size, tokenizer.pad_token_id, device)
+                state.setdefault('eval_history', []).append([state['step'], eval_loss])
+                print(f"step {state['step']}/{total_steps}  eval loss {eval_loss:.4f}")
+            if args.save_every and state['step'] % args.save_every == 0:
+                save_checkpoint(model, optimizer, scheduler, state, args.output_dir, args.save_total_limit)
+            if state['step'] >= total_steps:
+                break
+        else:
+            state['epoch'] += 1
+            state['batch'] = 0
+
+    elapsed = time.perf_counter() - start
+    if eval_cache is not None:
+        state['eval_loss'] = evaluate_loss(model, eval_cache, args.batch_size, tokenizer.pad_token_id, device)
+        print(f"📊 Final eval loss {state['eval_loss']:.4f}")
+    save_adapter(model, tokenizer, args, state, elapsed)
+
+
+def save_adapter(model, tokenizer, args, state: Dict[str, Any], elapsed: float):
+    adapter_dir = os.path.join(args.output_dir, 'adapter')
+    model.save_pretrained(adapter_dir)
+    tokenizer.save_pretrained(adapter_dir)
+    with open(os.path.join(adapter_dir, 'prompt_format.json'), 'w') as f:
+        json.dump(PROMPT_FORMAT, f, indent=2)
+    summary = {
+        'base_model': args.model, 'steps': state['step'], 'tokens': state['tokens'],
+        'seconds': elapsed, 'tokens_per_sec': state['tokens'] / max(elapsed, 1e-9),
+        'packing': args.packing, 'max_seq_len': args.max_seq_len,
+        'effective_batch_size': args.batch_size * args.grad_accum, 'loss_history': state['loss_history'],
+        'eval_loss': state.get('eval_loss'), 'eval_history': state.get('eval_history', [])
+    }
+    with open(os.path.join(args.output_dir, 'training_summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(f"✅ Adapter saved to {adapter_dir} ({summary['tokens_per_sec']:,.0f} tokens/s overall)")
+
+    if args.merge:
+        merged_dir = os.path.join(args.output_dir, 'merged')
+        model.merge_and_unload().save_pretrained(merged_dir)
+        tokenizer.save_pretrained(merged_dir)
+        print(f"✅ Merged model saved to {merged_dir}")
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Fine-tuning LoRA avec packing de séquences")
+    parser.add_argument('--model', default='bigcode/starcoderbase-1b', help="nom Hugging Face ou dossier local")
+    parser.add_argument('--hf-token', default=None, help="jeton pour les modèles protégés (sinon HF_TOKEN)")
+    parser.add_argument('--train', nargs='+', default=[os.path.join(here, 'docstring_train.jsonl'),
+                                                       os.path.join(here, 'tests_train.jsonl')],
+                        help="fichiers JSONL, dossiers de shards ou motifs glob")
+    parser.add_argument('--eval', nargs='*', default=[os.path.join(here, 'docstring_eval.jsonl'),
+                                                      os.path.join(here, 'tests_eval.jsonl')],
+                        help="jeu d'évaluation pour la perte (vide = aucun)")
+    parser.add_argument('--eval-every', type=int, default=0, help="perte d'évaluation tous les N pas (0 = à la fin)")
+    parser.add_argument('--cache-dir', default=os.path.join(here, 'token_cache'),
+                        help="cache des datasets pré-tokenisés (token_cache.py)")
+    parser.add_argument('-o', '--output-dir', default=os.path.join(here, 'lora-output'))
+    parser.add_argument('--max-seq-len', type=int, default=1024)
+    parser.add_argument('--no-packing', dest='packing', action='store_false')
+    parser.add_argument('--batch-size', type=int, default=4)
+    parser.add_argument('--grad-accum', type=int, default=8)
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--max-steps', type=int, default=0, help="arrête après N pas d'optimisation (0 = époques)")
+    parser.add_argument('--lr', type=float, default=2e-4)
+    parser.add_argument('--weight-decay', type=float, default=0.0)
+    parser.add_argument('--warmup-ratio', type=float, default=0.03)
+    parser.add_argument('--max-grad-norm', type=float, default=1.0)
+    parser.add_argument('--lora-r', type=int, default=16)
+    parser.add_argument('--lora-alpha', type=int, default=32)
+    parser.add_argument('--lora-dropout', type=float, default=0.05)
+    parser.add_argument('--target-modules', default='', help="séparés par des virgules (défaut : selon l'architecture)")
+    parser.add_argument('--gradient-checkpointing', action='store_true')
+    parser.add_argument('--attn-implementation', default='sdpa', choices=['eager', 'sdpa', 'flash_attention_2'],
+                        help="sdpa/eager : masque 4D bloc-diagonal en packing ; flash_attention_2 : chemin varlen")
+    parser.add_argument('--device', default='auto', choices=['auto', 'cpu', 'cuda', 'mps'])
+    parser.add_argument('--dtype', default='bfloat16', help="dtype sur GPU (float32 sur CPU)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--log-every', type=int, default=10)
+    parser.add_argument('--save-every', type=int, default=100, help="checkpoint tous les N pas (0 = jamais)")
+    parser.add_argument('--save-total-limit', type=int, default=2)
+    parser.add_argument('--resume', nargs='?', const='latest', default=None,
+                        help="reprend du dernier checkpoint de --output-dir, ou du dossier donné")
+    parser.add_argument('--merge', action='store_true', help="sauvegarde aussi le modèle fusionné")
+    parser.add_argument('--benchmark-steps', type=int, default=0,
+                        help="mesure seulement le débit (tokens/s) avec et sans packing sur N batches")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    train(parse_args())